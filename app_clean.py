@@ -1,8 +1,8 @@
 import streamlit as st
 import os
 import sys
+import uuid
 from PIL import Image
-from sentence_transformers import SentenceTransformer
 
 # Add the current directory to the path to import utils
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
@@ -96,6 +96,10 @@ st.markdown("""
 # Initialize session state
 def initialize_session_state():
     """Initialize all session state variables"""
+    if 'session_id' not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
+    if 'response_type' not in st.session_state:
+        st.session_state.response_type = "standard"
     if 'messages' not in st.session_state:
         st.session_state.messages = []
     if 'embeddings_loaded' not in st.session_state:
@@ -104,6 +108,12 @@ def initialize_session_state():
         st.session_state.chunks = []
     if 'embeddings' not in st.session_state:
         st.session_state.embeddings = []
+    if 'retrieval_index' not in st.session_state:
+        st.session_state.retrieval_index = None
+    if 'chunk_metadata' not in st.session_state:
+        st.session_state.chunk_metadata = []
+    if 'search_filters' not in st.session_state:
+        st.session_state.search_filters = {}
     if 'quiz_questions' not in st.session_state:
         st.session_state.quiz_questions = []
     if 'quiz_index' not in st.session_state:
@@ -116,30 +126,155 @@ def initialize_session_state():
         st.session_state.quiz_active = False
 
 # Load embedding model
-@st.cache_resource
 def load_embedding_model():
     """Load the multilingual embedding model"""
-    return SentenceTransformer(EMBEDDING_CONFIG["model_name"])
+    model = load_embedding_backend(EMBEDDING_CONFIG)
+    if EMBEDDING_CONFIG["micro_batching"]:
+        # Concurrent sessions share forward passes instead of queuing on the model
+        model = MicroBatchEncoder(
+            model,
+            max_batch_size=EMBEDDING_CONFIG["max_batch_size"],
+            max_wait_ms=EMBEDDING_CONFIG["max_batch_wait_ms"]
+        )
+    # Query vectors are cached per process, so every session shares the hits
+    query_cache = get_query_embedding_cache()
+    query_cache.max_entries = EMBEDDING_CONFIG["query_cache_size"]
+    query_cache.clear()
+    return model
+
+@st.cache_resource
+def get_model_loader():
+    """Start loading and warming up the embedding model once per process"""
+    return BackgroundModelLoader(load_embedding_model)
+
+def rerun_session_when_ready(model_loader):
+    """Ask Streamlit to rerun the current session once the model loader finishes
+    
+    Streamlit 1.29 has no timed rerun, so the loader thread requests the rerun
+    through the runtime. If that API is unavailable the next interaction
+    picks the model up instead.
+    """
+    if st.session_state.get("rerun_on_model_ready"):
+        return
+    try:
+        from streamlit.runtime import get_instance
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        session_id = get_script_run_ctx().session_id
+        runtime = get_instance()
+    except Exception:
+        return
+    
+    def request_rerun(_):
+        session_info = runtime._session_mgr.get_active_session_info(session_id)
+        if session_info is not None:
+            session_info.session.request_rerun(None)
+    
+    st.session_state.rerun_on_model_ready = True
+    model_loader.add_done_callback(request_rerun)
+
+@st.cache_resource
+def get_answer_cache():
+    """Semantic answer cache shared by all sessions"""
+    return SemanticAnswerCache(
+        similarity_threshold=ANSWER_CACHE_CONFIG["similarity_threshold"],
+        ttl_seconds=ANSWER_CACHE_CONFIG["ttl_seconds"],
+        max_entries=ANSWER_CACHE_CONFIG["max_entries"]
+    )
+
+@st.cache_resource(max_entries=2)
+def get_retrieval_index(kb_version, _chunks, _embeddings, _chunk_metadata):
+    """Retrieval index shared by all sessions, built once per knowledge base version
+    
+    Only kb_version is hashed; the underscored arguments are what it fingerprints.
+    """
+    return build_retrieval_index(_chunks, _embeddings, dict(RETRIEVAL_CONFIG, metadata=_chunk_metadata))
+
+@st.cache_resource
+def get_llm_health_monitor():
+    """Background LM Studio health monitor shared by all sessions"""
+    return LLMHealthMonitor(
+        interval_seconds=LM_STUDIO_CONFIG["health_interval"],
+        ttl_seconds=LM_STUDIO_CONFIG["health_ttl"]
+    )
 
 def setup_knowledge_base(model):
-    """Setup the knowledge base from PDF"""
-    chunks, embeddings = load_embeddings(PDF_CONFIG["embeddings_file"])
+    """Setup the knowledge base from PDF (building it needs the model)"""
+    chunks, embeddings, chunk_metadata = load_embeddings(
+        PDF_CONFIG["embeddings_file"], with_metadata=True, model_name=EMBEDDING_CONFIG["model_name"]
+    )
     
-    if not chunks:
+    if not chunks and model is not None:
         # Extract from PDF and create embeddings
         pdf_path = PATHS["pdf_file"]
         if os.path.exists(pdf_path):
-            chunks = extract_text_from_pdf(pdf_path)
+            chunks, chunk_metadata = extract_text_from_pdf(pdf_path, with_metadata=True)
             if chunks:
-                embeddings = create_embeddings(chunks, model)
-                save_embeddings(chunks, embeddings, PDF_CONFIG["embeddings_file"])
+                progress = st.progress(0.0, text="Embedding knowledge base...")
+                
+                def report_progress(done, total, rate):
+                    progress.progress(done / total, text=f"Embedding knowledge base... {done}/{total} chunks ({rate:.1f}/s)")
+                
+                pool = None
+                if PDF_CONFIG["embedding_workers"]:
+                    pool = EmbeddingProcessPool(
+                        EMBEDDING_CONFIG,
+                        workers=PDF_CONFIG["embedding_workers"],
+                        threads_per_worker=PDF_CONFIG["embedding_threads_per_worker"]
+                    )
+                try:
+                    embeddings = create_embeddings(
+                        chunks, model,
+                        batch_size=PDF_CONFIG["embedding_batch_size"],
+                        checkpoint_path=PDF_CONFIG["embedding_checkpoint"],
+                        progress_callback=report_progress,
+                        model_name=EMBEDDING_CONFIG["model_name"],
+                        pool=pool
+                    )
+                finally:
+                    if pool is not None:
+                        pool.close()
+                progress.empty()
+                save_embeddings(
+                    chunks, embeddings, PDF_CONFIG["embeddings_file"], chunk_metadata,
+                    model_name=EMBEDDING_CONFIG["model_name"]
+                )
                 st.success("Knowledge base created successfully!")
             else:
                 st.error("Failed to extract text from PDF")
         else:
             st.error("PDF file not found")
     
-    return chunks, embeddings
+    return chunks, embeddings, chunk_metadata
+
+def render_search_filters():
+    """Render the knowledge base search filters in sidebar"""
+    st.header("🔎 Search Filters")
+    
+    index = st.session_state.retrieval_index
+    if index is None or not len(index):
+        return
+    
+    with st.expander("Restrict answers to", expanded=False):
+        filters = {}
+        kind = st.radio("Content", ["All", "Text only", "Tables only"], horizontal=True)
+        if kind == "Text only":
+            filters["kind"] = "text"
+        elif kind == "Tables only":
+            filters["kind"] = "table"
+        
+        sources = index.metadata.sources
+        if len(sources) > 1:
+            source = st.selectbox("Source document", ["All"] + sources)
+            if source != "All":
+                filters["source"] = source
+        
+        first_page, last_page = index.metadata.page_range
+        if last_page > first_page:
+            pages = st.slider("Pages", first_page, last_page, (first_page, last_page))
+            if pages != (first_page, last_page):
+                filters["pages"] = pages
+        
+        st.session_state.search_filters = filters
 
 def render_fluid_calculator():
     """Render the fluid calculator in sidebar"""
@@ -272,10 +407,11 @@ def render_quiz_interface():
                 st.session_state.quiz_answers = []
                 st.rerun()
 
-def render_chat_message(message, is_user=True):
-    """Render a single chat message"""
+def render_chat_message(message, is_user=True, container=None):
+    """Render a single chat message (into container, e.g. an st.empty() placeholder, if given)"""
+    container = container or st
     if is_user:
-        st.markdown(f"""
+        container.markdown(f"""
         <div class="chat-message user-message">
             <div class="message-avatar">👤</div>
             <div class="message-content">
@@ -285,7 +421,7 @@ def render_chat_message(message, is_user=True):
         </div>
         """, unsafe_allow_html=True)
     else:
-        st.markdown(f"""
+        container.markdown(f"""
         <div class="chat-message bot-message">
             <div class="message-avatar">🤖</div>
             <div class="message-content">
@@ -295,22 +431,134 @@ def render_chat_message(message, is_user=True):
         </div>
         """, unsafe_allow_html=True)
 
+def render_streamed_response(stream):
+    """Render a streamed bot response as it arrives and return the full text"""
+    placeholder = st.empty()
+    render_chat_message("<em>Thinking...</em>", is_user=False, container=placeholder)
+    response = ""
+    for token in stream:
+        response += token
+        render_chat_message(response + " ▌", is_user=False, container=placeholder)
+    render_chat_message(response, is_user=False, container=placeholder)
+    return response
+
+def stream_and_cache_response(stream, query_vector, chunk_ids, fallback=None, cache_answer=True, question=""):
+    """Pass a response stream through, caching the full answer once it completes
+    
+    If generation fails before any text arrives, fallback(error) is streamed instead.
+    """
+    parts = []
+    for token in stream:
+        if not parts and fallback is not None and token.startswith("Error connecting to LM Studio"):
+            if not token.startswith(BUSY_MESSAGE):
+                get_llm_health_monitor().report_failure()
+            yield fallback(token)
+            return
+        parts.append(token)
+        yield token
+    response = "".join(parts)
+    if "Error connecting to LM Studio" in response:
+        get_llm_health_monitor().report_failure()
+    elif cache_answer and response.strip():
+        get_answer_cache().store(query_vector, chunk_ids, response, question)
+
+def build_extractive_response(query_vector, hits, model, note=""):
+    """Answer with the retrieved guideline sentences closest to the question"""
+    result = extractive_answer(
+        query_vector,
+        hits,
+        st.session_state.chunks,
+        model,
+        chunk_metadata=st.session_state.chunk_metadata,
+        max_sentences=FAST_ANSWER_CONFIG["max_sentences"],
+        source_hits=FAST_ANSWER_CONFIG["source_hits"],
+        chunk_embeddings=st.session_state.embeddings
+    )
+    answer = result["answer"] or st.session_state.chunks[hits[0][0]][:500] + "..."
+    response = f"Based on the KKH guidelines:\n\n{answer}"
+    if note:
+        response += f"\n\n{note}"
+    return response
+
 def handle_user_query(prompt, model):
-    """Handle user query and generate response"""
-    relevant_chunk = find_relevant_chunk(
+    """Handle user query and generate response (a token generator when the LLM streams)"""
+    # One time budget for the whole question; generation gets what retrieval leaves
+    deadline = Deadline(RESILIENCE_CONFIG["request_deadline_seconds"])
+    query_vector = encode_query(prompt, model)
+    hits = search_chunks(
         prompt, 
         st.session_state.chunks, 
         st.session_state.embeddings, 
         model,
-        threshold=EMBEDDING_CONFIG["similarity_threshold"]
+        top_k=CONTEXT_CONFIG["top_k"],
+        threshold=EMBEDDING_CONFIG["similarity_threshold"],
+        retrieval_index=st.session_state.retrieval_index,
+        query_vector=query_vector,
+        filters=st.session_state.search_filters
     )
     
-    if relevant_chunk:
-        # Check if LM Studio is available
-        if check_lm_studio_connection():
-            response = generate_nursing_response(prompt, relevant_chunk)
+    if hits:
+        chunk_ids = [chunk_id for chunk_id, _ in hits]
+        answer_cache = get_answer_cache()
+        response_type = st.session_state.response_type
+        # The semantic cache holds standard answers only
+        use_answer_cache = ANSWER_CACHE_CONFIG["enabled"] and response_type == "standard"
+        
+        # Rephrasings of an answered question are served from the semantic cache
+        if use_answer_cache:
+            cached_response = answer_cache.lookup(query_vector, chunk_ids, prompt)
+            if cached_response is not None:
+                return cached_response
+        
+        # High-confidence hits are answered from the guideline text without the LLM.
+        # In hybrid mode hits are in fused (RRF) order, so confidence is the best
+        # cosine similarity among them, not the score of the first hit
+        dense_hits = sorted(hits, key=lambda hit: hit[1], reverse=True)
+        if FAST_ANSWER_CONFIG["enabled"] and dense_hits[0][1] >= FAST_ANSWER_CONFIG["confidence_threshold"]:
+            return build_extractive_response(query_vector, dense_hits, model)
+        
+        def fallback(error=None):
+            note = "(Note: LM Studio is not available for enhanced responses)"
+            if error and error.startswith(BUSY_MESSAGE):
+                # Refused by a full generation queue; the message carries the retry hint
+                note = f"(Note: LM Studio is busy with other questions{error[len(BUSY_MESSAGE):]} for an enhanced response)"
+            return build_extractive_response(query_vector, hits, model, note=note)
+        
+        # Health comes from the background monitor, never a blocking probe here;
+        # an open circuit breaker or a spent budget skips generation at once.
+        # The budget bounds the wait for the first streamed token; a full
+        # non-streamed answer keeps the whole LM Studio timeout, as max_tokens needs it
+        generation_budget = min(deadline.remaining(), LM_STUDIO_CONFIG["timeout"])
+        if (get_llm_health_monitor().is_available()
+                and get_llm_circuit_breaker().allows_requests()
+                and generation_budget >= RESILIENCE_CONFIG["min_generation_seconds"]):
+            context, _ = pack_context(
+                hits,
+                st.session_state.chunks,
+                token_budget=CONTEXT_CONFIG["token_budget"],
+                tokenizer=getattr(model, "tokenizer", None),
+                chunk_metadata=st.session_state.chunk_metadata,
+                token_margin=CONTEXT_CONFIG["token_margin"]
+            )
+            if LM_STUDIO_CONFIG["stream_responses"]:
+                stream = generate_nursing_response(
+                    prompt, context, response_type, stream=True, timeout=generation_budget,
+                    session_id=st.session_state.session_id
+                )
+                return stream_and_cache_response(
+                    stream, query_vector, chunk_ids, fallback, use_answer_cache, question=prompt
+                )
+            response = generate_nursing_response(
+                prompt, context, response_type, session_id=st.session_state.session_id
+            )
+            if response.startswith("Error connecting"):
+                if not response.startswith(BUSY_MESSAGE):
+                    get_llm_health_monitor().report_failure()
+                response = fallback(response)
+            elif use_answer_cache and response.strip():
+                answer_cache.store(query_vector, chunk_ids, response, prompt)
         else:
-            response = f"Based on the KKH guidelines:\n\n{relevant_chunk[:500]}...\n\n(Note: LM Studio is not available for enhanced responses)"
+            response = fallback()
     else:
         response = "I couldn't find relevant information in the KKH knowledge base to answer your question. Please try rephrasing your question or ask about specific nursing protocols, procedures, or guidelines."
     
@@ -318,6 +566,10 @@ def handle_user_query(prompt, model):
 
 def main():
     """Main application function"""
+    # Embedding model loads in the background; everything else renders now
+    model_loader = get_model_loader()
+    model = model_loader.model if model_loader.is_ready() else None
+    
     # Initialize session state
     initialize_session_state()
     
@@ -329,37 +581,59 @@ def main():
     </div>
     """, unsafe_allow_html=True)
     
-    # Load embedding model
-    model = load_embedding_model()
+    if model_loader.status == "failed":
+        st.error(f"Failed to load embedding model: {model_loader.error}")
     
-    # Initialize embeddings if not loaded
+    # Initialize embeddings if not loaded (a saved knowledge base loads without the model)
     if not st.session_state.embeddings_loaded:
         with st.spinner("Loading knowledge base..."):
-            chunks, embeddings = setup_knowledge_base(model)
+            chunks, embeddings, chunk_metadata = setup_knowledge_base(model)
+        if chunks or model_loader.is_ready():
             st.session_state.chunks = chunks
             st.session_state.embeddings = embeddings
+            st.session_state.chunk_metadata = chunk_metadata
+            kb_version = compute_knowledge_base_version(chunks, EMBEDDING_CONFIG["model_name"])
+            st.session_state.retrieval_index = get_retrieval_index(kb_version, chunks, embeddings, chunk_metadata)
+            get_answer_cache().set_knowledge_base_version(kb_version)
             st.session_state.embeddings_loaded = True
     
     # Sidebar
     with st.sidebar:
         render_fluid_calculator()
         render_quiz_interface()
+        render_search_filters()
     
     # Main chat interface
     st.header("💬 Chat with KKH Nursing Assistant")
     
-    # Check LM Studio connection status
-    if check_lm_studio_connection():
+    # LM Studio connection status (cached by the background monitor)
+    llm_status = get_llm_health_monitor().status()
+    if llm_status["state"] == "up" and not get_llm_circuit_breaker().allows_requests():
+        st.warning("⚠️ LM Studio is responding slowly - answering from the guidelines while it recovers")
+    elif llm_status["state"] == "up":
         st.success("✅ LM Studio connected and ready")
+    elif llm_status["state"] == "checking":
+        st.info("🔄 Checking LM Studio connection...")
     else:
         st.warning("⚠️ LM Studio not connected - responses will be basic")
     
+    # Quick answers are generated ahead of standard and detailed ones
+    st.radio(
+        "Answer style",
+        ["quick", "standard", "detailed"],
+        format_func=str.title,
+        horizontal=True,
+        key="response_type"
+    )
+    
     # Display chat history
     for message in st.session_state.messages:
         render_chat_message(message["content"], message["role"] == "user")
     
-    # Chat input
-    if prompt := st.chat_input("Ask me anything about KKH nursing protocols..."):
+    # Chat input (disabled until the embedding model is warm)
+    chat_ready = model is not None
+    placeholder = "Ask me anything about KKH nursing protocols..." if chat_ready else "Warming up the assistant..."
+    if prompt := st.chat_input(placeholder, disabled=not chat_ready):
         # Add user message to chat history
         st.session_state.messages.append({"role": "user", "content": prompt})
         render_chat_message(prompt, is_user=True)
@@ -367,15 +641,26 @@ def main():
         # Generate response
         with st.spinner("Thinking..."):
             response = handle_user_query(prompt, model)
-            
-            # Add bot response to chat history
-            st.session_state.messages.append({"role": "assistant", "content": response})
+        
+        if isinstance(response, str):
             render_chat_message(response, is_user=False)
+        else:
+            # LLM answers stream in; time to first token is the wait users see
+            response = render_streamed_response(response)
+        
+        # Add bot response to chat history
+        st.session_state.messages.append({"role": "assistant", "content": response})
     
     # Clear chat button
     if st.button("Clear Chat History"):
         st.session_state.messages = []
         st.rerun()
+    
+    # The script ends here while the model warms up, so the page stays responsive;
+    # the loader reruns this session when it is done
+    if not model_loader.is_ready():
+        st.info("⏳ Warming up the knowledge assistant - the fluid calculator and quiz are ready to use")
+        rerun_session_when_ready(model_loader)
 
 if __name__ == "__main__":
     main()
@@ -5,11 +5,14 @@ import numpy as np
 import pandas as pd
 from sentence_transformers import SentenceTransformer
 from sklearn.metrics.pairwise import cosine_similarity
-import requests
 import re
 import random
 from PIL import Image
 import os
+from utils.llm_health import LLMHealthMonitor
+from utils.llm_interface import query_lm_studio as query_shared_lm_studio
+from utils.pdf_processor import encode_query
+from config import LM_STUDIO_CONFIG, SAMPLE_QUESTIONS
 
 # Configure Streamlit page
 st.set_page_config(
@@ -261,9 +264,8 @@ def find_relevant_chunk(question, chunks, embeddings, model, top_k=1):
         return None
     
     try:
-        # Embed the question
-        instruction = "Represent this query for retrieval: "
-        question_embedding = model.encode([instruction + question], convert_to_tensor=False)
+        # Embed the question (repeated questions reuse the shared query cache)
+        question_embedding = encode_query(question, model).reshape(1, -1)
         
         # Calculate cosine similarity
         embeddings_array = np.array(embeddings)
@@ -281,29 +283,8 @@ def find_relevant_chunk(question, chunks, embeddings, model, top_k=1):
         return None
 
 def query_lm_studio(prompt, system_message="You are a helpful nursing chatbot. Only answer based on the context provided."):
-    """Query LM Studio API"""
-    url = "http://localhost:1234/v1/chat/completions"
-    
-    headers = {
-        "Content-Type": "application/json"
-    }
-    
-    data = {
-        "model": "OpenHermes-2.5-Mistral-7B",
-        "messages": [
-            {"role": "system", "content": system_message},
-            {"role": "user", "content": prompt}
-        ],
-        "temperature": 0.7,
-        "max_tokens": 500
-    }
-    
-    try:
-        response = requests.post(url, json=data, headers=headers, timeout=30)
-        response.raise_for_status()
-        return response.json()["choices"][0]["message"]["content"]
-    except requests.exceptions.RequestException as e:
-        return f"Error connecting to LM Studio: {str(e)}"
+    """Query LM Studio API (identical questions in flight share one generation)"""
+    return query_shared_lm_studio(prompt, system_message, temperature=0.7, max_tokens=500)
 
 # Fluid Calculator Functions
 def calculate_maintenance_fluid(weight_kg, age_years):
@@ -385,13 +366,17 @@ def generate_quiz_questions(chunks, num_questions=15):
     
     return questions
 
+@st.cache_resource
+def get_llm_health_monitor():
+    """Background LM Studio health monitor shared by all sessions"""
+    return LLMHealthMonitor(
+        interval_seconds=LM_STUDIO_CONFIG["health_interval"],
+        ttl_seconds=LM_STUDIO_CONFIG["health_ttl"]
+    )
+
 def check_lm_studio_connection():
-    """Check if LM Studio is available"""
-    try:
-        response = requests.get("http://localhost:1234/v1/models", timeout=5)
-        return response.status_code == 200
-    except:
-        return False
+    """Check if LM Studio is available (the monitor's cached status, so reruns never wait on a probe)"""
+    return get_llm_health_monitor().is_available()
 
 # Main Application
 def main():
@@ -480,20 +465,7 @@ def main():
         with st.expander("Sample Nursing Questions", expanded=False):
             st.markdown("**Click on any question to ask the chatbot:**")
             
-            sample_questions = [
-                "What are the standard vital signs monitoring procedures?",
-                "How do I calculate pediatric dosage for medications?",
-                "What are the infection control protocols?",
-                "How should I handle emergency situations in pediatric care?",
-                "What are the proper hand hygiene procedures?",
-                "How do I assess pain in pediatric patients?",
-                "What are the wound care best practices?",
-                "How do I manage IV therapy safely?",
-                "What are the fall prevention strategies?",
-                "How do I document patient care properly?"
-            ]
-            
-            for i, question in enumerate(sample_questions):
+            for i, question in enumerate(SAMPLE_QUESTIONS):
                 if st.button(f"❓ {question}", key=f"sample_q_{i}", use_container_width=True):
                     # Mark question for processing (don't add to messages yet)
                     st.session_state['process_sample_question'] = question
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Embedding tier benchmark for the KKH Nursing Chatbot
+Compares the small/base/large e5 tiers on the knowledge base PDF:
+query latency, document throughput, model memory, and how often each tier
+retrieves the same chunks as the large model.
+
+Usage:
+    python benchmark_embeddings.py [--tiers small base large] [--chunks 400]
+
+Pick the tier for a node with KKH_EMBEDDING_TIER=<tier>.
+"""
+
+import argparse
+import gc
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from config import EMBEDDING_MODEL_TIERS, PATHS, PDF_CONFIG, SAMPLE_QUESTIONS
+from utils.pdf_processor import extract_text_from_pdf, load_embeddings
+
+def current_rss_mb():
+    """Resident memory of this process in MB, or None if unavailable"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 1024 ** 2
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm", 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 ** 2
+    except (OSError, ValueError):
+        return None
+
+def model_size_mb(model):
+    """Size of the model parameters in MB"""
+    try:
+        return sum(p.numel() * p.element_size() for p in model.parameters()) / 1024 ** 2
+    except AttributeError:
+        return None
+
+def load_corpus(max_chunks):
+    """Knowledge base chunks, from the embeddings file or the PDF"""
+    chunks, _ = load_embeddings(PDF_CONFIG["embeddings_file"])
+    if not chunks:
+        chunks = extract_text_from_pdf(PATHS["pdf_file"])
+    return chunks[:max_chunks] if max_chunks else chunks
+
+def top_k(query_vectors, chunk_vectors, k):
+    """Top-k chunk indices per query by cosine similarity"""
+    queries = query_vectors / np.linalg.norm(query_vectors, axis=1, keepdims=True)
+    documents = chunk_vectors / np.linalg.norm(chunk_vectors, axis=1, keepdims=True)
+    return np.argsort(-(queries @ documents.T), axis=1)[:, :k]
+
+def benchmark_tier(tier, chunks, queries, batch_size, repeats):
+    """Load one tier and measure it"""
+    from sentence_transformers import SentenceTransformer
+
+    gc.collect()
+    rss_before = current_rss_mb()
+    start = time.perf_counter()
+    model = SentenceTransformer(EMBEDDING_MODEL_TIERS[tier])
+    load_s = time.perf_counter() - start
+
+    query_texts = ["Represent this query for retrieval: " + query for query in queries]
+    document_texts = ["Represent this document for retrieval: " + chunk for chunk in chunks]
+
+    # Warm-up so one-time allocation is not counted as latency
+    model.encode(query_texts[:1], convert_to_tensor=False)
+
+    latencies = []
+    for _ in range(repeats):
+        for text in query_texts:
+            start = time.perf_counter()
+            model.encode([text], convert_to_tensor=False)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    chunk_vectors = model.encode(document_texts, batch_size=batch_size, convert_to_tensor=False)
+    throughput = len(document_texts) / (time.perf_counter() - start)
+    query_vectors = model.encode(query_texts, convert_to_tensor=False)
+
+    rss_after = current_rss_mb()
+    result = {
+        "tier": tier,
+        "model": EMBEDDING_MODEL_TIERS[tier],
+        "load_s": load_s,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "throughput": throughput,
+        "params_mb": model_size_mb(model),
+        "rss_mb": rss_after - rss_before if rss_before is not None and rss_after is not None else None,
+        "query_vectors": np.asarray(query_vectors),
+        "chunk_vectors": np.asarray(chunk_vectors)
+    }
+    del model
+    gc.collect()
+    return result
+
+def format_mb(value):
+    return f"{value:8.0f}" if value is not None else "     n/a"
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the embedding model tiers")
+    parser.add_argument("--tiers", nargs="+", default=list(EMBEDDING_MODEL_TIERS), choices=list(EMBEDDING_MODEL_TIERS))
+    parser.add_argument("--chunks", type=int, default=400, help="Chunks to encode (0 for all)")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--repeats", type=int, default=3, help="Passes over the sample queries")
+    parser.add_argument("--k", type=int, default=5, help="Cutoff for retrieval agreement")
+    args = parser.parse_args()
+
+    chunks = load_corpus(args.chunks)
+    if not chunks:
+        print("❌ No knowledge base chunks found")
+        sys.exit(1)
+
+    print("KKH Nursing Chatbot - Embedding Tier Benchmark")
+    print("=" * 40)
+    print(f"Chunks: {len(chunks)}  Queries: {len(SAMPLE_QUESTIONS)}  CPU threads: {os.cpu_count()}")
+
+    tiers = list(args.tiers)
+    if "large" not in tiers:
+        tiers.append("large")  # reference for retrieval agreement
+    results = {}
+    for tier in tiers:
+        print(f"\nBenchmarking {tier} ({EMBEDDING_MODEL_TIERS[tier]})...")
+        results[tier] = benchmark_tier(tier, chunks, SAMPLE_QUESTIONS, args.batch_size, args.repeats)
+
+    reference = results["large"]
+    reference_top = top_k(reference["query_vectors"], reference["chunk_vectors"], args.k)
+
+    print("\n" + "=" * 40)
+    print(f"{'tier':6s} {'load s':>7s} {'p50 ms':>8s} {'p95 ms':>8s} {'chunks/s':>9s} "
+          f"{'params MB':>9s} {'RSS MB':>8s} {'top-1 agree':>11s} {f'overlap@{args.k}':>10s}")
+    for tier in args.tiers:
+        result = results[tier]
+        tier_top = top_k(result["query_vectors"], result["chunk_vectors"], args.k)
+        top1 = float(np.mean(tier_top[:, 0] == reference_top[:, 0]))
+        overlap = float(np.mean([len(set(a) & set(b)) / args.k for a, b in zip(tier_top, reference_top)]))
+        print(f"{tier:6s} {result['load_s']:7.1f} {result['p50_ms']:8.1f} {result['p95_ms']:8.1f} "
+              f"{result['throughput']:9.1f} {format_mb(result['params_mb']):>9s} {format_mb(result['rss_mb'])} "
+              f"{top1:11.2f} {overlap:10.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Retrieval benchmark for the KKH Nursing Chatbot
+Measures dense scan latency, recall@k of the reduced-dimension prefilter and
+the speedup of the multi-threaded sharded scan.
+
+Usage:
+    python benchmark_retrieval.py [--chunks N] [--dim D] [--k K]
+
+To reproduce Streamlit's thread-limited BLAS, run with OMP_NUM_THREADS=1
+(and OPENBLAS_NUM_THREADS=1 / MKL_NUM_THREADS=1).
+
+Uses the vectors in embedded_knowledge.json when present; otherwise (or with
+--chunks) a synthetic corpus with embedding-like low-rank structure.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from config import PDF_CONFIG, RETRIEVAL_CONFIG
+from utils.retrieval import RetrievalIndex, normalize_rows
+
+def load_corpus(num_chunks, dim):
+    """Load the knowledge base vectors, or synthesize a corpus"""
+    if not num_chunks and os.path.exists(PDF_CONFIG["embeddings_file"]):
+        with open(PDF_CONFIG["embeddings_file"], 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return data["chunks"], np.asarray(data["embeddings"], dtype=np.float32)
+    
+    num_chunks = num_chunks or 20000
+    rng = np.random.default_rng(0)
+    # Real sentence embeddings concentrate most variance in few directions
+    latent = rng.normal(size=(num_chunks, 64)).astype(np.float32)
+    basis = rng.normal(size=(64, dim)).astype(np.float32)
+    noise = rng.normal(scale=0.3, size=(num_chunks, dim)).astype(np.float32)
+    embeddings = latent @ basis + noise
+    return [f"chunk {i}" for i in range(num_chunks)], embeddings
+
+def time_queries(search, queries, repeats=3):
+    """Mean milliseconds per query"""
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for query in queries:
+            search(query)
+    return (time.perf_counter() - start) * 1000 / (repeats * len(queries))
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dense retrieval")
+    parser.add_argument("--chunks", type=int, default=0, help="Synthetic corpus size")
+    parser.add_argument("--dim", type=int, default=1024, help="Synthetic embedding dimension")
+    parser.add_argument("--k", type=int, default=10, help="Recall cutoff")
+    parser.add_argument("--queries", type=int, default=100, help="Number of sample queries")
+    args = parser.parse_args()
+    
+    chunks, embeddings = load_corpus(args.chunks, args.dim)
+    rng = np.random.default_rng(1)
+    # Queries are perturbed chunk vectors, so they land near real content
+    picks = rng.choice(len(chunks), size=min(args.queries, len(chunks)), replace=False)
+    queries = normalize_rows(embeddings[picks] + rng.normal(scale=0.5, size=embeddings[picks].shape))
+    
+    print("KKH Nursing Chatbot - Retrieval Benchmark")
+    print("=" * 40)
+    print(f"Chunks: {len(chunks)}  Dimension: {embeddings.shape[1]}  Queries: {len(queries)}")
+    
+    base_config = dict(RETRIEVAL_CONFIG, hybrid_search=False, prefilter_dim=0, scan_shards=1)
+    index = RetrievalIndex(chunks, embeddings, **base_config)
+    exact_ms = time_queries(lambda q: index.dense_top_k(q, args.k, exact=True), queries)
+    print(f"\nFull scan:              {exact_ms:8.3f} ms/query")
+    
+    print("\nReduced-dimension prefilter:")
+    for method in ("pca", "truncate"):
+        for dim in (64, 128, 256):
+            start = time.perf_counter()
+            index.fit_projection(dim, method)
+            fit_s = time.perf_counter() - start
+            if index.reduced_matrix is None:
+                print(f"  {method:8s} dim={dim:4d}  skipped (corpus too small)")
+                continue
+            two_stage_ms = time_queries(lambda q: index.dense_top_k(q, args.k), queries)
+            recall = index.evaluate_prefilter_recall(queries, args.k)
+            print(f"  {method:8s} dim={dim:4d}  {two_stage_ms:8.3f} ms/query  "
+                  f"speedup {exact_ms / two_stage_ms:5.2f}x  recall@{args.k} {recall:.3f}  "
+                  f"(fit {fit_s:.2f}s)")
+    
+    print("\nSharded full scan:")
+    index.fit_projection(0)
+    exact_top, _ = index.dense_top_k(queries[0], args.k, exact=True)
+    for shards in (2, 4, 8, os.cpu_count() or 1):
+        index.scan_shards = shards
+        index.min_rows_per_shard = 1
+        sharded_top, _ = index.dense_top_k(queries[0], args.k, exact=True)
+        assert sharded_top.tolist() == exact_top.tolist(), "sharded scan disagrees with single scan"
+        sharded_ms = time_queries(lambda q: index.dense_top_k(q, args.k, exact=True), queries)
+        print(f"  shards={shards:3d}  {sharded_ms:8.3f} ms/query  speedup {exact_ms / sharded_ms:5.2f}x")
+
+if __name__ == "__main__":
+    main()
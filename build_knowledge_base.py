@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Build the knowledge base embeddings from the PDF ahead of time,
+optionally spreading the encoding over several worker processes.
+
+Usage:
+    python build_knowledge_base.py [--workers 8] [--threads-per-worker 4]
+
+An interrupted build resumes from its checkpoint when run again.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from config import EMBEDDING_CONFIG, PATHS, PDF_CONFIG
+from utils.embedding_pool import EmbeddingProcessPool
+from utils.model_loader import load_embedding_backend
+from utils.pdf_processor import create_embeddings, extract_text_from_pdf, save_embeddings
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the knowledge base embeddings")
+    parser.add_argument("--pdf", default=PATHS["pdf_file"], help="Knowledge base PDF")
+    parser.add_argument("--output", default=PDF_CONFIG["embeddings_file"], help="Embeddings file")
+    parser.add_argument("--workers", type=int, default=PDF_CONFIG["embedding_workers"],
+                        help="Encoder processes (0 encodes in this process)")
+    parser.add_argument("--threads-per-worker", type=int, default=PDF_CONFIG["embedding_threads_per_worker"],
+                        help="Threads pinned per worker (0 splits the CPUs evenly)")
+    parser.add_argument("--batch-size", type=int, default=PDF_CONFIG["embedding_batch_size"])
+    args = parser.parse_args()
+
+    if not os.path.exists(args.pdf):
+        print(f"❌ PDF not found: {args.pdf}")
+        sys.exit(1)
+
+    chunks, chunk_metadata = extract_text_from_pdf(args.pdf, with_metadata=True)
+    if not chunks:
+        print("❌ Failed to extract text from PDF")
+        sys.exit(1)
+    print(f"Extracted {len(chunks)} chunks from {args.pdf}")
+
+    pool = None
+    if args.workers:
+        pool = EmbeddingProcessPool(EMBEDDING_CONFIG, args.workers, args.threads_per_worker)
+        print(f"Encoding with {pool.workers} workers x {pool.threads_per_worker} threads "
+              f"({os.cpu_count()} CPU threads)")
+        # Workers load their own encoders; batches are bucketed by character length
+        model = None
+    else:
+        model = load_embedding_backend(EMBEDDING_CONFIG)
+
+    start = time.time()
+    try:
+        embeddings = create_embeddings(
+            chunks, model,
+            batch_size=args.batch_size,
+            checkpoint_path=PDF_CONFIG["embedding_checkpoint"],
+            model_name=EMBEDDING_CONFIG["model_name"],
+            pool=pool
+        )
+    finally:
+        if pool is not None:
+            pool.close()
+    elapsed = time.time() - start
+
+    save_embeddings(chunks, embeddings, args.output, chunk_metadata, model_name=EMBEDDING_CONFIG["model_name"])
+    print(f"✅ Embedded {len(chunks)} chunks in {elapsed:.1f}s ({len(chunks) / elapsed:.1f} chunks/s)")
+    print(f"Saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
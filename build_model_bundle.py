@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Package the embedding model into a versioned, checksummed local bundle
+for air-gapped servers.
+
+Usage:
+    python build_model_bundle.py [--model <name>] [--onnx-dir models/onnx/<tier>] [--verify]
+
+Copy the bundle directory to the server; the app then loads the model
+from it with the Hugging Face hub switched off. Set KKH_OFFLINE=1 there
+to fail fast if the bundle is missing rather than attempt a download.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from config import EMBEDDING_CONFIG
+from utils.model_bundle import BUNDLE_MANIFEST, build_model_bundle, find_model_bundle, verify_model_bundle
+from utils.onnx_encoder import ENCODER_CONFIG_FILE
+
+def main():
+    parser = argparse.ArgumentParser(description="Build an offline embedding model bundle")
+    parser.add_argument("--model", default=EMBEDDING_CONFIG["model_name"], help="Model name or directory")
+    parser.add_argument("--output", default=EMBEDDING_CONFIG["bundle_root"], help="Bundle root directory")
+    parser.add_argument("--onnx-dir", default=EMBEDDING_CONFIG["onnx_dir"],
+                        help="ONNX export to include, if present (see export_onnx_model.py)")
+    parser.add_argument("--no-onnx", action="store_true", help="Leave the ONNX export out")
+    parser.add_argument("--verify", action="store_true", help="Only verify the current bundle checksums")
+    args = parser.parse_args()
+    
+    if args.verify:
+        bundle_dir = find_model_bundle(args.output, args.model)
+        if bundle_dir is None:
+            print(f"❌ No bundle for {args.model} in {args.output}")
+            sys.exit(1)
+        try:
+            manifest = verify_model_bundle(bundle_dir)
+        except ValueError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        print(f"✅ {bundle_dir}: {len(manifest['files'])} files match their checksums")
+        return
+    
+    onnx_dir = None
+    if not args.no_onnx and os.path.isfile(os.path.join(args.onnx_dir, ENCODER_CONFIG_FILE)):
+        with open(os.path.join(args.onnx_dir, ENCODER_CONFIG_FILE), 'r', encoding='utf-8') as f:
+            source_model = json.load(f).get("source_model")
+        if source_model == args.model:
+            onnx_dir = args.onnx_dir
+        else:
+            print(f"⚠️ Skipping {args.onnx_dir}: exported from {source_model}, not {args.model}")
+    
+    print(f"Bundling {args.model}{' with ONNX export' if onnx_dir else ''}...")
+    start = time.time()
+    bundle_dir = build_model_bundle(args.model, args.output, onnx_dir)
+    with open(os.path.join(bundle_dir, BUNDLE_MANIFEST), 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    size_mb = sum(entry["size"] for entry in manifest["files"].values()) / 1024 ** 2
+    print(f"✅ Bundle {manifest['version']} written to {bundle_dir} "
+          f"({len(manifest['files'])} files, {size_mb:.0f} MB) in {time.time() - start:.1f}s")
+
+if __name__ == "__main__":
+    main()
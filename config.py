@@ -1,19 +1,123 @@
 # Configuration settings for KKH Nursing Chatbot
 
+import os
+
 # LM Studio Configuration
 LM_STUDIO_CONFIG = {
     "base_url": "http://localhost:1234",
+    "backends": [],  # more OpenAI-compatible servers, e.g. {"base_url": "http://gpu-2:1234", "model_name": "..."}
+    "backend_failure_threshold": 3,  # consecutive failures before a server is taken out of rotation
+    "backend_ejection_seconds": 30,  # minimum time out; a passing health probe brings it back
     "model_name": "OpenHermes-2.5-Mistral-7B",
-    "timeout": 30,
+    "timeout": 30,  # read timeout per response, seconds
+    "connect_timeout": 3,
+    "health_timeout": 5,
+    "max_retries": 2,  # connection errors and 502/503/504, with exponential backoff
+    "retry_backoff": 0.5,
+    "pool_size": 10,  # keep-alive connections shared by all sessions
+    "max_concurrency": 2,  # generations per server at once; the rest wait for a slot
+    "max_queue": 16,  # generations allowed to wait; beyond this requests are refused with a retry hint
+    "priorities": {"quick": 0, "standard": 1, "detailed": 2},  # queue order by response type, lowest first
+    "health_interval": 15,  # seconds between background health probes
+    "health_ttl": 45,  # a successful probe older than this counts as down
     "default_temperature": 0.7,
-    "max_tokens": 500
+    "max_tokens": 500,
+    "stream_responses": True  # show the answer token by token as it is generated
+}
+
+# Embedding Model Tiers (same e5 family, trading quality for speed and memory)
+# Compare them on the knowledge base with: python benchmark_embeddings.py
+EMBEDDING_MODEL_TIERS = {
+    "small": "intfloat/multilingual-e5-small",
+    "base": "intfloat/multilingual-e5-base",
+    "large": "intfloat/multilingual-e5-large-instruct"
 }
 
+# Select the tier per deployment with the KKH_EMBEDDING_TIER environment variable
+EMBEDDING_TIER = os.environ.get("KKH_EMBEDDING_TIER", "large")
+if EMBEDDING_TIER not in EMBEDDING_MODEL_TIERS:
+    raise ValueError(
+        f"Unknown KKH_EMBEDDING_TIER {EMBEDDING_TIER!r}; choose one of: {', '.join(EMBEDDING_MODEL_TIERS)}"
+    )
+
 # Embedding Model Configuration
 EMBEDDING_CONFIG = {
-    "model_name": "intfloat/multilingual-e5-large-instruct",
+    "tier": EMBEDDING_TIER,
+    "model_name": EMBEDDING_MODEL_TIERS[EMBEDDING_TIER],
+    "backend": "torch",  # "torch" or "onnx" (run export_onnx_model.py first)
+    "onnx_dir": f"models/onnx/{EMBEDDING_TIER}",  # one export per tier
+    "onnx_threads": 0,
+    "bundle_root": "models/bundles",  # written by build_model_bundle.py; used offline when present
+    "offline": os.environ.get("KKH_OFFLINE", "0") == "1",  # fail instead of downloading without a bundle
+    # Loads check bundle files against the manifest sizes; full SHA-256 hashing of the
+    # multi-GB bundle runs with build_model_bundle.py --verify, or on every load if True
+    "bundle_verify_checksums": False,
     "similarity_threshold": 0.1,
-    "top_k_results": 1
+    "top_k_results": 1,
+    "query_cache_size": 1024,
+    "micro_batching": True,
+    "max_batch_size": 32,
+    "max_batch_wait_ms": 5
+}
+
+# Retrieval Configuration (BM25 + dense hybrid search)
+RETRIEVAL_CONFIG = {
+    "hybrid_search": True,
+    "bm25_k1": 1.5,
+    "bm25_b": 0.75,
+    "rrf_k": 60,
+    "lexical_candidates": 50,
+    "prefilter_dim": 128,
+    "prefilter_method": "pca",
+    "prefilter_shortlist": 200,
+    "scan_shards": 4,
+    "min_rows_per_shard": 4096
+}
+
+# Prompt Context Configuration
+CONTEXT_CONFIG = {
+    "top_k": 5,
+    "token_budget": 1024,  # LLM tokens of retrieved context in the prompt
+    # Tokens are counted with the embedding model's tokenizer, which splits text into fewer
+    # pieces than the generation model's (XLM-R vs. Mistral); counts are scaled by this margin
+    "token_margin": 1.3
+}
+
+# Extractive Fast-Answer Configuration
+FAST_ANSWER_CONFIG = {
+    "enabled": True,
+    "confidence_threshold": 0.9,
+    "max_sentences": 3,
+    "source_hits": 3
+}
+
+# Semantic Answer Cache Configuration
+ANSWER_CACHE_CONFIG = {
+    "enabled": True,
+    "similarity_threshold": 0.95,
+    "ttl_seconds": 21600,
+    "max_entries": 512
+}
+
+# Request deadlines and the LLM circuit breaker
+RESILIENCE_CONFIG = {
+    "request_deadline_seconds": 20,  # budget per question, retrieval plus time to first token when streaming
+    "min_generation_seconds": 2,  # with less budget left, answer from the guidelines instead
+    "breaker_failure_threshold": 3,  # consecutive failures or slow calls that open the breaker
+    "breaker_slow_first_token_seconds": 15,  # streamed answers starting later count as failures
+    # Non-streamed answers are timed whole; a full max_tokens answer may need the whole LM Studio timeout
+    "breaker_slow_call_seconds": LM_STUDIO_CONFIG["timeout"],
+    "breaker_reset_seconds": 30  # time open before a probe request is let through
+}
+
+# LLM Response Cache (persistent, shared across restarts)
+LLM_CACHE_CONFIG = {
+    "enabled": True,
+    "path": "llm_response_cache.sqlite3",
+    "ttl_seconds": 7 * 24 * 3600,
+    "max_entries": 5000,
+    "max_temperature": 0.7,  # hotter requests are meant to vary and are not cached
+    "cache_sampled": False  # cache responses regardless of temperature
 }
 
 # PDF Processing Configuration
@@ -21,7 +125,11 @@ PDF_CONFIG = {
     "chunk_size": 500,
     "chunk_overlap": 50,
     "min_chunk_length": 20,
-    "embeddings_file": "embedded_knowledge.json"
+    "embeddings_file": "embedded_knowledge.json",
+    "embedding_batch_size": 32,
+    "embedding_checkpoint": "embedded_knowledge.partial.jsonl",
+    "embedding_workers": 0,  # encoder processes for the build, 0 to encode in the app process
+    "embedding_threads_per_worker": 0  # 0 splits the CPU threads evenly across workers
 }
 
 # Quiz Configuration
@@ -60,6 +168,20 @@ PATHS = {
     "chat_history": "chat_history.json"
 }
 
+# Sample questions (app_fixed.py quick-start buttons, embedding benchmarks and ONNX parity checks)
+SAMPLE_QUESTIONS = [
+    "What are the standard vital signs monitoring procedures?",
+    "How do I calculate pediatric dosage for medications?",
+    "What are the infection control protocols?",
+    "How should I handle emergency situations in pediatric care?",
+    "What are the proper hand hygiene procedures?",
+    "How do I assess pain in pediatric patients?",
+    "What are the wound care best practices?",
+    "How do I manage IV therapy safely?",
+    "What are the fall prevention strategies?",
+    "How do I document patient care properly?"
+]
+
 # System Messages
 SYSTEM_MESSAGES = {
     "default": "You are a helpful nursing chatbot. Only answer based on the context provided.",
@@ -0,0 +1,116 @@
+"""
+Shared pytest fixtures: a fake LM Studio server for the LLM client tests
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+
+class FakeLMStudio:
+    """OpenAI-compatible test server with scriptable latency, status codes and output"""
+
+    def __init__(self):
+        self.models = [{"id": "test-model"}]
+        self.content = "Check the cannula site hourly."
+        self.tokens = ["Check ", "the ", "cannula."]
+        self.statuses = []  # popped per request; 200 once empty
+        self.delay = 0.0  # before the response headers
+        self.token_delay = 0.0  # between streamed tokens
+        self.requests = []
+        self.client_ports = set()
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _status(self):
+                with server._lock:
+                    server.client_ports.add(self.client_address[1])
+                    return server.statuses.pop(0) if server.statuses else 200
+
+            def _send_json(self, status, payload):
+                body = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                status = self._status()
+                self._send_json(status, {"data": server.models} if status == 200 else {"error": "unavailable"})
+
+            def do_POST(self):
+                data = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                status = self._status()
+                with server._lock:
+                    server.requests.append(data)
+                time.sleep(server.delay)
+                if status != 200:
+                    self._send_json(status, {"error": "unavailable"})
+                elif not data.get("stream"):
+                    self._send_json(200, {"choices": [{"message": {"content": server.content}}]})
+                else:
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/event-stream")
+                    self.send_header("Connection", "close")
+                    self.end_headers()
+                    try:
+                        for token in server.tokens:
+                            event = {"choices": [{"delta": {"content": token}}]}
+                            self.wfile.write(f"data: {json.dumps(event)}\n\n".encode('utf-8'))
+                            self.wfile.flush()
+                            time.sleep(server.token_delay)
+                        self.wfile.write(b"data: [DONE]\n\n")
+                    except (BrokenPipeError, ConnectionResetError):
+                        pass
+                    self.close_connection = True
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+
+    def config(self, **overrides):
+        """LM Studio settings pointing at this server"""
+        from config import LM_STUDIO_CONFIG
+        config = dict(LM_STUDIO_CONFIG, base_url=self.url, backends=[], retry_backoff=0.01)
+        config.update(overrides)
+        return config
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+@pytest.fixture
+def lm_studio():
+    server = FakeLMStudio()
+    yield server
+    server.close()
+
+@pytest.fixture
+def other_lm_studio():
+    """A second server, for tests with several backends"""
+    server = FakeLMStudio()
+    yield server
+    server.close()
+
+@pytest.fixture
+def llm_runner(lm_studio, monkeypatch):
+    """Shared runner, breaker and no response cache, pointed at the fake server"""
+    from utils import llm_interface
+    from utils.async_llm_client import AsyncLLMRunner, AsyncLMStudioClient
+    from utils.resilience import CircuitBreaker
+
+    breaker = CircuitBreaker(failure_threshold=3, slow_call_seconds=30, reset_seconds=30, slow_first_token_seconds=15)
+    runner = AsyncLLMRunner(AsyncLMStudioClient(lm_studio.config()), breaker)
+    monkeypatch.setattr(llm_interface, "get_async_llm_runner", lambda: runner)
+    monkeypatch.setattr(llm_interface, "get_response_cache", lambda: None)
+    yield runner
+    runner.close()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Export the embedding model to ONNX with int8 dynamic quantization
+and check that its vectors match the PyTorch model.
+
+Usage:
+    python export_onnx_model.py [--output models/onnx/<tier>] [--no-quantize]
+
+Set EMBEDDING_CONFIG["backend"] = "onnx" in config.py to use the export.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from config import EMBEDDING_CONFIG, PDF_CONFIG, SAMPLE_QUESTIONS
+from utils.onnx_encoder import OnnxEncoder, check_onnx_parity, export_onnx_model
+from utils.pdf_processor import load_embeddings
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the embedding model to ONNX")
+    parser.add_argument("--model", default=EMBEDDING_CONFIG["model_name"], help="Model name or directory")
+    parser.add_argument("--output", default=EMBEDDING_CONFIG["onnx_dir"], help="Output directory")
+    parser.add_argument("--no-quantize", action="store_true", help="Skip int8 quantization")
+    parser.add_argument("--min-similarity", type=float, default=0.98, help="Parity threshold")
+    args = parser.parse_args()
+    
+    print(f"Exporting {args.model} to {args.output}...")
+    start = time.time()
+    model_path = export_onnx_model(args.model, args.output, quantize=not args.no_quantize)
+    print(f"✅ Exported {model_path} in {time.time() - start:.1f}s")
+    
+    print("\nChecking parity against PyTorch...")
+    from sentence_transformers import SentenceTransformer
+    reference = SentenceTransformer(args.model)
+    encoder = OnnxEncoder(args.output)
+    
+    chunks, _ = load_embeddings(PDF_CONFIG["embeddings_file"])
+    samples = ["Represent this query for retrieval: " + query for query in SAMPLE_QUESTIONS]
+    samples += ["Represent this document for retrieval: " + chunk for chunk in chunks[:40]]
+    parity = check_onnx_parity(reference, encoder, samples, args.min_similarity)
+    
+    print(f"Min cosine similarity:  {parity['min_similarity']:.4f}")
+    print(f"Mean cosine similarity: {parity['mean_similarity']:.4f}")
+    if parity["passed"]:
+        print("✅ ONNX vectors match the PyTorch model")
+    else:
+        print(f"❌ Parity below {args.min_similarity}; keep the torch backend or export without quantization")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Behavioural tests for the asyncio LM Studio client and its blocking runner
+"""
+import asyncio
+import queue
+import threading
+import time
+import aiohttp
+import pytest
+from utils.async_llm_client import LLM_REQUEST_ERRORS, _FINISHED
+from utils.resilience import CircuitBreaker, CircuitOpenError
+
+def wait_until(condition, seconds=5):
+    deadline = time.time() + seconds
+    while not condition():
+        if time.time() > deadline:
+            raise AssertionError("condition not reached")
+        time.sleep(0.01)
+
+def test_chat_completion_fills_in_defaults(lm_studio, llm_runner):
+    messages = [{"role": "user", "content": "question"}]
+    assert llm_runner.chat_completion(messages) == lm_studio.content
+    request = lm_studio.requests[0]
+    assert request["model"] == llm_runner.client.model_name
+    assert request["max_tokens"] == llm_runner.client.max_tokens
+    assert "stream" not in request
+
+def test_timeout_cancels_the_generation(lm_studio, llm_runner):
+    lm_studio.delay = 1.0
+    start = time.monotonic()
+    with pytest.raises(asyncio.TimeoutError):
+        llm_runner.chat_completion([{"role": "user", "content": "slow"}], timeout=0.2)
+    assert time.monotonic() - start < 0.9
+    # Nobody is waiting any more, so the request and its slot are released
+    wait_until(lambda: llm_runner.client.in_flight == 0)
+    assert llm_runner.client.pool.backends[0].outstanding == 0
+    # Keeping the caller waiting past its timeout counts against the backend
+    wait_until(lambda: llm_runner.client.pool.backends[0].failures == 1)
+
+def test_closing_a_stream_cancels_the_generation(lm_studio, llm_runner):
+    lm_studio.tokens = [f"token{i} " for i in range(50)]
+    lm_studio.token_delay = 0.05
+    stream = llm_runner.stream_chat_completion([{"role": "user", "content": "long"}])
+    assert next(stream) == "token0 "
+    stream.close()
+    wait_until(lambda: llm_runner.client.in_flight == 0)
+    assert llm_runner.stats()["in_flight_keys"] == 0
+
+def test_first_token_timeout(lm_studio, llm_runner):
+    lm_studio.delay = 1.0
+    stream = llm_runner.stream_chat_completion([{"role": "user", "content": "slow"}], first_token_timeout=0.2)
+    with pytest.raises(asyncio.TimeoutError):
+        next(stream)
+    wait_until(lambda: llm_runner.client.in_flight == 0)
+
+def test_error_status_raises_after_retries(lm_studio, llm_runner):
+    lm_studio.statuses = [503, 503, 503]
+    with pytest.raises(aiohttp.ClientResponseError) as error:
+        llm_runner.chat_completion([{"role": "user", "content": "question"}])
+    assert error.value.status == 503
+    assert len(lm_studio.requests) == llm_runner.client.max_retries + 1
+
+def drain(subscriber):
+    items = []
+    while True:
+        item = subscriber.get(timeout=5)
+        if item is _FINISHED:
+            return items
+        items.append(item)
+
+def run_in_threads(function, count):
+    results = [None] * count
+    def worker(index):
+        results[index] = function()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+def test_identical_requests_share_one_generation(lm_studio, llm_runner):
+    lm_studio.delay = 0.3
+    messages = [{"role": "user", "content": "shared"}]
+    results = run_in_threads(lambda: llm_runner.chat_completion(messages, key="shared"), 3)
+    assert results == [lm_studio.content] * 3
+    assert len(lm_studio.requests) == 1
+    assert llm_runner.generations == 1 and llm_runner.coalesced == 2
+
+def test_late_subscriber_receives_earlier_tokens(lm_studio, llm_runner):
+    lm_studio.tokens = [f"token{i} " for i in range(6)]
+    lm_studio.token_delay = 0.05
+    messages = [{"role": "user", "content": "shared"}]
+    first = llm_runner.stream_chat_completion(messages, key="shared")
+    assert next(first) == "token0 "
+    second = llm_runner.stream_chat_completion(messages, key="shared")
+    assert list(second) == lm_studio.tokens
+    assert list(first) == lm_studio.tokens[1:]
+    assert llm_runner.generations == 1
+
+def test_leaving_subscriber_does_not_cancel_for_others(lm_studio, llm_runner):
+    lm_studio.tokens = [f"token{i} " for i in range(6)]
+    lm_studio.token_delay = 0.05
+    messages = [{"role": "user", "content": "shared"}]
+    first = llm_runner.stream_chat_completion(messages, key="shared")
+    second = llm_runner.stream_chat_completion(messages, key="shared")
+    next(first)
+    first.close()
+    assert list(second) == lm_studio.tokens
+
+def test_caller_racing_a_cancellation_starts_a_new_generation(lm_studio, llm_runner):
+    lm_studio.delay = 0.2
+    messages = [{"role": "user", "content": "raced"}]
+    first, second = queue.Queue(), queue.Queue()
+
+    def source():
+        return llm_runner.client.stream_chat_completion(messages)
+
+    async def leave_then_join():
+        # The last subscriber leaves and a new caller joins before the
+        # cancelled generation has unwound
+        flight = await llm_runner._join("raced", first, source)
+        llm_runner._leave(flight, first)
+        return await llm_runner._join("raced", second, source)
+
+    flight = llm_runner.submit(leave_then_join()).result()
+    assert drain(second) == lm_studio.tokens
+    assert flight.end is _FINISHED
+    assert llm_runner.generations == 2
+
+def test_cancelled_generation_ends_with_a_request_error(lm_studio, llm_runner):
+    lm_studio.delay = 1.0
+    subscriber = queue.Queue()
+
+    def source():
+        return llm_runner.client.stream_chat_completion([{"role": "user", "content": "cancelled"}])
+
+    flight = llm_runner.submit(llm_runner._join("cancelled", subscriber, source)).result()
+    llm_runner.loop.call_soon_threadsafe(flight.task.cancel)
+    end = subscriber.get(timeout=5)
+    assert isinstance(end, LLM_REQUEST_ERRORS)
+
+def test_shared_failed_generation_counts_once(lm_studio, llm_runner):
+    lm_studio.delay = 0.3
+    lm_studio.statuses = [500]
+    messages = [{"role": "user", "content": "shared"}]
+
+    def call():
+        try:
+            llm_runner.chat_completion(messages, key="shared")
+        except aiohttp.ClientResponseError as e:
+            return e.status
+
+    assert run_in_threads(call, 3) == [500] * 3
+    assert llm_runner.generations == 1
+    assert llm_runner.breaker.stats()["consecutive_failures"] == 1
+    assert llm_runner.breaker.state == CircuitBreaker.CLOSED
+
+def test_open_breaker_refuses_new_generations(lm_studio, llm_runner):
+    for _ in range(llm_runner.breaker.failure_threshold):
+        llm_runner.breaker.record_failure()
+    with pytest.raises(CircuitOpenError):
+        llm_runner.chat_completion([{"role": "user", "content": "question"}])
+    assert not lm_studio.requests
+
+def test_hung_server_opens_the_breaker(lm_studio, llm_runner):
+    lm_studio.delay = 2.0
+    messages = [{"role": "user", "content": "hung"}]
+    for _ in range(llm_runner.breaker.failure_threshold):
+        with pytest.raises(asyncio.TimeoutError):
+            next(llm_runner.stream_chat_completion(messages, first_token_timeout=0.1))
+    wait_until(lambda: llm_runner.breaker.state == CircuitBreaker.OPEN)
+    with pytest.raises(CircuitOpenError):
+        llm_runner.chat_completion(messages, timeout=0.1)
+
+def test_timed_out_completion_is_a_failure(lm_studio, llm_runner):
+    lm_studio.delay = 1.0
+    with pytest.raises(asyncio.TimeoutError):
+        llm_runner.chat_completion([{"role": "user", "content": "slow"}], timeout=0.1)
+    wait_until(lambda: llm_runner.breaker.stats()["consecutive_failures"] == 1)
+
+def test_closed_stream_is_not_a_failure(lm_studio, llm_runner):
+    lm_studio.delay = 1.0
+    subscriber = queue.Queue()
+
+    def source():
+        return llm_runner.client.stream_chat_completion([{"role": "user", "content": "closed"}])
+
+    flight = llm_runner.submit(llm_runner._join("closed", subscriber, source, stream=True)).result()
+    # What closing the stream before its first token does
+    llm_runner.loop.call_soon_threadsafe(llm_runner._leave, flight, subscriber)
+    wait_until(lambda: flight.done)
+    assert llm_runner.breaker.stats()["consecutive_failures"] == 0
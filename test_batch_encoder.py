@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Behavioural tests for micro-batched query encoding
+"""
+import threading
+import numpy as np
+import pytest
+from utils.batch_encoder import MicroBatchEncoder
+
+class RecordingModel:
+    """Encodes each sentence as [len(sentence)] and records forward passes"""
+
+    def __init__(self):
+        self.calls = []
+        self.tokenizer = "tokenizer"
+
+    def encode(self, sentences, convert_to_tensor=False, **kwargs):
+        self.calls.append(list(sentences))
+        return np.array([[float(len(sentence))] for sentence in sentences])
+
+def test_concurrent_requests_share_a_forward_pass():
+    model = RecordingModel()
+    encoder = MicroBatchEncoder(model, max_batch_size=32, max_wait_ms=200)
+    results = {}
+    start = threading.Barrier(4)
+
+    def call(text):
+        start.wait()
+        results[text] = encoder.encode([text])
+
+    threads = [threading.Thread(target=call, args=("x" * n,)) for n in range(1, 5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    encoder.close()
+    assert len(model.calls) < 4
+    for text, vectors in results.items():
+        assert vectors.tolist() == [[float(len(text))]]
+
+def test_single_string_returns_one_vector():
+    encoder = MicroBatchEncoder(RecordingModel(), max_wait_ms=0)
+    assert encoder.encode("abc").tolist() == [3.0]
+    encoder.close()
+
+def test_large_requests_bypass_the_queue():
+    model = RecordingModel()
+    encoder = MicroBatchEncoder(model, max_batch_size=2)
+    encoder.encode(["a", "b", "c"])
+    assert encoder.stats()["batches"] == 0 and model.calls == [["a", "b", "c"]]
+    encoder.close()
+
+def test_model_errors_reach_the_caller():
+    class FailingModel(RecordingModel):
+        def encode(self, sentences, convert_to_tensor=False, **kwargs):
+            raise RuntimeError("out of memory")
+    encoder = MicroBatchEncoder(FailingModel(), max_wait_ms=0)
+    with pytest.raises(RuntimeError, match="out of memory"):
+        encoder.encode(["a"])
+    encoder.close()
+
+def test_model_attributes_are_exposed():
+    encoder = MicroBatchEncoder(RecordingModel())
+    assert encoder.tokenizer == "tokenizer"
+    encoder.close()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Behavioural tests for the query embedding, semantic answer and LLM response caches
+"""
+import numpy as np
+from utils.answer_cache import SemanticAnswerCache
+from utils.embedding_cache import QueryEmbeddingCache, normalize_query_text
+from utils.response_cache import SQLiteResponseCache
+
+class FakeModel:
+    pass
+
+def test_query_text_normalization():
+    assert normalize_query_text("  What is   SEPSIS?\n") == "what is sepsis?"
+
+def test_embedding_cache_hit_for_same_normalized_query():
+    cache = QueryEmbeddingCache(max_entries=4)
+    model = FakeModel()
+    cache.put(model, "Fever management", np.ones(3, dtype=np.float32))
+    assert cache.get(model, "fever   MANAGEMENT") is not None
+    assert cache.get(model, "sepsis") is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+def test_embedding_cache_evicts_least_recently_used():
+    cache = QueryEmbeddingCache(max_entries=2)
+    model = FakeModel()
+    cache.put(model, "a", np.zeros(2))
+    cache.put(model, "b", np.zeros(2))
+    cache.get(model, "a")
+    cache.put(model, "c", np.zeros(2))
+    assert cache.get(model, "a") is not None
+    assert cache.get(model, "b") is None
+
+def test_embedding_cache_empties_for_another_model():
+    cache = QueryEmbeddingCache()
+    first, second = FakeModel(), FakeModel()
+    cache.put(first, "query", np.zeros(2))
+    assert cache.get(second, "query") is None
+    assert cache.stats()["entries"] == 0
+
+def test_cached_vectors_are_read_only():
+    cache = QueryEmbeddingCache()
+    model = FakeModel()
+    cache.put(model, "query", np.zeros(2))
+    assert not cache.get(model, "query").flags.writeable
+
+def test_answer_cache_serves_rephrasing_with_same_chunks():
+    cache = SemanticAnswerCache(similarity_threshold=0.95, max_entries=4)
+    cache.store(np.array([1.0, 0.0, 0.0]), [3, 1], "answer")
+    assert cache.lookup(np.array([0.99, 0.05, 0.0]), [3, 1]) == "answer"
+    # Same question, different retrieved chunks: not the same answer
+    assert cache.lookup(np.array([1.0, 0.0, 0.0]), [1, 3]) is None
+    assert cache.lookup(np.array([0.0, 1.0, 0.0]), [3, 1]) is None
+
+def test_answer_cache_requires_the_same_numbers():
+    cache = SemanticAnswerCache(similarity_threshold=0.95)
+    vector = np.array([1.0, 0.0, 0.0])
+    cache.store(vector, [2], "150 mg", "Paracetamol dose for a 10 kg child?")
+    assert cache.lookup(vector, [2], "paracetamol dose for a 10kg child") == "150 mg"
+    assert cache.lookup(vector, [2], "Paracetamol dose for a 20 kg child?") is None
+    assert cache.lookup(vector, [2], "Paracetamol dose for a child?") is None
+
+def test_answer_cache_expires_entries():
+    cache = SemanticAnswerCache(ttl_seconds=-1)
+    cache.store(np.array([1.0, 0.0]), [0], "stale")
+    assert cache.lookup(np.array([1.0, 0.0]), [0]) is None
+    assert cache.stats()["entries"] == 0
+
+def test_answer_cache_evicts_least_recently_used():
+    cache = SemanticAnswerCache(max_entries=2)
+    cache.store(np.array([1.0, 0.0, 0.0]), [0], "a")
+    cache.store(np.array([0.0, 1.0, 0.0]), [0], "b")
+    cache.lookup(np.array([1.0, 0.0, 0.0]), [0])
+    cache.store(np.array([0.0, 0.0, 1.0]), [0], "c")
+    assert cache.lookup(np.array([1.0, 0.0, 0.0]), [0]) == "a"
+    assert cache.lookup(np.array([0.0, 1.0, 0.0]), [0]) is None
+
+def test_answer_cache_drops_answers_for_new_knowledge_base():
+    cache = SemanticAnswerCache(kb_version="v1")
+    cache.store(np.array([1.0, 0.0]), [0], "old")
+    cache.set_knowledge_base_version("v2")
+    assert cache.lookup(np.array([1.0, 0.0]), [0]) is None
+
+def llm_request(question, temperature=0.2):
+    return {"model": "m", "messages": [{"role": "user", "content": question}], "temperature": temperature, "max_tokens": 50}
+
+def test_response_cache_round_trip_survives_reopen(tmp_path):
+    path = str(tmp_path / "responses.sqlite3")
+    SQLiteResponseCache(path).put(llm_request("dose?"), "15 mg/kg")
+    cache = SQLiteResponseCache(path)
+    assert cache.get(llm_request("dose?")) == "15 mg/kg"
+    assert cache.get(llm_request("other?")) is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+def test_response_cache_bypasses_hot_sampling(tmp_path):
+    cache = SQLiteResponseCache(str(tmp_path / "responses.sqlite3"), max_temperature=0.5)
+    cache.put(llm_request("dose?", temperature=0.9), "varies")
+    assert cache.get(llm_request("dose?", temperature=0.9)) is None
+    assert cache.stats()["bypassed"] == 1 and cache.stats()["entries"] == 0
+
+def test_response_cache_skips_empty_responses(tmp_path):
+    cache = SQLiteResponseCache(str(tmp_path / "responses.sqlite3"))
+    cache.put(llm_request("a"), "")
+    cache.put(llm_request("b"), " \n\t")
+    assert cache.stats()["entries"] == 0
+    assert cache.get(llm_request("b")) is None
+
+def test_response_cache_expires_and_evicts(tmp_path):
+    expired = SQLiteResponseCache(str(tmp_path / "expired.sqlite3"), ttl_seconds=-1)
+    expired.put(llm_request("a"), "old")
+    assert expired.get(llm_request("a")) is None
+    cache = SQLiteResponseCache(str(tmp_path / "responses.sqlite3"), max_entries=2)
+    cache.put(llm_request("a"), "A")
+    cache.put(llm_request("b"), "B")
+    cache.put(llm_request("c"), "C")
+    assert cache.stats()["entries"] == 2
+    assert cache.get(llm_request("a")) is None
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Behavioural tests for the token-budgeted context packer
+"""
+from utils.context_packer import compact_table_text, count_tokens, merge_overlapping_text, pack_context
+
+def test_overlapping_text_is_merged_once():
+    first = "Check the patient's identity band before giving any medication."
+    second = "before giving any medication. Record the dose in the chart."
+    merged = merge_overlapping_text(first, second)
+    assert merged == "Check the patient's identity band before giving any medication. Record the dose in the chart."
+
+def test_table_padding_is_removed():
+    assert compact_table_text("Drug |  None | Dose\n |  | \nParacetamol | 15   mg/kg") == "Drug | Dose\nParacetamol | 15 mg/kg"
+
+def test_neighbouring_chunks_become_one_passage():
+    chunks = ["alpha " * 10, "beta " * 10, "gamma " * 10]
+    metadata = [{"page": 1}, {"page": 1}, {"page": 1}]
+    context, included = pack_context([(1, 0.9), (0, 0.8)], chunks, chunk_metadata=metadata)
+    assert included == [0, 1]
+    assert context.count("\n\n") == 0
+
+def test_passages_are_added_best_first_within_budget():
+    # Non-adjacent chunks stay separate passages of 100 estimated tokens each
+    chunks = ["a" * 400, "", "b" * 400, "", "c" * 400]
+    context, included = pack_context([(4, 0.9), (0, 0.8), (2, 0.7)], chunks, token_budget=210)
+    assert included == [4, 0]
+    assert count_tokens(context) <= 210
+
+def test_best_passage_is_truncated_when_over_budget():
+    chunks = ["word " * 1000]
+    context, included = pack_context([(0, 0.9)], chunks, token_budget=50)
+    assert included == [0]
+    assert 0 < count_tokens(context) <= 50
+
+def test_token_margin_shrinks_the_budget():
+    chunks = ["word " * 1000]
+    context, _ = pack_context([(0, 0.9)], chunks, token_budget=100, token_margin=2.0)
+    assert count_tokens(context) <= 50
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Behavioural tests for embedding tier selection and on-disk encoder artifacts
+"""
+import json
+import os
+import subprocess
+import sys
+import threading
+import pytest
+from utils.model_loader import BackgroundModelLoader
+from utils.onnx_encoder import ENCODER_CONFIG_FILE, OnnxEncoder
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+def import_config(tier):
+    env = dict(os.environ, KKH_EMBEDDING_TIER=tier)
+    return subprocess.run(
+        [sys.executable, "-c", "import config; print(config.EMBEDDING_CONFIG['model_name'], config.EMBEDDING_CONFIG['onnx_dir'])"],
+        cwd=ROOT, env=env, capture_output=True, text=True
+    )
+
+def test_tier_selects_model_and_onnx_dir():
+    result = import_config("small")
+    assert result.returncode == 0
+    assert result.stdout.split() == ["intfloat/multilingual-e5-small", "models/onnx/small"]
+
+def test_unknown_tier_fails_with_valid_choices():
+    result = import_config("bogus")
+    assert result.returncode != 0
+    assert "Unknown KKH_EMBEDDING_TIER 'bogus'; choose one of: small, base, large" in result.stderr
+
+def test_onnx_export_from_another_model_is_rejected(tmp_path):
+    with open(tmp_path / ENCODER_CONFIG_FILE, 'w', encoding='utf-8') as f:
+        json.dump({"source_model": "intfloat/multilingual-e5-small", "model_file": "model.onnx"}, f)
+    with pytest.raises(ValueError, match="made from intfloat/multilingual-e5-small"):
+        OnnxEncoder(str(tmp_path), expected_model="intfloat/multilingual-e5-large-instruct")
+
+class WarmupModel:
+    def __init__(self):
+        self.encoded = []
+
+    def encode(self, sentences, convert_to_tensor=False):
+        self.encoded.extend(sentences)
+
+def test_loader_warms_up_and_notifies_listeners():
+    release = threading.Event()
+    model = WarmupModel()
+    loader = BackgroundModelLoader(lambda: release.wait() and model)
+    notified = []
+    loader.add_done_callback(lambda finished: notified.append(finished.status))
+    assert loader.status == "warming_up" and not notified
+    release.set()
+    assert loader.wait(timeout=5)
+    loader._thread.join(timeout=5)
+    assert notified == ["ready"]
+    assert loader.model is model and model.encoded
+    # Listeners added after loading run at once
+    loader.add_done_callback(lambda finished: notified.append("late"))
+    assert notified == ["ready", "late"]
+
+def test_loader_reports_failure():
+    def fail():
+        raise OSError("model files missing")
+    loader = BackgroundModelLoader(fail)
+    assert loader.wait(timeout=5)
+    assert loader.status == "failed" and isinstance(loader.error, OSError)
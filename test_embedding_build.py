@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Behavioural tests for length-bucketed, checkpointed knowledge base encoding
+"""
+import json
+import numpy as np
+import pytest
+from utils.pdf_processor import compute_knowledge_base_version, create_embeddings, load_embedding_checkpoint
+
+CHUNKS = ["short", "a much longer chunk of guideline text", "mid length", "tiny", "another long chunk of text here"]
+
+class LengthModel:
+    """Embeds text as [len(text)]; no tokenizer, so lengths are measured in characters"""
+
+    def __init__(self, fail_after=None):
+        self.batches = []
+        self.fail_after = fail_after
+
+    def encode(self, sentences, batch_size=32, convert_to_tensor=False):
+        if self.fail_after is not None and len(self.batches) == self.fail_after:
+            raise KeyboardInterrupt()
+        self.batches.append(list(sentences))
+        return np.array([[float(len(sentence))] for sentence in sentences])
+
+def expected_vectors():
+    prefix = len("Represent this document for retrieval: ")
+    return [[float(prefix + len(chunk))] for chunk in CHUNKS]
+
+def test_batches_group_similar_lengths_and_keep_chunk_order():
+    model = LengthModel()
+    embeddings = create_embeddings(CHUNKS, model, batch_size=2, progress_callback=lambda *args: None)
+    assert embeddings == expected_vectors()
+    encoded_lengths = [len(text) for batch in model.batches for text in batch]
+    assert encoded_lengths == sorted(encoded_lengths)
+
+def test_interrupted_build_resumes_from_checkpoint(tmp_path):
+    checkpoint = str(tmp_path / "partial.jsonl")
+    with pytest.raises(KeyboardInterrupt):
+        create_embeddings(CHUNKS, LengthModel(fail_after=2), batch_size=2, checkpoint_path=checkpoint,
+                          progress_callback=lambda *args: None)
+    fingerprint = compute_knowledge_base_version(CHUNKS, "")
+    assert len(load_embedding_checkpoint(checkpoint, fingerprint)) == 4
+
+    # Simulate a line cut off by the interruption
+    with open(checkpoint, 'a', encoding='utf-8') as f:
+        f.write('{"indices": [0], "embeddings": [[')
+    resumed = LengthModel()
+    embeddings = create_embeddings(CHUNKS, resumed, batch_size=2, checkpoint_path=checkpoint,
+                                   progress_callback=lambda *args: None)
+    assert embeddings == expected_vectors()
+    assert sum(len(batch) for batch in resumed.batches) == 1
+    assert not (tmp_path / "partial.jsonl").exists()
+
+def test_checkpoint_of_another_build_is_ignored(tmp_path):
+    checkpoint = tmp_path / "partial.jsonl"
+    checkpoint.write_text(json.dumps({"fingerprint": "other"}) + "\n" + json.dumps({"indices": [0], "embeddings": [[1.0]]}) + "\n")
+    assert load_embedding_checkpoint(str(checkpoint), "current") == {}
+
+def test_progress_is_reported_per_batch():
+    progress = []
+    create_embeddings(CHUNKS, LengthModel(), batch_size=2, progress_callback=lambda done, total, rate: progress.append((done, total)))
+    assert progress == [(2, 5), (4, 5), (5, 5)]
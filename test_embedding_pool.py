@@ -0,0 +1,23 @@
+#!/usr/bin/env python3
+"""
+Behavioural tests for the knowledge base encoding worker pool
+"""
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+def test_pinning_limits_blas_loaded_before_the_initializer():
+    code = (
+        "import numpy\n"
+        "from threadpoolctl import threadpool_info, threadpool_limits\n"
+        "threadpool_limits(limits=4)\n"
+        "from utils.embedding_pool import _pin_threads\n"
+        "_pin_threads(1)\n"
+        "print(sorted({pool['num_threads'] for pool in threadpool_info()}))\n"
+    )
+    env = {key: value for key, value in os.environ.items() if not key.endswith("_NUM_THREADS")}
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "[1]"
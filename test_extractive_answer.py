@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Behavioural tests for extractive answers built from retrieved sentences
+"""
+import numpy as np
+from utils.extractive_answer import extractive_answer, split_into_sentences
+
+class KeywordModel:
+    """Embeds text by counting a few keywords, enough to rank sentences"""
+
+    KEYWORDS = ("fever", "paracetamol", "hygiene", "cannula")
+
+    def encode(self, sentences, convert_to_tensor=False):
+        return np.array([[text.lower().count(word) + 0.01 for word in self.KEYWORDS] for text in sentences])
+
+CHUNKS = [
+    "Give paracetamol for fever above 38 degrees. Recheck the temperature after one hour.",
+    "Perform hand hygiene before touching the cannula. Flush the cannula with saline.",
+]
+
+def test_sentences_are_split_and_short_ones_dropped():
+    assert split_into_sentences("Short. This sentence is long enough to keep.") == ["This sentence is long enough to keep."]
+
+def test_table_rows_become_sentences_without_header():
+    table = "Table from page 2: Drug | Dose\nParacetamol | 15 mg/kg every 6 hours"
+    assert split_into_sentences(table) == ["Paracetamol | 15 mg/kg every 6 hours"]
+
+def test_answer_picks_closest_sentences_and_cites_pages():
+    query_vector = np.array([1.0, 1.0, 0.0, 0.0])
+    result = extractive_answer(
+        query_vector, [(1, 0.5), (0, 0.4)], CHUNKS, KeywordModel(),
+        chunk_metadata=[{"page": 3}, {"page": 7}], max_sentences=1
+    )
+    assert result["answer"] == "- Give paracetamol for fever above 38 degrees. (page 3)"
+    assert result["pages"] == [3]
+    assert result["score"] > 0.9
+
+class CountingModel(KeywordModel):
+    def __init__(self):
+        self.encoded = []
+
+    def encode(self, sentences, convert_to_tensor=False):
+        self.encoded.extend(sentences)
+        return super().encode(sentences, convert_to_tensor)
+
+def test_single_sentence_chunks_reuse_stored_embeddings():
+    chunks = ["Check the cannula site for phlebitis hourly.", "Give paracetamol for fever. Recheck in an hour please."]
+    model = CountingModel()
+    stored = [np.array([0.0, 0.0, 0.0, 1.0]), np.zeros(4)]
+    result = extractive_answer(np.array([0.0, 0.0, 0.0, 1.0]), [(0, 0.9), (1, 0.2)], chunks, model,
+                               max_sentences=1, chunk_embeddings=stored)
+    assert result["answer"] == "- Check the cannula site for phlebitis hourly."
+    # Only the sentences of the multi-sentence chunk are encoded
+    assert not any("cannula" in sentence for sentence in model.encoded)
+    assert len(model.encoded) == 2
+
+def test_no_sentences_gives_empty_answer():
+    result = extractive_answer(np.ones(4), [(0, 0.5)], ["too short"], KeywordModel())
+    assert result == {"answer": "", "score": 0.0, "pages": []}
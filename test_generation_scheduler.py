@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Behavioural tests for priority and fairness scheduling of generations
+"""
+import asyncio
+import pytest
+from utils.generation_scheduler import GenerationQueueFull, GenerationScheduler
+
+async def queue_behind_holder(scheduler, requests, holder_session="holder"):
+    """Fill the only slot, queue requests (name, priority, session), then free it; returns run order"""
+    order = []
+    await scheduler.acquire("standard", holder_session)
+
+    async def request(name, priority, session_id):
+        await scheduler.acquire(priority, session_id)
+        order.append(name)
+        scheduler.release(session_id)
+
+    tasks = []
+    for name, priority, session_id in requests:
+        tasks.append(asyncio.create_task(request(name, priority, session_id)))
+        await asyncio.sleep(0)
+    scheduler.release(holder_session)
+    await asyncio.gather(*tasks)
+    return order
+
+def test_quick_answers_run_first():
+    scheduler = GenerationScheduler(capacity=1)
+    order = asyncio.run(queue_behind_holder(scheduler, [
+        ("detailed", "detailed", "a"), ("standard", "standard", "b"), ("quick", "quick", "c")
+    ]))
+    assert order == ["quick", "standard", "detailed"]
+
+def test_unknown_priority_is_standard():
+    scheduler = GenerationScheduler(capacity=1)
+    order = asyncio.run(queue_behind_holder(scheduler, [
+        ("detailed", "detailed", "a"), ("unknown", "verbose", "b"), ("standard", "standard", "c")
+    ]))
+    assert order == ["unknown", "standard", "detailed"]
+
+def test_sessions_get_a_first_slot_before_a_second():
+    scheduler = GenerationScheduler(capacity=1)
+    order = asyncio.run(queue_behind_holder(scheduler, [
+        ("a2", "standard", "a"), ("a3", "standard", "a"), ("b1", "standard", "b")
+    ], holder_session="a"))
+    assert order == ["b1", "a2", "a3"]
+    assert scheduler.stats()["sessions"] == 0
+
+def test_full_queue_refuses_with_retry_hint():
+    async def scenario():
+        scheduler = GenerationScheduler(capacity=1, max_queue=2, initial_estimate=4.0)
+        await scheduler.acquire()
+        waiting = [asyncio.create_task(scheduler.acquire()) for _ in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(GenerationQueueFull) as refused:
+            await scheduler.acquire()
+        for task in waiting:
+            task.cancel()
+        return scheduler, refused.value
+
+    scheduler, refused = asyncio.run(scenario())
+    # Two waiting plus this one, on one slot, at four seconds each
+    assert refused.retry_after == 12
+    assert scheduler.stats()["rejected"] == 1
+
+def test_retry_hint_follows_generation_time():
+    scheduler = GenerationScheduler(capacity=2, initial_estimate=10.0, smoothing=1.0)
+    scheduler.running = 1
+    scheduler.release(duration=2.0)
+    assert scheduler.average_seconds == 2.0
+    assert scheduler.retry_after() == 1
+
+def test_cancelled_request_leaves_the_queue():
+    async def scenario():
+        scheduler = GenerationScheduler(capacity=1)
+        await scheduler.acquire(session_id="holder")
+        cancelled = asyncio.create_task(scheduler.acquire("quick", "gone"))
+        waiting = asyncio.create_task(scheduler.acquire("detailed", "waiting"))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        await asyncio.sleep(0)
+        queued_after_cancel = scheduler.stats()["queued"]
+        scheduler.release("holder")
+        await waiting
+        return scheduler, queued_after_cancel
+
+    scheduler, queued_after_cancel = asyncio.run(scenario())
+    assert queued_after_cancel == 1
+    assert scheduler.running == 1 and scheduler.queued == 0
+    assert scheduler.stats()["sessions"] == 1
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Behavioural tests for routing LLM requests across backends
+"""
+import asyncio
+import pytest
+from utils.async_llm_client import AsyncLLMRunner, AsyncLMStudioClient
+from utils.llm_backends import LLMBackend, LLMBackendPool
+
+def make_pool(count=2, **kwargs):
+    return LLMBackendPool([LLMBackend(f"http://llm{i}:1234/", "model") for i in range(count)], **kwargs)
+
+def test_requests_go_to_least_loaded_backend():
+    pool = make_pool(2)
+    first = pool.acquire()
+    second = pool.acquire()
+    assert first is not second
+    pool.release(first, True, 100)
+    pool.release(second, True, 50)
+    # Equal load: the lower average latency wins
+    assert pool.choose() is second
+
+def test_consecutive_failures_eject_a_backend():
+    pool = make_pool(2, failure_threshold=2, ejection_seconds=30)
+    bad, good = pool.backends
+    for _ in range(2):
+        pool.release(pool.acquire(exclude=(good,)), False)
+    assert not bad.available()
+    assert all(pool.acquire() is good for _ in range(3))
+    assert pool.any_available()
+
+def test_success_resets_the_failure_count():
+    pool = make_pool(1, failure_threshold=2)
+    backend = pool.backends[0]
+    pool.release(pool.acquire(), False)
+    pool.release(pool.acquire(), True, 10)
+    pool.release(pool.acquire(), False)
+    assert backend.available()
+
+def test_probe_readmits_after_ejection_expires():
+    pool = make_pool(1, ejection_seconds=0)
+    backend = pool.backends[0]
+    pool.record_probe(backend, False)
+    assert not backend.available() and not pool.any_available()
+    pool.record_probe(backend, True)
+    assert backend.available()
+
+def test_all_ejected_still_picks_a_backend():
+    pool = make_pool(2)
+    for backend in pool.backends:
+        pool.record_probe(backend, False)
+    assert not pool.any_available()
+    assert pool.choose() in pool.backends
+
+def test_pool_needs_a_backend():
+    with pytest.raises(ValueError):
+        LLMBackendPool([])
+
+def test_request_fails_over_to_another_backend(lm_studio, other_lm_studio):
+    lm_studio.close()
+    runner = AsyncLLMRunner(AsyncLMStudioClient(lm_studio.config(backends=[{"base_url": other_lm_studio.url}])))
+    try:
+        for _ in range(3):
+            assert runner.chat_completion([{"role": "user", "content": "q"}]) == other_lm_studio.content
+        down, up = runner.client.pool.backends
+        assert down.failures >= 1 and up.failures == 0
+    finally:
+        runner.close()
+
+def test_hung_backend_is_ejected(lm_studio, other_lm_studio):
+    lm_studio.delay = 2.0
+    runner = AsyncLLMRunner(AsyncLMStudioClient(lm_studio.config(backends=[{"base_url": other_lm_studio.url}])))
+    hung, healthy = runner.client.pool.backends
+    try:
+        # The hung server accepts connections and passes /v1/models probes
+        # but never answers; each timed-out request counts against it
+        while hung.available():
+            try:
+                runner.chat_completion([{"role": "user", "content": "q"}], timeout=0.2)
+            except asyncio.TimeoutError:
+                pass
+            assert hung.failures <= runner.client.pool.failure_threshold
+        assert hung.ejections == 1 and healthy.failures == 0
+        assert runner.chat_completion([{"role": "user", "content": "q"}], timeout=1) == other_lm_studio.content
+    finally:
+        runner.close()
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+Behavioural tests for the pooled LM Studio HTTP client
+"""
+import pytest
+import requests
+from utils.llm_client import LMStudioClient
+
+def test_requests_reuse_one_keep_alive_connection(lm_studio):
+    client = LMStudioClient(lm_studio.config())
+    for _ in range(3):
+        assert client.list_models() == lm_studio.models
+    assert len(lm_studio.client_ports) == 1
+    client.close()
+
+def test_unavailable_status_is_retried(lm_studio):
+    lm_studio.statuses = [503]
+    client = LMStudioClient(lm_studio.config(max_retries=2))
+    assert client.list_models() == lm_studio.models
+    assert not lm_studio.statuses
+    client.close()
+
+def test_health_probe_is_not_retried(lm_studio):
+    lm_studio.statuses = [503]
+    client = LMStudioClient(lm_studio.config(max_retries=2))
+    with pytest.raises(requests.exceptions.HTTPError):
+        client.list_models(retry=False)
+    client.close()
+
+def test_connection_failure_raises(lm_studio):
+    client = LMStudioClient(lm_studio.config(max_retries=0))
+    lm_studio.close()
+    with pytest.raises(requests.exceptions.ConnectionError):
+        client.list_models()
+    client.close()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Behavioural tests for the background LLM health monitor
+"""
+import time
+from utils.llm_client import LMStudioClient
+from utils.llm_health import LLMHealthMonitor
+
+def wait_for_probe(monitor):
+    deadline = time.time() + 5
+    while time.time() < deadline:
+        if monitor.status()["state"] != "checking":
+            return
+        time.sleep(0.01)
+    raise AssertionError("health probe did not finish")
+
+def two_backend_client(lm_studio, second_url):
+    return LMStudioClient(lm_studio.config(backends=[{"base_url": second_url}], max_retries=0))
+
+def test_available_while_any_backend_is_up(lm_studio, other_lm_studio):
+    other_lm_studio.close()
+    client = two_backend_client(lm_studio, other_lm_studio.url)
+    monitor = LLMHealthMonitor(client_fn=lambda: client, interval_seconds=60)
+    wait_for_probe(monitor)
+    assert monitor.is_available()
+    assert [backend["available"] for backend in monitor.status()["backends"]] == [True, False]
+    monitor.stop()
+    client.close()
+
+def test_unavailable_when_every_backend_is_down(lm_studio):
+    lm_studio.close()
+    client = LMStudioClient(lm_studio.config(max_retries=0))
+    monitor = LLMHealthMonitor(client_fn=lambda: client, interval_seconds=60)
+    wait_for_probe(monitor)
+    assert not monitor.is_available()
+    assert monitor.status()["state"] == "down"
+    monitor.stop()
+    client.close()
+
+def test_failed_request_does_not_take_other_backends_down(lm_studio, other_lm_studio):
+    client = two_backend_client(lm_studio, other_lm_studio.url)
+    monitor = LLMHealthMonitor(client_fn=lambda: client, interval_seconds=60)
+    wait_for_probe(monitor)
+    # One backend fails enough requests to be ejected; the other keeps serving
+    first = client.pool.backends[0]
+    for _ in range(client.pool.failure_threshold):
+        client.pool.release(client.pool.acquire(exclude=(client.pool.backends[1],)), False)
+    monitor.report_failure()
+    assert not first.available()
+    assert monitor.is_available()
+    monitor.stop()
+    client.close()
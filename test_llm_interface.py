@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Behavioural tests for LLM generation through the shared client
+"""
+from utils import llm_interface
+from utils.async_llm_client import parse_event_line
+from utils.response_cache import SQLiteResponseCache
+
+def test_event_lines_are_parsed():
+    assert parse_event_line('data: {"choices": [{"delta": {"content": "Hi"}}]}') == (False, "Hi")
+    assert parse_event_line("data: [DONE]") == (True, None)
+    assert parse_event_line(": keep-alive") == (False, None)
+    assert parse_event_line('data: {"choices": [{"delta": {}}]}') == (False, None)
+    assert parse_event_line("data: {not json") == (False, None)
+
+def test_stream_yields_tokens_in_order(lm_studio, llm_runner):
+    tokens = list(llm_interface.stream_lm_studio("How often is the site checked?"))
+    assert tokens == lm_studio.tokens
+    assert lm_studio.requests[0]["stream"] is True
+
+def test_streamed_nursing_response_is_a_generator(lm_studio, llm_runner):
+    stream = llm_interface.generate_nursing_response("question", "context", stream=True)
+    assert not isinstance(stream, str)
+    assert "".join(stream) == "".join(lm_studio.tokens)
+
+def test_unreachable_server_yields_error_message(lm_studio, llm_runner):
+    lm_studio.close()
+    tokens = list(llm_interface.stream_lm_studio("question"))
+    assert len(tokens) == 1 and tokens[0].startswith("Error connecting to LM Studio")
+
+def test_blank_stream_is_not_cached(lm_studio, llm_runner, tmp_path, monkeypatch):
+    cache = SQLiteResponseCache(str(tmp_path / "responses.sqlite3"))
+    monkeypatch.setattr(llm_interface, "get_response_cache", lambda: cache)
+    lm_studio.tokens = [" ", "\n"]
+    assert "".join(llm_interface.stream_lm_studio("question", temperature=0.1)).strip() == ""
+    assert cache.stats()["entries"] == 0
+    lm_studio.tokens = ["Check ", "hourly."]
+    assert "".join(llm_interface.stream_lm_studio("question", temperature=0.1)) == "Check hourly."
+    assert cache.stats()["entries"] == 1
+
+def test_open_breaker_answers_at_once(lm_studio, llm_runner):
+    for _ in range(llm_runner.breaker.failure_threshold):
+        llm_runner.breaker.record_failure()
+    assert llm_interface.query_lm_studio("question") == llm_interface.CIRCUIT_OPEN_MESSAGE
+    assert list(llm_interface.stream_lm_studio("question")) == [llm_interface.CIRCUIT_OPEN_MESSAGE]
+    assert not lm_studio.requests
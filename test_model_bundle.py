@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Behavioural tests for offline model bundles
+"""
+import json
+import os
+import pytest
+import utils.model_bundle as model_bundle
+from utils.model_bundle import BUNDLE_MANIFEST, CURRENT_FILE, find_model_bundle, model_slug, verify_model_bundle
+
+MODEL_NAME = "intfloat/multilingual-e5-small"
+
+def write_bundle(bundle_root, files):
+    model_root = os.path.join(bundle_root, model_slug(MODEL_NAME))
+    bundle_dir = os.path.join(model_root, "abc123")
+    os.makedirs(bundle_dir)
+    for relative, content in files.items():
+        path = os.path.join(bundle_dir, relative)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(content)
+    with open(os.path.join(bundle_dir, BUNDLE_MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump({"model_name": MODEL_NAME, "version": "abc123", "onnx": False,
+                   "files": model_bundle._collect_files(bundle_dir)}, f)
+    with open(os.path.join(model_root, CURRENT_FILE), 'w', encoding='utf-8') as f:
+        f.write("abc123\n")
+    return bundle_dir
+
+def test_current_bundle_is_found(tmp_path):
+    bundle_dir = write_bundle(str(tmp_path), {"model.safetensors": b"weights"})
+    assert find_model_bundle(str(tmp_path), MODEL_NAME) == bundle_dir
+    assert find_model_bundle(str(tmp_path), "other/model") is None
+
+def test_default_verification_checks_sizes_without_hashing(tmp_path, monkeypatch):
+    bundle_dir = write_bundle(str(tmp_path), {"model.safetensors": b"weights", "tokenizer/vocab.txt": b"a b"})
+    monkeypatch.setattr(model_bundle, "file_sha256", lambda path: pytest.fail("hashed on a default load"))
+    assert verify_model_bundle(bundle_dir, check_hashes=False)["version"] == "abc123"
+
+    os.remove(os.path.join(bundle_dir, "tokenizer", "vocab.txt"))
+    with pytest.raises(ValueError, match="missing tokenizer/vocab.txt"):
+        verify_model_bundle(bundle_dir, check_hashes=False)
+
+def test_truncated_file_fails_size_check(tmp_path):
+    bundle_dir = write_bundle(str(tmp_path), {"model.safetensors": b"weights"})
+    with open(os.path.join(bundle_dir, "model.safetensors"), 'wb') as f:
+        f.write(b"wei")
+    with pytest.raises(ValueError, match="wrong size"):
+        verify_model_bundle(bundle_dir, check_hashes=False)
+
+def test_full_verification_catches_corrupted_content(tmp_path):
+    bundle_dir = write_bundle(str(tmp_path), {"model.safetensors": b"weights"})
+    with open(os.path.join(bundle_dir, "model.safetensors"), 'wb') as f:
+        f.write(b"WEIGHTS")
+    verify_model_bundle(bundle_dir, check_hashes=False)
+    with pytest.raises(ValueError, match="failed its checksum"):
+        verify_model_bundle(bundle_dir)
+
+def test_loads_do_not_hash_by_default():
+    from config import EMBEDDING_CONFIG
+    assert EMBEDDING_CONFIG["bundle_verify_checksums"] is False
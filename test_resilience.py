@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Behavioural tests for request deadlines and the circuit breaker
+"""
+import time
+from utils.resilience import CircuitBreaker, Deadline
+
+def open_breaker(**kwargs):
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=0.05, **kwargs)
+    breaker.record_failure()
+    breaker.record_failure()
+    return breaker
+
+def test_deadline_counts_down_to_zero():
+    deadline = Deadline(0.05)
+    assert 0 < deadline.remaining() <= 0.05
+    time.sleep(0.06)
+    assert deadline.remaining() == 0.0 and deadline.expired()
+
+def test_consecutive_failures_open_the_breaker():
+    breaker = CircuitBreaker(failure_threshold=2)
+    breaker.record_failure()
+    breaker.record_success(1.0)
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.try_acquire() and breaker.stats()["rejected"] == 1
+
+def test_half_open_lets_one_probe_through():
+    breaker = open_breaker()
+    assert not breaker.allows_requests()
+    time.sleep(0.06)
+    assert breaker.allows_requests()
+    assert breaker.try_acquire()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.try_acquire()
+    breaker.record_success(1.0)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+def test_failed_probe_reopens():
+    breaker = open_breaker()
+    time.sleep(0.06)
+    breaker.try_acquire()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.stats()["times_opened"] == 2
+
+def test_abandoned_probe_frees_the_slot():
+    breaker = open_breaker()
+    time.sleep(0.06)
+    assert breaker.try_acquire()
+    breaker.record_abandoned()
+    assert breaker.try_acquire()
+
+def test_first_token_and_full_call_have_separate_thresholds():
+    breaker = CircuitBreaker(failure_threshold=1, slow_call_seconds=30, slow_first_token_seconds=15)
+    # A long answer generated whole is not slow
+    breaker.record_success(20.0)
+    assert breaker.state == CircuitBreaker.CLOSED
+    # The same wait before the first streamed token is
+    breaker.record_success(20.0, first_token=True)
+    assert breaker.state == CircuitBreaker.OPEN
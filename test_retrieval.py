@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Behavioural tests for BM25, rank fusion and the retrieval index
+"""
+import numpy as np
+import pytest
+from utils.bm25_index import BM25Index, reciprocal_rank_fusion, tokenize_for_bm25
+from utils.chunk_metadata import ChunkMetadata, infer_chunk_metadata
+from utils.retrieval import RetrievalIndex, get_scan_executor, normalize_rows
+
+CHUNKS = [
+    "Normal saline 0.9% is used for fluid resuscitation in children.",
+    "Hand hygiene must be performed before and after patient contact.",
+    "Table from page 4: Drug | Dose\nParacetamol | 15 mg/kg",
+    "Monitor the intravenous cannula site for signs of phlebitis every hour.",
+]
+
+def random_embeddings(rows, dim=16, seed=0):
+    return normalize_rows(np.random.default_rng(seed).normal(size=(rows, dim)))
+
+def test_tokenizer_keeps_decimal_doses():
+    assert tokenize_for_bm25("Give 0.9% Saline") == ["give", "0.9", "saline"]
+
+def test_tokenizer_drops_stopwords():
+    assert tokenize_for_bm25("What is the dose for a child?") == ["dose", "child"]
+
+def test_bm25_ranks_matching_chunk_first():
+    index = BM25Index(CHUNKS)
+    candidates, scores = index.top_candidates("hand hygiene")
+    assert candidates[0] == 1
+    assert list(scores) == sorted(scores, reverse=True)
+
+def test_bm25_returns_only_chunks_sharing_a_term():
+    index = BM25Index(CHUNKS)
+    candidates, _ = index.top_candidates("phlebitis")
+    assert candidates.tolist() == [3]
+    assert len(index.top_candidates("xylophone")[0]) == 0
+
+def test_bm25_mask_excludes_chunks():
+    index = BM25Index(CHUNKS)
+    mask = np.array([True, False, True, True])
+    candidates, _ = index.top_candidates("hand hygiene patient", mask=mask)
+    assert 1 not in candidates.tolist()
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    fused = reciprocal_rank_fusion([[1, 2, 3], [3, 1, 2]], k=60)
+    assert [doc_id for doc_id, _ in fused][0] == 1
+    assert fused[0][1] == 1.0 / 61 + 1.0 / 62
+
+def test_hybrid_search_finds_lexical_match():
+    embeddings = random_embeddings(len(CHUNKS))
+    index = RetrievalIndex(CHUNKS, embeddings)
+    # A query vector pointing at another chunk; the lexical match still ranks
+    results = index.search("phlebitis cannula", embeddings[0], top_k=2)
+    assert 3 in [doc_id for doc_id, _ in results]
+
+def test_hybrid_search_keeps_best_dense_match_without_shared_terms():
+    chunks = ["Alcohol rub kills most germs."] + [
+        f"What is the ward rule number {i} for visitors?" for i in range(1, 12)
+    ]
+    embeddings = random_embeddings(len(chunks), dim=32, seed=4)
+    query_vector = normalize_rows(embeddings[0] + 0.2 * random_embeddings(1, dim=32, seed=5)[0])
+    index = RetrievalIndex(chunks, embeddings)
+    results = index.search("What is the hand sanitiser guidance?", query_vector, top_k=5)
+    assert results[0][0] == 0
+
+def test_dense_search_returns_cosine_similarities():
+    embeddings = random_embeddings(len(CHUNKS))
+    index = RetrievalIndex(CHUNKS, embeddings, hybrid_search=False)
+    results = index.search("anything", embeddings[2], top_k=1)
+    assert results[0][0] == 2
+    assert abs(results[0][1] - 1.0) < 1e-5
+
+def test_threshold_drops_weak_hits():
+    embeddings = random_embeddings(len(CHUNKS))
+    index = RetrievalIndex(CHUNKS, embeddings, hybrid_search=False)
+    results = index.search("anything", embeddings[2], top_k=4, threshold=0.99)
+    assert [doc_id for doc_id, _ in results] == [2]
+
+def test_prefilter_recall_on_clustered_vectors():
+    rng = np.random.default_rng(1)
+    centers = rng.normal(size=(8, 64))
+    embeddings = normalize_rows(centers[rng.integers(0, 8, 2000)] + 0.3 * rng.normal(size=(2000, 64)))
+    chunks = [f"chunk {i}" for i in range(2000)]
+    index = RetrievalIndex(chunks, embeddings, hybrid_search=False, prefilter_dim=16, prefilter_shortlist=200)
+    assert index.reduced_matrix is not None
+    assert index.evaluate_prefilter_recall(embeddings[:20], k=5) >= 0.9
+
+def test_prefilter_skipped_for_small_corpus():
+    index = RetrievalIndex(CHUNKS, random_embeddings(len(CHUNKS)), prefilter_dim=4)
+    assert index.reduced_matrix is None
+
+def test_unknown_prefilter_method_is_rejected():
+    chunks = [f"chunk {i}" for i in range(500)]
+    with pytest.raises(ValueError):
+        RetrievalIndex(chunks, random_embeddings(500, dim=32), prefilter_dim=8, prefilter_method="hash")
+
+def test_metadata_inferred_from_table_headers():
+    metadata = infer_chunk_metadata(CHUNKS, source="kkh.pdf")
+    assert metadata[2] == {"source": "kkh.pdf", "page": 4, "kind": "table"}
+    assert metadata[0]["kind"] == "text" and metadata[0]["page"] == 0
+
+def test_metadata_masks_combine_filters():
+    metadata = ChunkMetadata([
+        {"source": "a.pdf", "page": 1, "kind": "text"},
+        {"source": "a.pdf", "page": 5, "kind": "table"},
+        {"source": "b.pdf", "page": 5, "kind": "table"},
+    ])
+    assert metadata.mask({}) is None
+    assert metadata.mask({"kind": "table"}).tolist() == [False, True, True]
+    assert metadata.mask({"source": "a.pdf", "pages": (2, 9)}).tolist() == [False, True, False]
+    assert not metadata.mask({"source": "missing.pdf"}).any()
+
+def test_search_respects_filters():
+    embeddings = random_embeddings(len(CHUNKS))
+    index = RetrievalIndex(CHUNKS, embeddings)
+    results = index.search("paracetamol dose hand hygiene", embeddings[1], top_k=4, filters={"kind": "table"})
+    assert [doc_id for doc_id, _ in results] == [2]
+
+def test_sharded_scan_matches_single_scan():
+    embeddings = random_embeddings(1000, dim=32, seed=2)
+    chunks = [f"chunk {i}" for i in range(1000)]
+    single = RetrievalIndex(chunks, embeddings, hybrid_search=False, scan_shards=1)
+    sharded = RetrievalIndex(chunks, embeddings, hybrid_search=False, scan_shards=8, min_rows_per_shard=100)
+    for query_vector in embeddings[:10]:
+        expected = single.dense_top_k(query_vector, 10)
+        actual = sharded.dense_top_k(query_vector, 10)
+        assert actual[0].tolist() == expected[0].tolist()
+        assert np.allclose(actual[1], expected[1])
+
+def test_scan_executor_is_never_replaced():
+    executor = get_scan_executor()
+    assert get_scan_executor() is executor
+    # Indexes asking for more shards than threads queue on the same pool
+    embeddings = random_embeddings(4000, dim=8, seed=3)
+    index = RetrievalIndex([""] * 4000, embeddings, hybrid_search=False, scan_shards=64, min_rows_per_shard=10)
+    assert index.dense_top_k(embeddings[0], 1)[0][0] == 0
+    assert get_scan_executor() is executor
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Behavioural tests for the lazily imported utils package
+"""
+import ast
+import os
+import subprocess
+import sys
+import pytest
+import utils
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+def test_every_export_is_defined_in_its_module():
+    for module_name, names in utils._SUBMODULE_EXPORTS.items():
+        with open(os.path.join(ROOT, "utils", f"{module_name}.py"), 'r', encoding='utf-8') as f:
+            tree = ast.parse(f.read())
+        defined = set()
+        for node in tree.body:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                defined.add(node.name)
+            elif isinstance(node, ast.Assign):
+                defined.update(target.id for target in node.targets if isinstance(target, ast.Name))
+        missing = set(names) - defined
+        assert not missing, f"utils.{module_name} does not define {sorted(missing)}"
+
+def test_importing_one_tool_does_not_load_the_others():
+    code = (
+        "import sys; from utils import calculate_maintenance_fluid; "
+        "print(sorted(name for name in sys.modules if name.startswith('utils.')))"
+    )
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "['utils.fluid_calculator']"
+
+def test_unknown_attribute_raises_attribute_error():
+    with pytest.raises(AttributeError, match="not_a_utility"):
+        utils.not_a_utility
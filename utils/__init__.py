@@ -1,41 +1,112 @@
 """
 Utility functions for the KKH Nursing Chatbot
+
+Submodules are imported lazily on first attribute access (PEP 562), so
+importing a lightweight tool such as the fluid calculator does not pull in
+the embedding, PDF or ML stacks.
 """
 
-from .pdf_processor import *
-from .fluid_calculator import *
-from .quiz_generator import *
-from .llm_interface import *
+import importlib
 
-__all__ = [
+_SUBMODULE_EXPORTS = {
     # PDF Processing
-    'extract_text_from_pdf',
-    'create_embeddings',
-    'save_embeddings',
-    'load_embeddings',
-    'find_relevant_chunk',
-    'preprocess_text_for_embedding',
-    'chunk_text_by_sentences',
+    'pdf_processor': [
+        'extract_text_from_pdf',
+        'create_embeddings',
+        'measure_chunk_lengths',
+        'load_embedding_checkpoint',
+        'save_embeddings',
+        'load_embeddings',
+        'find_relevant_chunk',
+        'encode_query',
+        'search_chunks',
+        'compute_knowledge_base_version',
+        'preprocess_text_for_embedding',
+        'chunk_text_by_sentences'
+    ],
+    
+    # Retrieval
+    'bm25_index': ['BM25Index', 'tokenize_for_bm25', 'reciprocal_rank_fusion'],
+    'retrieval': ['RetrievalIndex', 'build_retrieval_index'],
+    'embedding_cache': ['QueryEmbeddingCache', 'get_query_embedding_cache', 'normalize_query_text'],
+    'answer_cache': ['SemanticAnswerCache'],
+    'chunk_metadata': ['ChunkMetadata', 'infer_chunk_metadata'],
+    
+    # Prompt Context
+    'context_packer': [
+        'pack_context',
+        'count_tokens',
+        'compact_table_text',
+        'merge_overlapping_text',
+        'truncate_to_tokens'
+    ],
+    
+    # Extractive Answers
+    'extractive_answer': ['extractive_answer', 'split_into_sentences', 'embed_sentences'],
+    
+    # Embedding Backends
+    'model_loader': ['load_embedding_backend', 'BackgroundModelLoader'],
+    'batch_encoder': ['MicroBatchEncoder'],
+    'embedding_pool': ['EmbeddingProcessPool'],
+    'onnx_encoder': ['OnnxEncoder', 'export_onnx_model', 'check_onnx_parity'],
+    'model_bundle': ['build_model_bundle', 'find_model_bundle', 'verify_model_bundle', 'enable_offline_mode'],
     
     # Fluid Calculator
-    'calculate_maintenance_fluid',
-    'calculate_resuscitation_fluid',
-    'calculate_deficit_fluid',
-    'calculate_replacement_fluid',
-    'get_fluid_recommendations',
+    'fluid_calculator': [
+        'calculate_maintenance_fluid',
+        'calculate_resuscitation_fluid',
+        'calculate_deficit_fluid',
+        'calculate_replacement_fluid',
+        'get_fluid_recommendations'
+    ],
     
     # Quiz Generator
-    'generate_quiz_questions',
-    'validate_question_quality',
-    'shuffle_quiz_questions',
-    'calculate_quiz_score',
-    'get_quiz_feedback',
+    'quiz_generator': [
+        'generate_quiz_questions',
+        'validate_question_quality',
+        'shuffle_quiz_questions',
+        'calculate_quiz_score',
+        'get_quiz_feedback'
+    ],
     
     # LLM Interface
-    'query_lm_studio',
-    'format_nursing_prompt',
-    'check_lm_studio_connection',
-    'get_available_models',
-    'generate_nursing_response',
-    'validate_response_quality'
-]
+    'llm_backends': ['LLMBackend', 'LLMBackendPool', 'get_llm_backend_pool'],
+    'llm_client': ['LMStudioClient', 'configure_lm_studio_client', 'get_lm_studio_client'],
+    'llm_health': ['LLMHealthMonitor'],
+    'async_llm_client': ['AsyncLMStudioClient', 'AsyncLLMRunner', 'configure_async_llm_runner', 'get_async_llm_runner'],
+    'response_cache': ['SQLiteResponseCache', 'get_response_cache'],
+    'resilience': ['Deadline', 'CircuitBreaker', 'CircuitOpenError', 'get_llm_circuit_breaker'],
+    'generation_scheduler': ['GenerationScheduler', 'GenerationQueueFull'],
+    'llm_interface': [
+        'query_lm_studio',
+        'stream_lm_studio',
+        'build_nursing_request',
+        'format_nursing_prompt',
+        'check_lm_studio_connection',
+        'get_available_models',
+        'generate_nursing_response',
+        'validate_response_quality',
+        'BUSY_MESSAGE'
+    ]
+}
+
+_EXPORT_MODULES = {
+    name: module_name
+    for module_name, names in _SUBMODULE_EXPORTS.items()
+    for name in names
+}
+
+__all__ = list(_EXPORT_MODULES)
+
+def __getattr__(name):
+    """Import the submodule that defines name on first access"""
+    module_name = _EXPORT_MODULES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    # Cache on the package so later lookups skip __getattr__
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,163 @@
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from .bm25_index import tokenize_for_bm25
+
+def query_numbers(question):
+    """
+    Numbers in a question, in order (weights, ages, doses)
+
+    Args:
+        question (str): Question text
+
+    Returns:
+        tuple: Numeric terms, e.g. ("10", "2.5")
+    """
+    return tuple(term for term in tokenize_for_bm25(question) if term[0].isdigit())
+
+class SemanticAnswerCache:
+    """
+    Answer cache keyed by query-embedding similarity
+
+    An answer is reused when a new question's vector is close enough to a
+    cached question's vector, retrieval returned the same chunks and the
+    questions contain the same numbers, so rephrasings of a question are
+    answered without a new LLM generation. Embeddings barely move when only
+    a number changes, so the dose for a 10 kg child is never served for a
+    20 kg one.
+    Entries expire after a TTL, the least recently used entry is evicted
+    when the cache is full, and everything is dropped when the knowledge
+    base version changes.
+    """
+
+    def __init__(self, similarity_threshold=0.95, ttl_seconds=21600, max_entries=512, kb_version=None):
+        """
+        Args:
+            similarity_threshold (float): Minimum cosine similarity between query vectors
+            ttl_seconds (float): Lifetime of an entry
+            max_entries (int): Maximum number of cached answers
+            kb_version (str): Knowledge base version the answers belong to
+        """
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.kb_version = kb_version
+        self.hits = 0
+        self.misses = 0
+        self._matrix = None
+        self._active = np.zeros(max_entries, dtype=bool)
+        self._entries = [None] * max_entries
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+
+    def set_knowledge_base_version(self, kb_version):
+        """
+        Record the current knowledge base version, dropping stale answers
+
+        Args:
+            kb_version (str): Knowledge base version
+        """
+        with self._lock:
+            if kb_version != self.kb_version:
+                self._clear()
+                self.kb_version = kb_version
+
+    def _clear(self):
+        self._active[:] = False
+        self._entries = [None] * self.max_entries
+        self._lru.clear()
+
+    def _release(self, slot):
+        self._active[slot] = False
+        self._entries[slot] = None
+        self._lru.pop(slot, None)
+
+    def lookup(self, query_vector, chunk_ids, question=""):
+        """
+        Find a cached answer for a question
+
+        Args:
+            query_vector (numpy.ndarray): Query embedding
+            chunk_ids (list): Indices of the chunks retrieved for the question
+            question (str): Question text, whose numbers must match exactly
+
+        Returns:
+            str or None: Cached answer, or None on a miss
+        """
+        query_vector = _unit(query_vector)
+        chunk_ids = tuple(chunk_ids)
+        numbers = query_numbers(question)
+        now = time.time()
+        with self._lock:
+            if self._matrix is None or not self._active.any():
+                self.misses += 1
+                return None
+            similarities = self._matrix @ query_vector
+            similarities[~self._active] = -np.inf
+            for slot in np.argsort(-similarities):
+                if similarities[slot] < self.similarity_threshold:
+                    break
+                entry = self._entries[slot]
+                if now - entry["created_at"] > self.ttl_seconds:
+                    self._release(slot)
+                    continue
+                if entry["chunk_ids"] == chunk_ids and entry["numbers"] == numbers:
+                    self._lru.move_to_end(int(slot))
+                    self.hits += 1
+                    return entry["answer"]
+            self.misses += 1
+            return None
+
+    def store(self, query_vector, chunk_ids, answer, question=""):
+        """
+        Cache the answer to a question
+
+        Args:
+            query_vector (numpy.ndarray): Query embedding
+            chunk_ids (list): Indices of the chunks retrieved for the question
+            answer (str): Generated answer
+            question (str): Question text; its numbers are stored with the answer
+        """
+        query_vector = _unit(query_vector)
+        with self._lock:
+            if self._matrix is None or self._matrix.shape[1] != len(query_vector):
+                self._matrix = np.zeros((self.max_entries, len(query_vector)), dtype=np.float32)
+                self._clear()
+            free = np.flatnonzero(~self._active)
+            if len(free):
+                slot = int(free[0])
+            else:
+                slot, _ = self._lru.popitem(last=False)
+            self._matrix[slot] = query_vector
+            self._active[slot] = True
+            self._entries[slot] = {
+                "chunk_ids": tuple(chunk_ids),
+                "numbers": query_numbers(question),
+                "answer": answer,
+                "created_at": time.time()
+            }
+            self._lru[slot] = None
+            self._lru.move_to_end(slot)
+
+    def stats(self):
+        """
+        Get cache statistics
+
+        Returns:
+            dict: Entry count, capacity, hits, misses and hit rate
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": int(self._active.sum()),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "kb_version": self.kb_version
+            }
+
+def _unit(vector):
+    vector = np.asarray(vector, dtype=np.float32).reshape(-1)
+    return vector / max(float(np.linalg.norm(vector)), 1e-12)
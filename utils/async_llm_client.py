@@ -0,0 +1,534 @@
+import asyncio
+import contextlib
+import json
+import queue
+import threading
+import time
+import aiohttp
+from .generation_scheduler import GenerationScheduler
+from .llm_backends import LLMBackendPool, get_llm_backend_pool
+from .resilience import CircuitOpenError, get_llm_circuit_breaker
+
+# Errors a failed generation can raise; callers turn them into error messages
+LLM_REQUEST_ERRORS = (aiohttp.ClientError, asyncio.TimeoutError)
+
+# Cancellation message for a generation whose callers all timed out waiting
+# on it; unlike other cancellations it counts against the server
+_CALLERS_TIMED_OUT = "callers timed out"
+
+def _timed_out(cancelled):
+    """Whether a CancelledError came from callers giving up on a slow server"""
+    return _CALLERS_TIMED_OUT in cancelled.args
+
+def parse_event_line(line):
+    """
+    Parse one server-sent events line of a streamed chat completion
+
+    Args:
+        line (str): Line of the event stream
+
+    Returns:
+        tuple: (done, token); token is None for lines without content
+    """
+    if not line.startswith("data:"):
+        return False, None
+    payload = line[len("data:"):].strip()
+    if payload == "[DONE]":
+        return True, None
+    try:
+        choice = json.loads(payload)["choices"][0]
+    except (ValueError, KeyError, IndexError):
+        return False, None
+    return False, choice.get("delta", {}).get("content") or None
+
+class AsyncLMStudioClient:
+    """
+    asyncio client for the LM Studio chat completions API
+
+    Requests are spread over the LLMBackendPool. A GenerationScheduler bounds
+    how many generations run at once (max_concurrency per server); further
+    requests queue by priority instead of piling onto LM Studio, and are
+    refused once max_queue are waiting. Must be used from a single event loop.
+    """
+
+    def __init__(self, config, pool=None):
+        """
+        Args:
+            config (dict): LM Studio settings (see LM_STUDIO_CONFIG)
+            pool (LLMBackendPool): Generation servers, built from config if None
+        """
+        self.pool = pool or LLMBackendPool.from_config(config)
+        self.model_name = config["model_name"]
+        self.timeout = config.get("timeout", 30)
+        self.connect_timeout = config.get("connect_timeout", 3)
+        self.max_concurrency = config.get("max_concurrency", 2)
+        self.max_retries = config.get("max_retries", 2)
+        self.retry_backoff = config.get("retry_backoff", 0.5)
+        self.pool_size = config.get("pool_size", 10)
+        self.default_temperature = config.get("default_temperature", 0.7)
+        self.max_tokens = config.get("max_tokens", 500)
+        # max_concurrency is per server, so capacity grows with the pool
+        self.scheduler = GenerationScheduler(
+            self.max_concurrency * len(self.pool),
+            max_queue=config.get("max_queue", 16),
+            priorities=config.get("priorities")
+        )
+        self.in_flight = 0
+        self._session = None
+
+    def _ensure_session(self):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=60),
+                headers={"Content-Type": "application/json"}
+            )
+        return self._session
+
+    @contextlib.asynccontextmanager
+    async def _slot(self, priority=None, session_id=None):
+        """Hold one of the generation slots, queueing for it by priority"""
+        self._ensure_session()
+        await self.scheduler.acquire(priority, session_id)
+        self.in_flight += 1
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self.scheduler.release(session_id, time.monotonic() - start)
+
+    def build_request(self, messages, temperature=None, max_tokens=None, stream=False):
+        """
+        Chat completion request body with the configured defaults filled in
+
+        Returns:
+            dict: Model, messages, temperature and max_tokens (and "stream" if set)
+        """
+        data = {
+            "model": self.model_name,
+            "messages": messages,
+            "temperature": self.default_temperature if temperature is None else temperature,
+            "max_tokens": self.max_tokens if max_tokens is None else max_tokens
+        }
+        if stream:
+            data["stream"] = True
+        return data
+
+    async def _post(self, data, timeout):
+        """
+        POST a completion to the least loaded backend
+
+        Failed connections and 502/503/504 responses move on to another
+        backend, backing off once every backend has failed. A backend that
+        keeps its callers waiting past their timeout counts as failed.
+
+        Returns:
+            tuple: (backend, response, latency_ms); the caller releases the backend
+        """
+        failed = []
+        for attempt in range(self.max_retries + 1):
+            backend = self.pool.acquire(exclude=tuple(failed))
+            start = time.monotonic()
+            try:
+                response = await self._session.post(
+                    f"{backend.base_url}/v1/chat/completions",
+                    json=dict(data, model=backend.model_name),
+                    timeout=timeout
+                )
+            except aiohttp.ClientConnectorError:
+                self.pool.release(backend, False)
+                if attempt == self.max_retries:
+                    raise
+            except asyncio.CancelledError as e:
+                if not _timed_out(e):
+                    self.pool.release(backend)
+                    raise
+                self.pool.release(backend, False)
+                raise asyncio.TimeoutError() from e
+            except Exception:
+                self.pool.release(backend, False)
+                raise
+            else:
+                latency_ms = (time.monotonic() - start) * 1000
+                if response.status < 400:
+                    return backend, response, latency_ms
+                response.release()
+                self.pool.release(backend, response.status < 500, latency_ms)
+                if response.status not in (502, 503, 504) or attempt == self.max_retries:
+                    response.raise_for_status()
+            failed.append(backend)
+            if len(failed) >= len(self.pool):
+                failed = []
+                await asyncio.sleep(self.retry_backoff * 2 ** attempt)
+
+    async def _read(self, backend, response, latency_ms, read):
+        """Run read(response), then release the backend with the outcome"""
+        success = None
+        try:
+            async with response:
+                result = await read(response)
+            success = True
+            return result
+        except asyncio.CancelledError as e:
+            if not _timed_out(e):
+                raise
+            success = False
+            raise asyncio.TimeoutError() from e
+        except Exception:
+            success = False
+            raise
+        finally:
+            self.pool.release(backend, success, latency_ms)
+
+    async def chat_completion(self, messages, temperature=None, max_tokens=None, priority=None, session_id=None):
+        """
+        Generate a chat completion
+
+        Args:
+            messages (list): OpenAI-style chat messages
+            temperature (float): Sampling temperature, the configured default if None
+            max_tokens (int): Maximum tokens in the response, the configured default if None
+            priority (str): Response type used to order the queue (quick, standard, detailed)
+            session_id (str): Caller's session, for fairness between sessions
+
+        Returns:
+            str: Response text
+
+        Raises:
+            aiohttp.ClientError, asyncio.TimeoutError: On connection failure, error status or timeout
+            GenerationQueueFull: When too many generations are already waiting
+        """
+        async with self._slot(priority, session_id):
+            timeout = aiohttp.ClientTimeout(total=self.timeout, connect=self.connect_timeout)
+            backend, response, latency_ms = await self._post(
+                self.build_request(messages, temperature, max_tokens, False), timeout
+            )
+            data = await self._read(backend, response, latency_ms, lambda r: r.json(content_type=None))
+        return data["choices"][0]["message"]["content"]
+
+    async def stream_chat_completion(self, messages, temperature=None, max_tokens=None, priority=None, session_id=None):
+        """
+        Generate a chat completion as a server-sent events stream
+
+        The read timeout applies between chunks, so long answers are not cut off.
+
+        Args:
+            messages (list): OpenAI-style chat messages
+            temperature (float): Sampling temperature, the configured default if None
+            max_tokens (int): Maximum tokens in the response, the configured default if None
+            priority (str): Response type used to order the queue (quick, standard, detailed)
+            session_id (str): Caller's session, for fairness between sessions
+
+        Yields:
+            str: Pieces of the response text
+        """
+        async with self._slot(priority, session_id):
+            timeout = aiohttp.ClientTimeout(total=None, connect=self.connect_timeout, sock_read=self.timeout)
+            backend, response, latency_ms = await self._post(
+                self.build_request(messages, temperature, max_tokens, True), timeout
+            )
+            success = None
+            try:
+                async with response:
+                    async for raw_line in response.content:
+                        done, token = parse_event_line(raw_line.decode("utf-8", errors="replace").strip())
+                        if done:
+                            break
+                        if token:
+                            yield token
+                success = True
+            except asyncio.CancelledError as e:
+                if not _timed_out(e):
+                    raise
+                success = False
+                raise asyncio.TimeoutError() from e
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                success = False
+                raise
+            finally:
+                self.pool.release(backend, success, latency_ms)
+
+    def stats(self):
+        """
+        Returns:
+            dict: Generations running and waiting for a slot, scheduler and per-backend statistics
+        """
+        scheduler = self.scheduler.stats()
+        return {
+            "in_flight": self.in_flight,
+            "waiting": scheduler["queued"],
+            "capacity": scheduler["capacity"],
+            "scheduler": scheduler,
+            "backends": self.pool.stats()
+        }
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+
+class _Flight:
+    """One in-flight generation and the callers waiting on it"""
+
+    def __init__(self, key, stream=False):
+        self.key = key
+        self.stream = stream
+        self.tokens = []
+        self.subscribers = set()
+        self.done = False
+        self.end = None
+        self.task = None
+
+# Marks the end of a generation in a subscriber queue
+_FINISHED = object()
+
+class AsyncLLMRunner:
+    """
+    Runs an AsyncLMStudioClient on a background event loop for synchronous callers
+
+    Streamlit scripts call the blocking methods; every session shares the
+    loop, so the client's scheduler limits generations process-wide.
+
+    Concurrent calls with the same key are coalesced: they share one
+    in-flight generation and each receives all of its output. A caller that
+    gives up (timeout, or the script is stopped) only unsubscribes; the
+    generation is cancelled, and its connection released, when no caller is
+    left waiting on it. If the last caller left because it timed out, the
+    cancellation surfaces in the client as asyncio.TimeoutError, so a hung
+    server counts as failed rather than merely abandoned.
+
+    With a circuit breaker, each generation (not each caller) asks it for
+    permission and reports one outcome, so callers sharing a failed
+    generation count as a single failure.
+    """
+
+    def __init__(self, client, breaker=None):
+        """
+        Args:
+            client (AsyncLMStudioClient): Client to run
+            breaker (CircuitBreaker): Breaker guarding new generations; none if None
+        """
+        self.client = client
+        self.breaker = breaker
+        self.loop = asyncio.new_event_loop()
+        self.generations = 0
+        self.coalesced = 0
+        self._flights = {}  # key -> _Flight; only touched on the loop thread
+        self._thread = threading.Thread(target=self.loop.run_forever, name="llm-event-loop", daemon=True)
+        self._thread.start()
+
+    def submit(self, coroutine):
+        """
+        Schedule a coroutine on the background loop
+
+        Returns:
+            concurrent.futures.Future: Result of the coroutine
+        """
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    async def _join(self, key, subscriber, source, stream=False):
+        """Subscribe to the flight for key, starting it with source() if none is running"""
+        flight = self._flights.get(key) if key is not None else None
+        if flight is None:
+            if self.breaker is not None and not self.breaker.try_acquire():
+                raise CircuitOpenError()
+            flight = _Flight(key, stream)
+            if key is not None:
+                self._flights[key] = flight
+            flight.task = self.loop.create_task(self._produce(flight, source))
+            self.generations += 1
+        else:
+            self.coalesced += 1
+        for token in flight.tokens:
+            subscriber.put(token)
+        if flight.done:
+            subscriber.put(flight.end)
+        else:
+            flight.subscribers.add(subscriber)
+        return flight
+
+    async def _produce(self, flight, source):
+        end = _FINISHED
+        start = time.monotonic()
+        recorded = self.breaker is None
+        try:
+            async for token in source():
+                if not recorded:
+                    # Time to first token decides whether a stream is slow
+                    self.breaker.record_success(time.monotonic() - start, first_token=flight.stream)
+                    recorded = True
+                flight.tokens.append(token)
+                for subscriber in flight.subscribers:
+                    subscriber.put(token)
+        except asyncio.CancelledError:
+            # Subscribers only ever see request errors, never a bare cancellation
+            end = aiohttp.ClientError("generation was cancelled")
+            raise
+        except Exception as e:
+            end = e
+            if not recorded and isinstance(e, LLM_REQUEST_ERRORS):
+                self.breaker.record_failure()
+                recorded = True
+        finally:
+            if not recorded:
+                if end is _FINISHED:
+                    self.breaker.record_success(time.monotonic() - start, first_token=flight.stream)
+                else:
+                    # Closed by its callers, or refused by a full queue: says
+                    # nothing about the server
+                    self.breaker.record_abandoned()
+            flight.done = True
+            flight.end = end
+            if self._flights.get(flight.key) is flight:
+                del self._flights[flight.key]
+            for subscriber in flight.subscribers:
+                subscriber.put(end)
+
+    def _leave(self, flight, subscriber, timed_out=False):
+        """Unsubscribe; cancel the generation once nobody is waiting for it"""
+        flight.subscribers.discard(subscriber)
+        if not flight.subscribers and not flight.done:
+            # Callers arriving from now on start a new generation rather than
+            # joining one that is being cancelled
+            if self._flights.get(flight.key) is flight:
+                del self._flights[flight.key]
+            flight.task.cancel(_CALLERS_TIMED_OUT if timed_out else None)
+
+    def _subscribe(self, key, source, timeout=None, first_item_timeout=None, stream=False):
+        """Yield the output of the (possibly shared) generation for key, within the timeouts"""
+        subscriber = queue.Queue()
+        flight = self.submit(self._join(key, subscriber, source, stream)).result()
+        flight_start = time.monotonic()
+        deadline = None if timeout is None else flight_start + timeout
+        if first_item_timeout is not None:
+            deadline = flight_start + first_item_timeout
+        timed_out = False
+        try:
+            while True:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    timed_out = True
+                    raise asyncio.TimeoutError()
+                try:
+                    item = subscriber.get(timeout=remaining)
+                except queue.Empty:
+                    timed_out = True
+                    raise asyncio.TimeoutError()
+                if item is _FINISHED:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                if first_item_timeout is not None:
+                    deadline = None if timeout is None else flight_start + timeout
+                    first_item_timeout = None
+                yield item
+        finally:
+            self.loop.call_soon_threadsafe(self._leave, flight, subscriber, timed_out)
+
+    def chat_completion(self, messages, temperature=None, max_tokens=None, timeout=None, key=None,
+                        priority=None, session_id=None):
+        """
+        Blocking chat completion
+
+        Args:
+            messages (list): OpenAI-style chat messages
+            temperature (float): Sampling temperature
+            max_tokens (int): Maximum tokens in the response
+            timeout (float): Seconds to wait including time queued for a slot, the client timeout if None
+            key (str): Request key; concurrent calls with the same key share one generation
+            priority (str): Response type used to order the queue (quick, standard, detailed)
+            session_id (str): Caller's session, for fairness between sessions
+
+        Returns:
+            str: Response text
+
+        Raises:
+            GenerationQueueFull: When too many generations are already waiting
+            CircuitOpenError: When the circuit breaker refuses a new generation
+        """
+        async def source():
+            yield await self.client.chat_completion(messages, temperature, max_tokens, priority, session_id)
+
+        timeout = self.client.timeout if timeout is None else timeout
+        return "".join(self._subscribe(key, source, timeout))
+
+    def stream_chat_completion(self, messages, temperature=None, max_tokens=None, key=None, first_token_timeout=None,
+                               priority=None, session_id=None):
+        """
+        Blocking generator over a streamed chat completion
+
+        Closing the generator early unsubscribes from the request.
+
+        Args:
+            messages (list): OpenAI-style chat messages
+            temperature (float): Sampling temperature
+            max_tokens (int): Maximum tokens in the response
+            key (str): Request key; concurrent calls with the same key share one generation
+            first_token_timeout (float): Seconds to wait for the first piece; none if None
+            priority (str): Response type used to order the queue (quick, standard, detailed)
+            session_id (str): Caller's session, for fairness between sessions
+
+        Yields:
+            str: Pieces of the response text
+
+        Raises:
+            CircuitOpenError: When the circuit breaker refuses a new generation
+        """
+        def source():
+            return self.client.stream_chat_completion(messages, temperature, max_tokens, priority, session_id)
+
+        yield from self._subscribe(key, source, first_item_timeout=first_token_timeout, stream=True)
+
+    def stats(self):
+        """
+        Returns:
+            dict: Client statistics plus generations started, calls coalesced and flights running
+        """
+        return dict(
+            self.client.stats(),
+            generations=self.generations,
+            coalesced=self.coalesced,
+            in_flight_keys=len(self._flights)
+        )
+
+    def close(self):
+        self.submit(self.client.close()).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+_runner = None
+_runner_lock = threading.Lock()
+
+def configure_async_llm_runner(config, pool=None, breaker=None):
+    """
+    Replace the shared runner with one built from config
+
+    Args:
+        config (dict): LM Studio settings (see LM_STUDIO_CONFIG)
+        pool (LLMBackendPool): Backend pool to share, built from config if None
+        breaker (CircuitBreaker): Circuit breaker, the shared LLM breaker if None
+
+    Returns:
+        AsyncLLMRunner: The new shared runner
+    """
+    global _runner
+    with _runner_lock:
+        if _runner is not None:
+            _runner.close()
+        _runner = AsyncLLMRunner(AsyncLMStudioClient(config, pool), breaker or get_llm_circuit_breaker())
+        return _runner
+
+def get_async_llm_runner():
+    """
+    Get the process-wide runner, created from LM_STUDIO_CONFIG on first use
+
+    Returns:
+        AsyncLLMRunner: Shared runner
+    """
+    global _runner
+    if _runner is None:
+        with _runner_lock:
+            if _runner is None:
+                from config import LM_STUDIO_CONFIG
+                _runner = AsyncLLMRunner(
+                    AsyncLMStudioClient(LM_STUDIO_CONFIG, get_llm_backend_pool()), get_llm_circuit_breaker()
+                )
+    return _runner
@@ -0,0 +1,124 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+import numpy as np
+
+class MicroBatchEncoder:
+    """
+    In-process encoder service that micro-batches requests across sessions
+
+    Every Streamlit session calls encode() on the same shared instance. Small
+    requests are queued; a single worker thread collects them for up to
+    max_wait_ms, or until max_batch_size sentences are waiting, encodes them in
+    one forward pass and hands each caller its own rows. Requests larger than
+    a batch (knowledge base builds) bypass the queue.
+    """
+
+    def __init__(self, model, max_batch_size=32, max_wait_ms=5):
+        """
+        Args:
+            model: Encoder exposing encode() like SentenceTransformer
+            max_batch_size (int): Maximum sentences per forward pass
+            max_wait_ms (float): How long the first request waits for company
+        """
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.batches = 0
+        self.requests = 0
+        self.sentences = 0
+        self._queue = queue.Queue()
+        self._closed = False
+        self._worker = threading.Thread(target=self._run, name="micro-batch-encoder", daemon=True)
+        self._worker.start()
+
+    def __getattr__(self, name):
+        # Expose the wrapped model's attributes (tokenizer, dimension, ...)
+        if name == "model":
+            raise AttributeError(name)
+        return getattr(self.model, name)
+
+    def encode(self, sentences, convert_to_tensor=False, **kwargs):
+        """
+        Encode sentences, sharing a forward pass with concurrent callers
+
+        Args:
+            sentences (str or list): Sentence or list of sentences
+            convert_to_tensor (bool): Ignored; NumPy arrays are always returned
+
+        Returns:
+            numpy.ndarray: (n, dim) embeddings, or (dim,) for a single string
+        """
+        single = isinstance(sentences, str)
+        sentences = [sentences] if single else list(sentences)
+        if len(sentences) > self.max_batch_size or self._closed:
+            vectors = np.asarray(self.model.encode(sentences, convert_to_tensor=False, **kwargs))
+        else:
+            future = Future()
+            self._queue.put((sentences, future))
+            vectors = future.result()
+        return vectors[0] if single else vectors
+
+    def _collect(self):
+        """Block for one request, then gather more until the batch is full or the wait expires"""
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        size = len(first[0])
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)
+                break
+            batch.append(item)
+            size += len(item[0])
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            texts = [text for sentences, _ in batch for text in sentences]
+            try:
+                vectors = np.asarray(self.model.encode(texts, batch_size=len(texts), convert_to_tensor=False))
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            self.batches += 1
+            self.requests += len(batch)
+            self.sentences += len(texts)
+            start = 0
+            for sentences, future in batch:
+                future.set_result(vectors[start:start + len(sentences)])
+                start += len(sentences)
+
+    def stats(self):
+        """
+        Get batching statistics
+
+        Returns:
+            dict: Batches run, requests and sentences served, mean batch size
+        """
+        return {
+            "batches": self.batches,
+            "requests": self.requests,
+            "sentences": self.sentences,
+            "mean_batch_size": self.sentences / self.batches if self.batches else 0.0,
+            "queued": self._queue.qsize()
+        }
+
+    def close(self):
+        """Stop the worker; later calls encode directly on the model"""
+        self._closed = True
+        self._queue.put(None)
@@ -0,0 +1,139 @@
+import re
+from collections import Counter
+import numpy as np
+
+# Numbers keep their decimal part so doses like "0.9" or "2.5" stay one term
+TOKEN_PATTERN = re.compile(r"\d+(?:\.\d+)?|[^\W_]+")
+
+# Function words match nearly every chunk and say nothing about the topic
+STOPWORDS = frozenset("""
+a about after an and any are as at be before by can do does during for from has have how
+i if in into is it its may must my of on or should than that the their them then there
+these they this to was we were what when where which who why will with you your
+""".split())
+
+def tokenize_for_bm25(text):
+    """
+    Split text into lowercase terms for lexical matching, without stopwords
+
+    Args:
+        text (str): Input text
+
+    Returns:
+        list: List of terms
+    """
+    return [term for term in TOKEN_PATTERN.findall(text.lower()) if term not in STOPWORDS]
+
+class BM25Index:
+    """
+    In-memory inverted index with BM25 scoring
+
+    Postings are stored as flat arrays (CSR layout): the postings of term t
+    live in doc_ids[offsets[t]:offsets[t + 1]], together with a precomputed
+    BM25 weight per posting, so scoring a query is a few array slices.
+    """
+
+    def __init__(self, chunks, k1=1.5, b=0.75):
+        """
+        Build the index over the chunk texts
+
+        Args:
+            chunks (list): List of text chunks
+            k1 (float): BM25 term frequency saturation
+            b (float): BM25 document length normalization
+        """
+        self.k1 = k1
+        self.b = b
+        self.num_docs = len(chunks)
+        self.vocabulary = {}
+
+        term_postings = []
+        doc_lengths = np.zeros(self.num_docs, dtype=np.float32)
+        for doc_id, chunk in enumerate(chunks):
+            terms = Counter(tokenize_for_bm25(chunk))
+            doc_lengths[doc_id] = sum(terms.values())
+            for term, tf in terms.items():
+                term_id = self.vocabulary.setdefault(term, len(term_postings))
+                if term_id == len(term_postings):
+                    term_postings.append([])
+                term_postings[term_id].append((doc_id, tf))
+
+        self.doc_lengths = doc_lengths
+        avg_length = float(doc_lengths.mean()) if self.num_docs else 0.0
+
+        self.offsets = np.zeros(len(term_postings) + 1, dtype=np.int64)
+        self.offsets[1:] = np.cumsum([len(postings) for postings in term_postings])
+        total_postings = int(self.offsets[-1])
+        self.doc_ids = np.empty(total_postings, dtype=np.int32)
+        self.weights = np.empty(total_postings, dtype=np.float32)
+
+        for term_id, postings in enumerate(term_postings):
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            docs = np.fromiter((doc for doc, _ in postings), dtype=np.int32, count=len(postings))
+            tfs = np.fromiter((tf for _, tf in postings), dtype=np.float32, count=len(postings))
+            df = len(postings)
+            idf = np.log(1.0 + (self.num_docs - df + 0.5) / (df + 0.5))
+            norm = k1 * (1.0 - b + b * doc_lengths[docs] / max(avg_length, 1e-9))
+            self.doc_ids[start:end] = docs
+            self.weights[start:end] = idf * tfs * (k1 + 1.0) / (tfs + norm)
+
+    def score(self, query):
+        """
+        Score every chunk against a query
+
+        Args:
+            query (str): Query text
+
+        Returns:
+            numpy.ndarray: BM25 score per chunk
+        """
+        scores = np.zeros(self.num_docs, dtype=np.float32)
+        for term in set(tokenize_for_bm25(query)):
+            term_id = self.vocabulary.get(term)
+            if term_id is None:
+                continue
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            # A document appears at most once per term, so plain fancy-index add is safe
+            scores[self.doc_ids[start:end]] += self.weights[start:end]
+        return scores
+
+    def top_candidates(self, query, limit=50, mask=None):
+        """
+        Get the best lexical matches for a query
+
+        Args:
+            query (str): Query text
+            limit (int): Maximum number of candidates
+            mask (numpy.ndarray): Optional boolean mask of allowed chunks
+
+        Returns:
+            tuple: (chunk indices, BM25 scores), best match first; only chunks
+                sharing at least one term with the query are returned
+        """
+        scores = self.score(query)
+        if mask is not None:
+            scores[~mask] = 0.0
+        matched = np.flatnonzero(scores > 0)
+        if len(matched) > limit:
+            matched = matched[np.argpartition(-scores[matched], limit - 1)[:limit]]
+        order = np.argsort(-scores[matched], kind="stable")
+        matched = matched[order]
+        return matched, scores[matched]
+
+def reciprocal_rank_fusion(rankings, k=60):
+    """
+    Fuse several rankings with reciprocal rank fusion
+
+    Args:
+        rankings (list): Lists of chunk indices, each ordered best first
+        k (int): RRF smoothing constant
+
+    Returns:
+        list: List of (chunk_index, fused_score) ordered best first
+    """
+    fused = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            doc_id = int(doc_id)
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
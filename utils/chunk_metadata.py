@@ -0,0 +1,101 @@
+import re
+import numpy as np
+
+CHUNK_KINDS = ("text", "table")
+TABLE_HEADER_PATTERN = re.compile(r"^Table from page (\d+):")
+
+def infer_chunk_metadata(chunks, source=""):
+    """
+    Reconstruct per-chunk metadata for knowledge bases saved without it
+
+    Table chunks carry their page in the "Table from page N:" header; the page
+    of a text chunk cannot be recovered and is recorded as 0 (unknown).
+
+    Args:
+        chunks (list): List of text chunks
+        source (str): Source document name
+
+    Returns:
+        list: List of metadata dicts with source, page and kind
+    """
+    metadata = []
+    for chunk in chunks:
+        match = TABLE_HEADER_PATTERN.match(chunk)
+        if match:
+            metadata.append({"source": source, "page": int(match.group(1)), "kind": "table"})
+        else:
+            metadata.append({"source": source, "page": 0, "kind": "text"})
+    return metadata
+
+class ChunkMetadata:
+    """
+    Columnar per-chunk metadata with precomputed boolean masks
+
+    Each facet is stored as a compact code array, and a mask is precomputed for
+    every source and kind value, so filtering is a few vectorized ANDs instead
+    of a pass over per-chunk dicts.
+    """
+
+    def __init__(self, metadata):
+        """
+        Args:
+            metadata (list): List of dicts with source, page and kind per chunk
+        """
+        self.sources = sorted({entry.get("source", "") for entry in metadata})
+        source_ids = {source: i for i, source in enumerate(self.sources)}
+        self.source_codes = np.array([source_ids[entry.get("source", "")] for entry in metadata], dtype=np.int16)
+        self.pages = np.array([entry.get("page", 0) for entry in metadata], dtype=np.int32)
+        self.kind_codes = np.array([CHUNK_KINDS.index(entry.get("kind", "text")) for entry in metadata], dtype=np.int8)
+
+        self.source_masks = {source: self.source_codes == i for i, source in enumerate(self.sources)}
+        self.kind_masks = {kind: self.kind_codes == i for i, kind in enumerate(CHUNK_KINDS)}
+        self._combined_masks = {}
+
+    def __len__(self):
+        return len(self.pages)
+
+    @property
+    def page_range(self):
+        """
+        Returns:
+            tuple: (first page, last page) over chunks with a known page
+        """
+        known = self.pages[self.pages > 0]
+        if not len(known):
+            return 0, 0
+        return int(known.min()), int(known.max())
+
+    def mask(self, filters):
+        """
+        Build the boolean mask of chunks matching a set of filters
+
+        Args:
+            filters (dict): Any of "source" (str), "kind" ("text" or "table")
+                and "pages" ((first, last) inclusive)
+
+        Returns:
+            numpy.ndarray or None: Boolean mask, or None when nothing is filtered
+        """
+        if not filters:
+            return None
+        key = (filters.get("source"), filters.get("kind"), tuple(filters["pages"]) if filters.get("pages") else None)
+        if key == (None, None, None):
+            return None
+        cached = self._combined_masks.get(key)
+        if cached is not None:
+            return cached
+
+        mask = np.ones(len(self), dtype=bool)
+        source, kind, pages = key
+        if source is not None:
+            mask &= self.source_masks.get(source, np.zeros(len(self), dtype=bool))
+        if kind is not None:
+            mask &= self.kind_masks.get(kind, np.zeros(len(self), dtype=bool))
+        if pages is not None:
+            first, last = pages
+            mask &= (self.pages >= first) & (self.pages <= last)
+        mask.setflags(write=False)
+        if len(self._combined_masks) >= 64:
+            self._combined_masks.clear()
+        self._combined_masks[key] = mask
+        return mask
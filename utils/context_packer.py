@@ -0,0 +1,155 @@
+import re
+
+def count_tokens(text, tokenizer=None):
+    """
+    Count the tokens in a piece of text
+
+    Args:
+        text (str): Input text
+        tokenizer: Hugging Face tokenizer; without one the count is estimated
+            at four characters per token
+
+    Returns:
+        int: Number of tokens
+    """
+    if tokenizer is None:
+        return (len(text) + 3) // 4
+    return len(tokenizer.encode(text, add_special_tokens=False))
+
+def compact_table_text(text):
+    """
+    Strip the padding pdfplumber leaves in table text
+
+    Args:
+        text (str): Table chunk text
+
+    Returns:
+        str: Table text without empty cells and runs of whitespace
+    """
+    lines = []
+    for line in text.split("\n"):
+        cells = [cell.strip() for cell in line.split("|")]
+        cells = [cell for cell in cells if cell and cell != "None"]
+        if cells:
+            lines.append(" | ".join(re.sub(r'\s+', ' ', cell) for cell in cells))
+    return "\n".join(lines)
+
+def merge_overlapping_text(first, second, min_overlap=20, max_overlap=300):
+    """
+    Join two texts, dropping the part of the second that repeats the first
+
+    Args:
+        first (str): Earlier text
+        second (str): Later text
+        min_overlap (int): Shortest suffix/prefix overlap treated as repeated text
+        max_overlap (int): Longest overlap searched for
+
+    Returns:
+        str: Merged text
+    """
+    if second in first:
+        return first
+    if first in second:
+        return second
+    for size in range(min(len(first), len(second), max_overlap), min_overlap - 1, -1):
+        if first.endswith(second[:size]):
+            return first + second[size:]
+    return first + " " + second
+
+def truncate_to_tokens(text, max_tokens, tokenizer=None):
+    """
+    Cut text to at most max_tokens tokens on a word boundary
+
+    Args:
+        text (str): Input text
+        max_tokens (int): Token limit
+        tokenizer: Hugging Face tokenizer, or None for the estimate
+
+    Returns:
+        str: Truncated text
+    """
+    if count_tokens(text, tokenizer) <= max_tokens:
+        return text
+    words = text.split(" ")
+    low, high = 0, len(words)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if count_tokens(" ".join(words[:middle]), tokenizer) <= max_tokens:
+            low = middle
+        else:
+            high = middle - 1
+    return " ".join(words[:low])
+
+def pack_context(hits, chunks, token_budget=1024, tokenizer=None, chunk_metadata=None, separator="\n\n", token_margin=1.0):
+    """
+    Pack the best retrieved chunks into a token-budgeted prompt context
+
+    Hits that are neighbours in the document (consecutive chunks on the same
+    page) or that repeat each other's text are merged into one passage, table
+    chunks are compacted, and passages are then added best first until the
+    budget is used up.
+
+    Counts come from the embedding tokenizer (or the estimate), not the
+    generation model's; token_margin scales them up so the context still
+    fits when the LLM's tokenizer splits the same text into more tokens.
+
+    Args:
+        hits (list): List of (chunk_index, similarity) ordered best first
+        chunks (list): List of text chunks
+        token_budget (int): Maximum tokens in the packed context
+        tokenizer: Hugging Face tokenizer used for counting, or None for the estimate
+        chunk_metadata (list): Optional per-chunk metadata with "page"
+        separator (str): Text placed between passages
+        token_margin (float): Assumed ratio of LLM tokens to counted tokens (>= 1)
+
+    Returns:
+        tuple: (context text, list of chunk indices included)
+    """
+    if not hits:
+        return "", []
+
+    rank_of = {chunk_id: rank for rank, (chunk_id, _) in enumerate(hits)}
+
+    def page_of(chunk_id):
+        return chunk_metadata[chunk_id].get("page") if chunk_metadata else None
+
+    # Merge runs of neighbouring chunks, walking them in document order
+    passages = []
+    for chunk_id in sorted(rank_of):
+        text = chunks[chunk_id]
+        if text.startswith("Table from page"):
+            text = compact_table_text(text)
+        previous = passages[-1] if passages else None
+        if (previous and chunk_id == previous["chunk_ids"][-1] + 1
+                and page_of(chunk_id) == page_of(previous["chunk_ids"][-1])):
+            previous["text"] = merge_overlapping_text(previous["text"], text)
+            previous["chunk_ids"].append(chunk_id)
+            previous["rank"] = min(previous["rank"], rank_of[chunk_id])
+        else:
+            passages.append({"text": text, "chunk_ids": [chunk_id], "rank": rank_of[chunk_id]})
+
+    # Overlapping text can also appear between non-adjacent chunks
+    unique_passages = []
+    for passage in sorted(passages, key=lambda item: item["rank"]):
+        if any(passage["text"] in kept["text"] for kept in unique_passages):
+            continue
+        unique_passages.append(passage)
+
+    budget = int(token_budget / max(token_margin, 1.0))
+    packed = []
+    included = []
+    used_tokens = 0
+    separator_tokens = count_tokens(separator, tokenizer)
+    for passage in unique_passages:
+        cost = count_tokens(passage["text"], tokenizer) + (separator_tokens if packed else 0)
+        if used_tokens + cost <= budget:
+            packed.append(passage["text"])
+            included.extend(passage["chunk_ids"])
+            used_tokens += cost
+        elif not packed:
+            # The best passage alone is over budget: keep as much of it as fits
+            packed.append(truncate_to_tokens(passage["text"], budget, tokenizer))
+            included.extend(passage["chunk_ids"])
+            break
+
+    return separator.join(packed), included
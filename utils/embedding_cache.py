@@ -0,0 +1,124 @@
+import re
+import threading
+import weakref
+from collections import OrderedDict
+
+def normalize_query_text(text):
+    """
+    Normalize a query so trivially different spellings share a cache entry
+
+    Args:
+        text (str): Query text
+
+    Returns:
+        str: Lowercased text with collapsed whitespace
+    """
+    return re.sub(r'\s+', ' ', text).strip().lower()
+
+class QueryEmbeddingCache:
+    """
+    Bounded LRU cache from normalized query text to query vector
+
+    The cache remembers which model produced its vectors and empties itself
+    when it is used with a different model. Safe to share between threads.
+    """
+
+    def __init__(self, max_entries=1024):
+        """
+        Args:
+            max_entries (int): Maximum number of cached query vectors
+        """
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._model_ref = None
+        self._lock = threading.Lock()
+
+    def _bind_model(self, model):
+        # Called with the lock held
+        bound = self._model_ref() if self._model_ref is not None else None
+        if bound is model:
+            return
+        self._entries.clear()
+        try:
+            self._model_ref = weakref.ref(model)
+        except TypeError:
+            self._model_ref = lambda: model
+
+    def get(self, model, text):
+        """
+        Look up the vector for a query
+
+        Args:
+            model: Embedding model the vector must come from
+            text (str): Query text
+
+        Returns:
+            numpy.ndarray or None: Cached vector, or None on a miss
+        """
+        key = normalize_query_text(text)
+        with self._lock:
+            self._bind_model(model)
+            vector = self._entries.get(key)
+            if vector is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return vector
+
+    def put(self, model, text, vector):
+        """
+        Store the vector for a query
+
+        Args:
+            model: Embedding model that produced the vector
+            text (str): Query text
+            vector (numpy.ndarray): Query vector
+        """
+        vector.setflags(write=False)
+        key = normalize_query_text(text)
+        with self._lock:
+            self._bind_model(model)
+            self._entries[key] = vector
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop all cached vectors and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self._model_ref = None
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """
+        Get cache statistics
+
+        Returns:
+            dict: Entry count, capacity, hits, misses and hit rate
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+# Process-wide cache shared by every session
+_query_embedding_cache = QueryEmbeddingCache()
+
+def get_query_embedding_cache():
+    """
+    Get the process-wide query embedding cache
+
+    Returns:
+        QueryEmbeddingCache: Shared cache instance
+    """
+    return _query_embedding_cache
@@ -0,0 +1,85 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+# Encoder loaded once in each worker process
+_worker_model = None
+
+def _pin_threads(threads):
+    """Limit the BLAS/OpenMP and torch thread pools of this process"""
+    # A spawned worker re-imports the parent's main module, so NumPy and its
+    # BLAS are usually loaded before the initializer runs and no longer read
+    # the environment; threadpoolctl resizes pools that are already loaded.
+    # The variables still cover libraries loaded later.
+    for variable in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[variable] = str(threads)
+    from threadpoolctl import threadpool_limits
+    threadpool_limits(limits=threads)
+    try:
+        import torch
+        torch.set_num_threads(threads)
+        torch.set_num_interop_threads(1)
+    except (ImportError, RuntimeError):
+        pass
+
+def _init_worker(config, threads):
+    global _worker_model
+    _pin_threads(threads)
+    from .model_loader import load_embedding_backend
+    _worker_model = load_embedding_backend(dict(config, onnx_threads=threads))
+
+def _encode_batch(indices, texts):
+    vectors = _worker_model.encode(texts, batch_size=len(texts), convert_to_tensor=False)
+    return indices, np.asarray(vectors, dtype=np.float32)
+
+class EmbeddingProcessPool:
+    """
+    Encoder worker processes for building the knowledge base embeddings
+
+    One large torch process scales poorly across many cores; several
+    processes with a few pinned threads each keep every core busy. Each
+    worker loads its own copy of the encoder, so memory grows with the
+    number of workers.
+    """
+
+    def __init__(self, config, workers=0, threads_per_worker=0):
+        """
+        Args:
+            config (dict): Embedding settings (see EMBEDDING_CONFIG)
+            workers (int): Worker processes, 0 for one per four CPU threads
+            threads_per_worker (int): Threads pinned per worker, 0 to split the CPUs evenly
+        """
+        cpus = os.cpu_count() or 1
+        self.workers = workers or max(1, cpus // 4)
+        self.threads_per_worker = threads_per_worker or max(1, cpus // self.workers)
+        # Spawn: forking a process that already holds torch threads can deadlock
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(dict(config), self.threads_per_worker)
+        )
+
+    def submit(self, indices, texts):
+        """
+        Queue one batch for encoding
+
+        Args:
+            indices (list): Chunk index of each text
+            texts (list): Texts to encode
+
+        Returns:
+            concurrent.futures.Future: Resolves to (indices, embeddings)
+        """
+        return self._executor.submit(_encode_batch, list(indices), list(texts))
+
+    def close(self):
+        """Shut the worker processes down"""
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,115 @@
+import re
+import numpy as np
+from .embedding_cache import QueryEmbeddingCache
+from .context_packer import compact_table_text
+
+# Sentence vectors are reused across questions that retrieve the same chunks
+_sentence_embedding_cache = QueryEmbeddingCache(max_entries=8192)
+
+def split_into_sentences(text, min_length=20):
+    """
+    Split a chunk into answerable sentences
+
+    Table chunks are split into rows, keeping the header line out.
+
+    Args:
+        text (str): Chunk text
+        min_length (int): Shortest sentence kept
+
+    Returns:
+        list: List of sentences
+    """
+    if text.startswith("Table from page"):
+        rows = compact_table_text(text).split("\n")[1:]
+        return [row for row in rows if len(row) >= min_length]
+    sentences = re.split(r'(?<=[.!?;])\s+|\n+', text)
+    return [sentence.strip() for sentence in sentences if len(sentence.strip()) >= min_length]
+
+def _unit(vector):
+    vector = np.asarray(vector, dtype=np.float32).reshape(-1)
+    return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+def embed_sentences(sentences, model, known=None):
+    """
+    Embed sentences as retrieval documents, reusing cached vectors
+
+    Args:
+        sentences (list): List of sentences
+        model: SentenceTransformer model
+        known (dict): Sentence -> vector already embedded the same way (e.g. a
+            single-sentence chunk's stored embedding)
+
+    Returns:
+        numpy.ndarray: One normalized vector per sentence
+    """
+    known = known or {}
+    vectors = [
+        _unit(known[sentence]) if sentence in known else _sentence_embedding_cache.get(model, sentence)
+        for sentence in sentences
+    ]
+    missing = [i for i, vector in enumerate(vectors) if vector is None]
+    if missing:
+        instruction = "Represent this document for retrieval: "
+        encoded = model.encode([instruction + sentences[i] for i in missing], convert_to_tensor=False)
+        for i, vector in zip(missing, encoded):
+            vector = _unit(vector)
+            _sentence_embedding_cache.put(model, sentences[i], vector)
+            vectors[i] = vector
+    return np.vstack(vectors)
+
+def extractive_answer(query_vector, hits, chunks, model, chunk_metadata=None, max_sentences=3, source_hits=3,
+                      chunk_embeddings=None):
+    """
+    Answer a question with the retrieved sentences closest to it
+
+    Args:
+        query_vector (numpy.ndarray): Query embedding
+        hits (list): List of (chunk_index, similarity) ordered best first
+        chunks (list): List of text chunks
+        model: SentenceTransformer model
+        chunk_metadata (list): Optional per-chunk metadata with "page" and "source"
+        max_sentences (int): Number of sentences in the answer
+        source_hits (int): Number of top hits to draw sentences from
+        chunk_embeddings (list): Stored chunk embeddings; a chunk that is a single
+            sentence reuses its vector instead of being encoded again
+
+    Returns:
+        dict: Answer text, best sentence score and the pages cited
+    """
+    candidates = []
+    known = {}
+    for chunk_id, _ in hits[:source_hits]:
+        sentences = split_into_sentences(chunks[chunk_id])
+        if chunk_embeddings is not None and sentences == [chunks[chunk_id]]:
+            known[chunks[chunk_id]] = chunk_embeddings[chunk_id]
+        for sentence in sentences:
+            candidates.append((sentence, chunk_id))
+    if not candidates:
+        return {"answer": "", "score": 0.0, "pages": []}
+
+    query_vector = _unit(query_vector)
+    scores = embed_sentences([sentence for sentence, _ in candidates], model, known) @ query_vector
+
+    lines = []
+    pages = []
+    seen = set()
+    for i in np.argsort(-scores):
+        sentence, chunk_id = candidates[i]
+        if sentence in seen:
+            continue
+        seen.add(sentence)
+        page = chunk_metadata[chunk_id].get("page", 0) if chunk_metadata else 0
+        if page:
+            lines.append(f"- {sentence} (page {page})")
+            if page not in pages:
+                pages.append(page)
+        else:
+            lines.append(f"- {sentence}")
+        if len(lines) == max_sentences:
+            break
+
+    return {
+        "answer": "\n".join(lines),
+        "score": float(scores.max()),
+        "pages": pages
+    }
@@ -0,0 +1,151 @@
+import asyncio
+import heapq
+import itertools
+import math
+
+# Lower runs first; unknown response types are scheduled as "standard"
+DEFAULT_PRIORITIES = {"quick": 0, "standard": 1, "detailed": 2}
+
+class GenerationQueueFull(Exception):
+    """Raised when a generation is refused because the queue is full"""
+
+    def __init__(self, retry_after):
+        """
+        Args:
+            retry_after (int): Suggested seconds to wait before asking again
+        """
+        super().__init__(f"generation queue is full, retry in about {retry_after} seconds")
+        self.retry_after = retry_after
+
+class GenerationScheduler:
+    """
+    Admission control for generation slots
+
+    Up to capacity generations run at once. Further requests wait in a
+    bounded queue, ordered by priority (quick answers ahead of detailed
+    ones) and then by how many requests their session already has queued
+    or running, so one busy session cannot crowd out the others. When the
+    queue is full a request is refused at once with a retry hint instead
+    of waiting behind work it would time out on. Must be used from a
+    single event loop.
+    """
+
+    def __init__(self, capacity, max_queue=16, priorities=None, initial_estimate=5.0, smoothing=0.2):
+        """
+        Args:
+            capacity (int): Generations allowed to run at once
+            max_queue (int): Requests allowed to wait for a slot
+            priorities (dict): Response type -> level, lower runs first
+            initial_estimate (float): Assumed seconds per generation until one has finished
+            smoothing (float): Weight of the newest sample in the generation time average
+        """
+        self.capacity = capacity
+        self.max_queue = max_queue
+        self.priorities = priorities or DEFAULT_PRIORITIES
+        self.default_level = self.priorities.get("standard", max(self.priorities.values()))
+        self.average_seconds = initial_estimate
+        self.smoothing = smoothing
+        self.running = 0
+        self.queued = 0
+        self.admitted = 0
+        self.rejected = 0
+        self._heap = []  # (level, session_round, sequence, future)
+        self._sequence = itertools.count()
+        self._session_load = {}  # session -> requests queued or running
+
+    def retry_after(self):
+        """
+        Estimate when a refused request is likely to get a slot
+
+        Returns:
+            int: Seconds, at least 1
+        """
+        waits = (self.queued + 1) / self.capacity
+        return max(1, math.ceil(waits * self.average_seconds))
+
+    def _add_load(self, session_id, amount):
+        if session_id is None:
+            return
+        load = self._session_load.get(session_id, 0) + amount
+        if load > 0:
+            self._session_load[session_id] = load
+        else:
+            self._session_load.pop(session_id, None)
+
+    async def acquire(self, priority=None, session_id=None):
+        """
+        Wait for a generation slot; pair with release()
+
+        Args:
+            priority (str): Response type (quick, standard, detailed)
+            session_id (str): Caller's session, for fairness between sessions
+
+        Raises:
+            GenerationQueueFull: When the queue is already full
+        """
+        if self.running < self.capacity and not self.queued:
+            self.running += 1
+            self.admitted += 1
+            self._add_load(session_id, 1)
+            return
+        if self.queued >= self.max_queue:
+            self.rejected += 1
+            raise GenerationQueueFull(self.retry_after())
+
+        level = self.priorities.get(priority, self.default_level)
+        session_round = self._session_load.get(session_id, 0) if session_id is not None else 0
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._heap, (level, session_round, next(self._sequence), future))
+        self.queued += 1
+        self._add_load(session_id, 1)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.cancelled():
+                # Still queued; _dispatch skips the cancelled entry
+                self.queued -= 1
+                self._add_load(session_id, -1)
+            else:
+                # Granted a slot just as the caller gave up
+                self.release(session_id)
+            raise
+        self.admitted += 1
+
+    def release(self, session_id=None, duration=None):
+        """
+        Give back a slot and hand it to the next queued request
+
+        Args:
+            session_id (str): Session passed to acquire()
+            duration (float): Seconds the slot was held, for the retry estimate
+        """
+        self.running -= 1
+        self._add_load(session_id, -1)
+        if duration is not None:
+            self.average_seconds += self.smoothing * (duration - self.average_seconds)
+        self._dispatch()
+
+    def _dispatch(self):
+        while self.running < self.capacity and self._heap:
+            future = heapq.heappop(self._heap)[-1]
+            if future.cancelled():
+                continue
+            self.queued -= 1
+            self.running += 1
+            future.set_result(None)
+
+    def stats(self):
+        """
+        Returns:
+            dict: Slots, running and queued generations, admissions, rejections and average generation time
+        """
+        return {
+            "capacity": self.capacity,
+            "running": self.running,
+            "queued": self.queued,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "average_seconds": self.average_seconds,
+            "sessions": len(self._session_load)
+        }
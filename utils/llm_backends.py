@@ -0,0 +1,209 @@
+import threading
+import time
+
+class LLMBackend:
+    """One OpenAI-compatible generation server and its live statistics"""
+
+    def __init__(self, base_url, model_name):
+        """
+        Args:
+            base_url (str): Server URL, e.g. "http://localhost:1234"
+            model_name (str): Model name to request from this server
+        """
+        self.base_url = base_url.rstrip("/")
+        self.model_name = model_name
+        self.outstanding = 0
+        self.healthy = True
+        self.ejected_until = 0.0
+        self.consecutive_failures = 0
+        self.latency_ms = None  # moving average
+        self.requests = 0
+        self.failures = 0
+        self.ejections = 0
+
+    def available(self, now=None):
+        return self.healthy and (now or time.time()) >= self.ejected_until
+
+class LLMBackendPool:
+    """
+    Routes LLM requests across generation servers
+
+    Each request goes to the available backend with the fewest requests in
+    flight, ties broken by the lower moving-average latency. A backend is
+    ejected after consecutive failures or a failed health probe, and
+    re-admitted by the first successful probe once its ejection expires.
+    """
+
+    def __init__(self, backends, failure_threshold=3, ejection_seconds=30, latency_smoothing=0.2):
+        """
+        Args:
+            backends (list): LLMBackend instances
+            failure_threshold (int): Consecutive request failures that eject a backend
+            ejection_seconds (float): Minimum time an ejected backend stays out
+            latency_smoothing (float): Weight of the newest sample in the latency average
+        """
+        if not backends:
+            raise ValueError("LLMBackendPool needs at least one backend")
+        self.backends = list(backends)
+        self.failure_threshold = failure_threshold
+        self.ejection_seconds = ejection_seconds
+        self.latency_smoothing = latency_smoothing
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Build the pool from LM Studio settings: the primary base_url plus any "backends"
+
+        Args:
+            config (dict): LM Studio settings (see LM_STUDIO_CONFIG)
+
+        Returns:
+            LLMBackendPool: Backend pool
+        """
+        entries = [{"base_url": config["base_url"]}] + list(config.get("backends", []))
+        backends = [
+            LLMBackend(entry["base_url"], entry.get("model_name", config["model_name"]))
+            for entry in entries
+        ]
+        return cls(
+            backends,
+            failure_threshold=config.get("backend_failure_threshold", 3),
+            ejection_seconds=config.get("backend_ejection_seconds", 30)
+        )
+
+    def __len__(self):
+        return len(self.backends)
+
+    def _rank(self, backend):
+        latency = backend.latency_ms if backend.latency_ms is not None else 0.0
+        return backend.outstanding, latency
+
+    def choose(self, exclude=()):
+        """
+        Pick the backend a request should go to, without reserving it
+
+        Falls back to all backends when none is available, so a recovering
+        server is still tried rather than failing every request.
+
+        Args:
+            exclude (tuple): Backends to avoid (e.g. one that just failed)
+
+        Returns:
+            LLMBackend: Chosen backend
+        """
+        now = time.time()
+        with self._lock:
+            candidates = [b for b in self.backends if b.available(now) and b not in exclude]
+            if not candidates:
+                candidates = [b for b in self.backends if b not in exclude] or self.backends
+            return min(candidates, key=self._rank)
+
+    def acquire(self, exclude=()):
+        """
+        Reserve the least loaded backend for a request; pair with release()
+
+        Args:
+            exclude (tuple): Backends to avoid
+
+        Returns:
+            LLMBackend: Reserved backend
+        """
+        backend = self.choose(exclude)
+        with self._lock:
+            backend.outstanding += 1
+            backend.requests += 1
+        return backend
+
+    def release(self, backend, success=None, latency_ms=None):
+        """
+        Finish a request and record its outcome
+
+        Args:
+            backend (LLMBackend): Backend returned by acquire()
+            success (bool): Whether the backend answered; None records nothing (e.g. cancelled)
+            latency_ms (float): Time until the backend answered
+        """
+        with self._lock:
+            backend.outstanding -= 1
+            if success is None:
+                return
+            self._record(backend, success, latency_ms)
+            if not success and backend.consecutive_failures >= self.failure_threshold:
+                self._eject(backend)
+
+    def record_probe(self, backend, success):
+        """
+        Record a health probe: a failure ejects the backend, a success re-admits it
+
+        Args:
+            backend (LLMBackend): Probed backend
+            success (bool): Whether the probe succeeded
+        """
+        with self._lock:
+            if success:
+                backend.healthy = True
+                backend.consecutive_failures = 0
+            elif backend.healthy:
+                self._eject(backend)
+
+    def _record(self, backend, success, latency_ms):
+        if success:
+            backend.consecutive_failures = 0
+            if latency_ms is not None:
+                if backend.latency_ms is None:
+                    backend.latency_ms = latency_ms
+                else:
+                    backend.latency_ms += self.latency_smoothing * (latency_ms - backend.latency_ms)
+        else:
+            backend.failures += 1
+            backend.consecutive_failures += 1
+
+    def _eject(self, backend):
+        backend.healthy = False
+        backend.ejected_until = time.time() + self.ejection_seconds
+        backend.ejections += 1
+
+    def any_available(self):
+        """
+        Returns:
+            bool: Whether at least one backend is taking requests
+        """
+        now = time.time()
+        with self._lock:
+            return any(backend.available(now) for backend in self.backends)
+
+    def stats(self):
+        """
+        Returns:
+            list: Per-backend URL, availability, load, latency and failure counts
+        """
+        now = time.time()
+        with self._lock:
+            return [{
+                "base_url": backend.base_url,
+                "available": backend.available(now),
+                "outstanding": backend.outstanding,
+                "latency_ms": backend.latency_ms,
+                "requests": backend.requests,
+                "failures": backend.failures,
+                "ejections": backend.ejections
+            } for backend in self.backends]
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_llm_backend_pool():
+    """
+    Get the process-wide backend pool, created from LM_STUDIO_CONFIG on first use
+
+    Returns:
+        LLMBackendPool: Shared pool
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                from config import LM_STUDIO_CONFIG
+                _pool = LLMBackendPool.from_config(LM_STUDIO_CONFIG)
+    return _pool
@@ -0,0 +1,107 @@
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from .llm_backends import LLMBackendPool, get_llm_backend_pool
+
+class LMStudioClient:
+    """
+    Shared HTTP client for the LM Studio OpenAI-compatible server
+
+    Used for health probes and model listing only; generation goes through
+    AsyncLMStudioClient. A single requests.Session keeps connections to the
+    servers alive and pooled, so calls after the first skip TCP setup.
+    Connection failures and 502/503/504 responses are retried with
+    exponential backoff.
+    """
+
+    def __init__(self, config, pool=None):
+        """
+        Args:
+            config (dict): LM Studio settings (see LM_STUDIO_CONFIG)
+            pool (LLMBackendPool): Generation servers, built from config if None
+        """
+        self.pool = pool or LLMBackendPool.from_config(config)
+        self.health_timeout = config.get("health_timeout", 5)
+
+        retry = Retry(
+            total=config.get("max_retries", 2),
+            backoff_factor=config.get("retry_backoff", 0.5),
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset({"GET"}),
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(
+            pool_connections=len(self.pool),
+            pool_maxsize=config.get("pool_size", 10),
+            max_retries=retry
+        )
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({"Content-Type": "application/json"})
+        # Health probes fail fast instead of retrying; they keep their own connections
+        self.probe_session = requests.Session()
+        probe_adapter = HTTPAdapter(pool_connections=len(self.pool), pool_maxsize=1, max_retries=0)
+        self.probe_session.mount("http://", probe_adapter)
+        self.probe_session.mount("https://", probe_adapter)
+
+    def list_models(self, retry=True, backend=None):
+        """
+        Get the models a server has loaded
+
+        Args:
+            retry (bool): Retry connection errors; health probes pass False
+            backend (LLMBackend): Server to ask, the least loaded one if None
+
+        Returns:
+            list: Model entries
+
+        Raises:
+            requests.exceptions.RequestException: On connection failure or an error status
+        """
+        backend = backend or self.pool.choose()
+        session = self.session if retry else self.probe_session
+        response = session.get(f"{backend.base_url}/v1/models", timeout=self.health_timeout)
+        response.raise_for_status()
+        return response.json().get("data", [])
+
+    def close(self):
+        self.session.close()
+        self.probe_session.close()
+
+_client = None
+_client_lock = threading.Lock()
+
+def configure_lm_studio_client(config, pool=None):
+    """
+    Replace the shared LM Studio client
+
+    Args:
+        config (dict): LM Studio settings (see LM_STUDIO_CONFIG)
+        pool (LLMBackendPool): Backend pool to share, built from config if None
+
+    Returns:
+        LMStudioClient: The new shared client
+    """
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+        _client = LMStudioClient(config, pool)
+        return _client
+
+def get_lm_studio_client():
+    """
+    Get the process-wide LM Studio client, created from LM_STUDIO_CONFIG on first use
+
+    Returns:
+        LMStudioClient: Shared client
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from config import LM_STUDIO_CONFIG
+                _client = LMStudioClient(LM_STUDIO_CONFIG, get_llm_backend_pool())
+    return _client
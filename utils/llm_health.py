@@ -0,0 +1,128 @@
+import threading
+import time
+import requests
+from .llm_client import get_lm_studio_client
+
+class LLMHealthMonitor:
+    """
+    Probes the LLM backends on a background thread and caches the result
+
+    The request path reads the last known status instead of making its own
+    blocking health check, so an LM Studio outage costs nothing per
+    interaction. A status older than the TTL counts as unavailable. Probe
+    results also eject failing backends from the pool and re-admit them;
+    LLM generation is available while any backend in the pool is.
+    """
+
+    def __init__(self, client_fn=get_lm_studio_client, interval_seconds=15, ttl_seconds=45):
+        """
+        Args:
+            client_fn (callable): Returns the LMStudioClient to probe
+            interval_seconds (float): Seconds between probes
+            ttl_seconds (float): How long a successful probe is trusted
+        """
+        self.interval = interval_seconds
+        self.ttl = ttl_seconds
+        self._client_fn = client_fn
+        self._lock = threading.Lock()
+        self._available = None  # None until the first probe finishes
+        self._models = []
+        self._checked_at = None
+        self._latency_ms = None
+        self._error = None
+        self._backends = []
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="llm-health-monitor", daemon=True)
+        self._thread.start()
+
+    def _probe(self):
+        start = time.time()
+        client = self._client_fn()
+        models, errors = [], []
+        for backend in client.pool.backends:
+            try:
+                backend_models = client.list_models(retry=False, backend=backend)
+            except (requests.exceptions.RequestException, ValueError) as e:
+                client.pool.record_probe(backend, False)
+                errors.append(f"{backend.base_url}: {e}")
+                continue
+            client.pool.record_probe(backend, True)
+            models.extend(model for model in backend_models if model not in models)
+        available = len(errors) < len(client.pool)
+        with self._lock:
+            self._available = available
+            self._models = models if available else self._models
+            self._checked_at = time.time()
+            self._latency_ms = (self._checked_at - start) * 1000
+            self._error = "; ".join(errors) or None
+            self._backends = client.pool.stats()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wake.clear()
+            self._probe()
+            self._wake.wait(self.interval)
+
+    def is_available(self):
+        """
+        Whether any backend is up, without blocking
+
+        Returns:
+            bool: True if the last probe is within the TTL and the pool has a backend in rotation
+        """
+        with self._lock:
+            if self._checked_at is None or time.time() - self._checked_at > self.ttl:
+                return False
+        return self._client_fn().pool.any_available()
+
+    def models(self):
+        """
+        Returns:
+            list: Models reported by the last successful probe
+        """
+        with self._lock:
+            return list(self._models)
+
+    def status(self):
+        """
+        Get the cached backend status
+
+        Returns:
+            dict: State ("checking", "up", "stale" or "down"), models, last check age, probe
+                latency, errors and per-backend statistics
+        """
+        with self._lock:
+            if self._available is None:
+                state = "checking"
+            elif not self._client_fn().pool.any_available():
+                state = "down"
+            elif time.time() - self._checked_at > self.ttl:
+                state = "stale"
+            else:
+                state = "up"
+            return {
+                "state": state,
+                "models": [model.get("id") for model in self._models],
+                "age_seconds": time.time() - self._checked_at if self._checked_at else None,
+                "latency_ms": self._latency_ms,
+                "error": self._error,
+                "backends": list(self._backends)
+            }
+
+    def report_failure(self):
+        """
+        Probe again right away after a failed request
+
+        The failure itself is recorded against the backend that served the
+        request by the LLMBackendPool, so the other backends stay in rotation.
+        """
+        self._wake.set()
+
+    def check_now(self):
+        """Probe again right away (the result arrives in the background)"""
+        self._wake.set()
+
+    def stop(self):
+        self._stopped.set()
+        self._wake.set()
@@ -1,41 +1,132 @@
+import asyncio
 import requests
-import json
+from .async_llm_client import LLM_REQUEST_ERRORS, get_async_llm_runner
+from .generation_scheduler import GenerationQueueFull
+from .llm_client import get_lm_studio_client
+from .resilience import CircuitOpenError
+from .response_cache import SQLiteResponseCache, get_response_cache
 
-def query_lm_studio(prompt, system_message="You are a helpful nursing chatbot. Only answer based on the context provided.", temperature=0.7, max_tokens=500):
+CIRCUIT_OPEN_MESSAGE = "Error connecting to LM Studio: generation paused after repeated failures or slow responses"
+BUSY_MESSAGE = "Error connecting to LM Studio: busy with other questions"
+
+def describe_llm_error(error):
+    """
+    User-facing message for a failed generation
+    
+    Args:
+        error (Exception): Connection error, error status or timeout
+        
+    Returns:
+        str: Error message starting with "Error connecting to LM Studio"
+    """
+    if isinstance(error, GenerationQueueFull):
+        return f"{BUSY_MESSAGE} - retry in about {error.retry_after} seconds"
+    if isinstance(error, asyncio.TimeoutError):
+        return "Error connecting to LM Studio: no response within the time budget"
+    return f"Error connecting to LM Studio: {str(error) or type(error).__name__}"
+
+def query_lm_studio(prompt, system_message="You are a helpful nursing chatbot. Only answer based on the context provided.", temperature=None, max_tokens=None, timeout=None, priority=None, session_id=None):
     """
     Query LM Studio API
     
+    Runs on the shared asyncio client, so at most LM_STUDIO_CONFIG["max_concurrency"]
+    generations reach the server at once; others queue by priority, and are
+    refused with a retry hint once the queue is full. Identical requests are answered from the persistent response cache, and
+    identical requests already in flight share one generation. While the
+    circuit breaker is open, generation is skipped and an error returned at once.
+    
     Args:
         prompt (str): User's question with context
         system_message (str): System message for the model
-        temperature (float): Temperature for response generation
-        max_tokens (int): Maximum tokens in response
+        temperature (float): Temperature for response generation (LM_STUDIO_CONFIG default if None)
+        max_tokens (int): Maximum tokens in response (LM_STUDIO_CONFIG default if None)
+        timeout (float): Seconds to wait for the response (LM_STUDIO_CONFIG timeout if None)
+        priority (str): Response type used to order the generation queue (quick, standard, detailed)
+        session_id (str): Caller's session, for fairness between sessions
         
     Returns:
         str: Response from the model
     """
-    url = "http://localhost:1234/v1/chat/completions"
+    messages = [
+        {"role": "system", "content": system_message},
+        {"role": "user", "content": prompt}
+    ]
     
-    headers = {
-        "Content-Type": "application/json"
-    }
+    runner = get_async_llm_runner()
+    cache = get_response_cache()
+    request = runner.client.build_request(messages, temperature, max_tokens)
+    if cache is not None:
+        cached = cache.get(request)
+        if cached is not None:
+            return cached
     
-    data = {
-        "model": "OpenHermes-2.5-Mistral-7B",
-        "messages": [
-            {"role": "system", "content": system_message},
-            {"role": "user", "content": prompt}
-        ],
-        "temperature": temperature,
-        "max_tokens": max_tokens
-    }
+    # The runner reports each generation's outcome to the circuit breaker
+    try:
+        response = runner.chat_completion(
+            messages, temperature, max_tokens, timeout=timeout, key=SQLiteResponseCache.make_key(request),
+            priority=priority, session_id=session_id
+        )
+    except CircuitOpenError:
+        return CIRCUIT_OPEN_MESSAGE
+    except (GenerationQueueFull, *LLM_REQUEST_ERRORS) as e:
+        return describe_llm_error(e)
+    if cache is not None:
+        cache.put(request, response)
+    return response
+
+def stream_lm_studio(prompt, system_message="You are a helpful nursing chatbot. Only answer based on the context provided.", temperature=None, max_tokens=None, timeout=None, priority=None, session_id=None):
+    """
+    Query LM Studio API, yielding the response as it is generated
+    
+    Uses the OpenAI-compatible server-sent events stream ("stream": true),
+    so the first words can be shown long before the completion finishes.
+    
+    Args:
+        prompt (str): User's question with context
+        system_message (str): System message for the model
+        temperature (float): Temperature for response generation (LM_STUDIO_CONFIG default if None)
+        max_tokens (int): Maximum tokens in response (LM_STUDIO_CONFIG default if None)
+        timeout (float): Seconds to wait for the first token (no limit if None)
+        priority (str): Response type used to order the generation queue (quick, standard, detailed)
+        session_id (str): Caller's session, for fairness between sessions
+        
+    Yields:
+        str: Pieces of the response text; a connection failure yields the error message
+    """
+    messages = [
+        {"role": "system", "content": system_message},
+        {"role": "user", "content": prompt}
+    ]
+    
+    runner = get_async_llm_runner()
+    cache = get_response_cache()
+    request = runner.client.build_request(messages, temperature, max_tokens)
+    if cache is not None:
+        cached = cache.get(request)
+        if cached is not None:
+            yield cached
+            return
     
+    parts = []
     try:
-        response = requests.post(url, json=data, headers=headers, timeout=30)
-        response.raise_for_status()
-        return response.json()["choices"][0]["message"]["content"]
-    except requests.exceptions.RequestException as e:
-        return f"Error connecting to LM Studio: {str(e)}"
+        key = SQLiteResponseCache.make_key(request)
+        tokens = runner.stream_chat_completion(
+            messages, temperature, max_tokens, key=key, first_token_timeout=timeout,
+            priority=priority, session_id=session_id
+        )
+        for token in tokens:
+            parts.append(token)
+            yield token
+    except CircuitOpenError:
+        yield CIRCUIT_OPEN_MESSAGE
+        return
+    except (GenerationQueueFull, *LLM_REQUEST_ERRORS) as e:
+        yield describe_llm_error(e)
+        return
+    # Only completed streams with text are cached; an abandoned one never reaches here
+    response = "".join(parts)
+    if cache is not None and response.strip():
+        cache.put(request, response)
 
 def format_nursing_prompt(question, context):
     """
@@ -66,8 +157,8 @@ def check_lm_studio_connection():
         bool: True if connection is successful
     """
     try:
-        response = requests.get("http://localhost:1234/v1/models", timeout=5)
-        return response.status_code == 200
+        get_lm_studio_client().list_models(retry=False)
+        return True
     except requests.exceptions.RequestException:
         return False
 
@@ -79,16 +170,13 @@ def get_available_models():
         list: List of available models
     """
     try:
-        response = requests.get("http://localhost:1234/v1/models", timeout=5)
-        if response.status_code == 200:
-            return response.json().get("data", [])
-        return []
-    except requests.exceptions.RequestException:
+        return get_lm_studio_client().list_models()
+    except (requests.exceptions.RequestException, ValueError):
         return []
 
-def generate_nursing_response(question, context, response_type="standard"):
+def build_nursing_request(question, context, response_type="standard"):
     """
-    Generate nursing-specific response using LLM
+    Build the prompt, system message and token limit for a response type
     
     Args:
         question (str): User's question
@@ -96,7 +184,7 @@ def generate_nursing_response(question, context, response_type="standard"):
         response_type (str): Type of response (standard, detailed, quick)
         
     Returns:
-        str: Generated response
+        tuple: (prompt, system_message, max_tokens)
     """
     system_messages = {
         "standard": "You are a helpful nursing chatbot. Only answer based on the context provided. Focus on practical nursing considerations.",
@@ -116,7 +204,37 @@ def generate_nursing_response(question, context, response_type="standard"):
         prompt = f"Context:\n{context}\n\nQuestion: {question}"
         max_tokens = 500
     
-    return query_lm_studio(prompt, system_message, max_tokens=max_tokens)
+    return prompt, system_message, max_tokens
+
+def generate_nursing_response(question, context, response_type="standard", stream=False, timeout=None, session_id=None):
+    """
+    Generate nursing-specific response using LLM
+    
+    The response type also sets the request's place in the generation queue,
+    so quick answers are not held up behind detailed ones.
+    
+    Args:
+        question (str): User's question
+        context (str): Relevant context
+        response_type (str): Type of response (standard, detailed, quick)
+        stream (bool): Return a generator of response pieces instead of the full text
+        timeout (float): Generation budget in seconds (time to first token when streaming)
+        session_id (str): Caller's session, for fairness between sessions
+        
+    Returns:
+        str or generator: Generated response
+    """
+    prompt, system_message, max_tokens = build_nursing_request(question, context, response_type)
+    
+    if stream:
+        return stream_lm_studio(
+            prompt, system_message, max_tokens=max_tokens, timeout=timeout,
+            priority=response_type, session_id=session_id
+        )
+    return query_lm_studio(
+        prompt, system_message, max_tokens=max_tokens, timeout=timeout,
+        priority=response_type, session_id=session_id
+    )
 
 def validate_response_quality(response):
     """
@@ -0,0 +1,157 @@
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+BUNDLE_MANIFEST = "bundle_manifest.json"
+CURRENT_FILE = "CURRENT"
+ONNX_SUBDIR = "onnx"
+
+def enable_offline_mode():
+    """Stop Hugging Face libraries from contacting the hub in this process and its children"""
+    for variable in ("HF_HUB_OFFLINE", "TRANSFORMERS_OFFLINE", "HF_DATASETS_OFFLINE"):
+        os.environ[variable] = "1"
+    # huggingface_hub reads the variable at import; update it if already imported
+    constants = sys.modules.get("huggingface_hub.constants")
+    if constants is not None:
+        constants.HF_HUB_OFFLINE = True
+
+def model_slug(model_name):
+    """
+    Directory name for a model
+
+    Args:
+        model_name (str): Hugging Face model name, e.g. "intfloat/multilingual-e5-large-instruct"
+
+    Returns:
+        str: Filesystem-safe name
+    """
+    return model_name.strip("/").replace("/", "--")
+
+def file_sha256(path, block_size=1024 * 1024):
+    """
+    SHA-256 of a file, read in blocks
+
+    Args:
+        path (str): File path
+        block_size (int): Bytes per read
+
+    Returns:
+        str: Hex digest
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _collect_files(directory):
+    files = {}
+    for root, _, names in os.walk(directory):
+        for name in sorted(names):
+            path = os.path.join(root, name)
+            relative = os.path.relpath(path, directory).replace(os.sep, "/")
+            if relative == BUNDLE_MANIFEST:
+                continue
+            files[relative] = {"sha256": file_sha256(path), "size": os.path.getsize(path)}
+    return dict(sorted(files.items()))
+
+def build_model_bundle(model_name, bundle_root, onnx_dir=None):
+    """
+    Package an embedding model into a versioned, checksummed local directory
+
+    The SentenceTransformer model (weights, tokenizer and pooling modules) is
+    saved under bundle_root/<model>/<version>/, together with an ONNX export
+    of the same model when onnx_dir is given. The version is derived from the
+    file checksums, so rebuilding an unchanged model gives the same bundle.
+
+    Args:
+        model_name (str): Hugging Face model name or local model directory
+        bundle_root (str): Root directory holding the bundles
+        onnx_dir (str): Optional directory written by export_onnx_model
+
+    Returns:
+        str: Path of the bundle directory
+    """
+    from sentence_transformers import SentenceTransformer
+
+    model_root = os.path.join(bundle_root, model_slug(model_name))
+    os.makedirs(model_root, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=".staging-", dir=model_root)
+    try:
+        SentenceTransformer(model_name).save(staging)
+        if onnx_dir:
+            shutil.copytree(onnx_dir, os.path.join(staging, ONNX_SUBDIR))
+
+        files = _collect_files(staging)
+        version = hashlib.sha256(json.dumps(files, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+        with open(os.path.join(staging, BUNDLE_MANIFEST), 'w', encoding='utf-8') as f:
+            json.dump({
+                "model_name": model_name,
+                "version": version,
+                "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "onnx": bool(onnx_dir),
+                "files": files
+            }, f, indent=2)
+
+        bundle_dir = os.path.join(model_root, version)
+        if os.path.exists(bundle_dir):
+            shutil.rmtree(staging)
+        else:
+            os.rename(staging, bundle_dir)
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    with open(os.path.join(model_root, CURRENT_FILE), 'w', encoding='utf-8') as f:
+        f.write(version + "\n")
+    return bundle_dir
+
+def find_model_bundle(bundle_root, model_name):
+    """
+    Locate the current bundle of a model
+
+    Args:
+        bundle_root (str): Root directory holding the bundles
+        model_name (str): Hugging Face model name
+
+    Returns:
+        str: Bundle directory, or None if the model has not been bundled
+    """
+    model_root = os.path.join(bundle_root, model_slug(model_name))
+    try:
+        with open(os.path.join(model_root, CURRENT_FILE), 'r', encoding='utf-8') as f:
+            version = f.read().strip()
+    except FileNotFoundError:
+        return None
+    bundle_dir = os.path.join(model_root, version)
+    return bundle_dir if os.path.isfile(os.path.join(bundle_dir, BUNDLE_MANIFEST)) else None
+
+def verify_model_bundle(bundle_dir, check_hashes=True):
+    """
+    Check a bundle against its manifest
+
+    Args:
+        bundle_dir (str): Bundle directory
+        check_hashes (bool): Compare SHA-256 checksums, not only file sizes
+
+    Returns:
+        dict: The bundle manifest
+
+    Raises:
+        ValueError: If a file is missing or does not match the manifest
+    """
+    with open(os.path.join(bundle_dir, BUNDLE_MANIFEST), 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    for relative, expected in manifest["files"].items():
+        path = os.path.join(bundle_dir, *relative.split("/"))
+        if not os.path.isfile(path):
+            raise ValueError(f"Model bundle {bundle_dir} is missing {relative}")
+        if os.path.getsize(path) != expected["size"]:
+            raise ValueError(f"Model bundle file {relative} has the wrong size")
+        if check_hashes and file_sha256(path) != expected["sha256"]:
+            raise ValueError(f"Model bundle file {relative} failed its checksum")
+    return manifest
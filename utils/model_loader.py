@@ -0,0 +1,148 @@
+import os
+import threading
+import time
+
+def load_embedding_backend(config):
+    """
+    Load the query/document encoder selected in the embedding configuration
+
+    When the model has a bundle under config["bundle_root"] (see
+    build_model_bundle.py), the hub is switched off and the encoder loads
+    only from the verified bundle. With config["offline"] set, a missing
+    bundle is an error instead of a hub download. Bundle files are checked
+    against the manifest sizes; checksums only with "bundle_verify_checksums".
+
+    Args:
+        config (dict): Embedding settings (see EMBEDDING_CONFIG); "backend" is
+            "torch" for SentenceTransformer or "onnx" for the exported
+            ONNX Runtime encoder in "onnx_dir"
+
+    Returns:
+        Encoder exposing encode() like SentenceTransformer
+    """
+    backend = config.get("backend", "torch")
+    if backend not in ("torch", "onnx"):
+        raise ValueError(f"Unknown embedding backend: {backend}")
+
+    model_path = config["model_name"]
+    onnx_dir = config.get("onnx_dir")
+    bundle_dir = None
+    if config.get("bundle_root"):
+        from .model_bundle import ONNX_SUBDIR, enable_offline_mode, find_model_bundle, verify_model_bundle
+        bundle_dir = find_model_bundle(config["bundle_root"], config["model_name"])
+        if bundle_dir is None and config.get("offline"):
+            raise FileNotFoundError(
+                f"No model bundle for {config['model_name']} in {config['bundle_root']}; "
+                "run build_model_bundle.py on a machine with network access"
+            )
+    if bundle_dir is not None:
+        enable_offline_mode()
+        manifest = verify_model_bundle(bundle_dir, check_hashes=config.get("bundle_verify_checksums", False))
+        model_path = bundle_dir
+        if backend == "onnx":
+            if not manifest.get("onnx"):
+                raise FileNotFoundError(f"Model bundle {bundle_dir} has no ONNX export")
+            onnx_dir = os.path.join(bundle_dir, ONNX_SUBDIR)
+
+    if backend == "onnx":
+        from .onnx_encoder import OnnxEncoder
+        return OnnxEncoder(
+            onnx_dir, intra_op_threads=config.get("onnx_threads", 0), expected_model=config["model_name"]
+        )
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_path)
+
+class BackgroundModelLoader:
+    """
+    Loads and warms up an embedding model on a background thread
+
+    The warm-up encode pays the one-time allocation and kernel selection cost
+    up front, so the first real query runs at steady-state speed. Callers
+    check is_ready() instead of blocking, and keep serving features that do
+    not need the model in the meantime.
+    """
+
+    def __init__(self, load_fn, warmup_texts=("Represent this query for retrieval: warm-up",)):
+        """
+        Args:
+            load_fn (callable): Returns the loaded model
+            warmup_texts (tuple): Texts encoded once after loading
+        """
+        self.model = None
+        self.error = None
+        self.load_seconds = None
+        self._load_fn = load_fn
+        self._warmup_texts = list(warmup_texts)
+        self._ready = threading.Event()
+        self._callbacks = []
+        self._callbacks_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="embedding-warmup", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        start = time.time()
+        try:
+            model = self._load_fn()
+            if self._warmup_texts:
+                model.encode(self._warmup_texts, convert_to_tensor=False)
+            self.model = model
+        except Exception as e:
+            self.error = e
+        finally:
+            self.load_seconds = time.time() - start
+            with self._callbacks_lock:
+                self._ready.set()
+                callbacks, self._callbacks = self._callbacks, []
+            for callback in callbacks:
+                self._call(callback)
+
+    def _call(self, callback):
+        try:
+            callback(self)
+        except Exception:
+            pass  # a failing listener must not affect the loader or other listeners
+
+    def add_done_callback(self, callback):
+        """
+        Call callback(loader) once loading has finished, successfully or not
+
+        Runs at once on the calling thread if loading is already done,
+        otherwise on the loader thread.
+
+        Args:
+            callback (callable): Function taking the loader
+        """
+        with self._callbacks_lock:
+            if not self._ready.is_set():
+                self._callbacks.append(callback)
+                return
+        self._call(callback)
+
+    def is_ready(self):
+        """
+        Returns:
+            bool: True once loading has finished, successfully or not
+        """
+        return self._ready.is_set()
+
+    def wait(self, timeout=None):
+        """
+        Wait for loading to finish
+
+        Args:
+            timeout (float): Seconds to wait, None to wait indefinitely
+
+        Returns:
+            bool: True if loading has finished
+        """
+        return self._ready.wait(timeout)
+
+    @property
+    def status(self):
+        """
+        Returns:
+            str: "warming_up", "ready" or "failed"
+        """
+        if not self.is_ready():
+            return "warming_up"
+        return "failed" if self.error is not None else "ready"
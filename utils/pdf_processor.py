@@ -1,23 +1,32 @@
-import pdfplumber
+import os
 import re
 import json
+import hashlib
+import time
 import numpy as np
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
+from .embedding_cache import get_query_embedding_cache
+from .retrieval import normalize_rows
+from .chunk_metadata import infer_chunk_metadata
 
-def extract_text_from_pdf(pdf_path):
+def extract_text_from_pdf(pdf_path, with_metadata=False):
     """
     Extract text and tables from PDF using pdfplumber
     
     Args:
         pdf_path (str): Path to the PDF file
+        with_metadata (bool): Also return source, page and kind for each chunk
         
     Returns:
-        list: List of text chunks extracted from the PDF
+        list: List of text chunks extracted from the PDF, or a tuple
+            (chunks, chunk_metadata) when with_metadata is True
     """
     text_chunks = []
+    chunk_metadata = []
+    source = os.path.basename(pdf_path)
     
     try:
+        # Imported here so retrieval-only callers never load the PDF stack
+        import pdfplumber
         with pdfplumber.open(pdf_path) as pdf:
             for page_num, page in enumerate(pdf.pages):
                 # Extract text
@@ -30,6 +39,7 @@ def extract_text_from_pdf(pdf_path):
                     for sentence in sentences:
                         if len(sentence.strip()) > 20:  # Filter out very short chunks
                             text_chunks.append(sentence.strip())
+                            chunk_metadata.append({"source": source, "page": page_num + 1, "kind": "text"})
                 
                 # Extract tables
                 tables = page.extract_tables()
@@ -42,20 +52,104 @@ def extract_text_from_pdf(pdf_path):
                                 table_text += " | ".join([str(cell) if cell else "" for cell in row]) + "\n"
                         if table_text.strip():
                             text_chunks.append(f"Table from page {page_num + 1}:\n{table_text.strip()}")
+                            chunk_metadata.append({"source": source, "page": page_num + 1, "kind": "table"})
     
     except Exception as e:
         print(f"Error extracting text from PDF: {str(e)}")
-        return []
+        return ([], []) if with_metadata else []
     
+    if with_metadata:
+        return text_chunks, chunk_metadata
     return text_chunks
 
-def create_embeddings(chunks, model):
+def measure_chunk_lengths(texts, model):
+    """
+    Length of each text in tokens, or characters when the model has no tokenizer
+    
+    Args:
+        texts (list): List of texts
+        model: SentenceTransformer model
+        
+    Returns:
+        numpy.ndarray: Length per text
+    """
+    tokenizer = getattr(model, "tokenizer", None)
+    if tokenizer is None:
+        return np.array([len(text) for text in texts])
+    encoded = tokenizer(texts, add_special_tokens=False)["input_ids"]
+    return np.array([len(ids) for ids in encoded])
+
+def load_embedding_checkpoint(checkpoint_path, fingerprint):
+    """
+    Read the batches finished by an interrupted create_embeddings run
+    
+    Args:
+        checkpoint_path (str): Checkpoint file (JSON lines)
+        fingerprint (str): Fingerprint of the current build
+        
+    Returns:
+        dict: Chunk index -> embedding for every finished chunk
+    """
+    finished = {}
+    try:
+        with open(checkpoint_path, 'r', encoding='utf-8') as f:
+            header = json.loads(f.readline() or "{}")
+            if header.get("fingerprint") != fingerprint:
+                return {}
+            for line in f:
+                try:
+                    batch = json.loads(line)
+                except json.JSONDecodeError:
+                    break  # Last line was cut off by the interruption
+                finished.update(zip(batch["indices"], batch["embeddings"]))
+    except FileNotFoundError:
+        pass
+    return finished
+
+def _encode_batches(batches, texts, model, pool=None):
+    """Yield (indices, embeddings) per batch, in completion order when a pool is used"""
+    if pool is None:
+        for indices in batches:
+            yield indices, model.encode([texts[i] for i in indices], batch_size=len(indices), convert_to_tensor=False)
+        return
+    
+    from concurrent.futures import FIRST_COMPLETED, wait
+    # Keep a couple of batches queued per worker without pickling the whole corpus up front
+    max_in_flight = 2 * pool.workers
+    remaining = iter(batches)
+    in_flight = set()
+    while True:
+        for indices in remaining:
+            in_flight.add(pool.submit(indices, [texts[i] for i in indices]))
+            if len(in_flight) >= max_in_flight:
+                break
+        if not in_flight:
+            return
+        done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+        for future in done:
+            yield future.result()
+
+def create_embeddings(chunks, model, batch_size=32, checkpoint_path=None, progress_callback=None, model_name="",
+                      pool=None):
     """
     Create embeddings for text chunks
     
+    Chunks are sorted by token length and encoded in batches of similar
+    length, so little compute goes to padding. With a checkpoint path, each
+    finished batch is appended to the checkpoint, and a rerun after a crash
+    resumes from the batches already encoded. With a worker pool the batches
+    are encoded in parallel and put back in chunk order.
+    
     Args:
         chunks (list): List of text chunks
         model: SentenceTransformer model
+        batch_size (int): Chunks per forward pass
+        checkpoint_path (str): Optional checkpoint file, removed when the build completes
+        progress_callback (callable): Called as progress_callback(done, total, chunks_per_second);
+            progress is printed when omitted
+        model_name (str): Embedding model name, part of the checkpoint fingerprint
+        pool (EmbeddingProcessPool): Optional worker processes to spread the batches over;
+            model is then only used to measure chunk lengths and may be None
         
     Returns:
         list: List of embeddings
@@ -67,10 +161,47 @@ def create_embeddings(chunks, model):
     instruction = "Represent this document for retrieval: "
     chunks_with_instruction = [instruction + chunk for chunk in chunks]
     
-    embeddings = model.encode(chunks_with_instruction, convert_to_tensor=False)
-    return embeddings.tolist()
+    fingerprint = compute_knowledge_base_version(chunks, model_name)
+    finished = load_embedding_checkpoint(checkpoint_path, fingerprint) if checkpoint_path else {}
+    if checkpoint_path:
+        # Rewrite the checkpoint so a line cut off by the interruption is dropped
+        with open(checkpoint_path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({"fingerprint": fingerprint, "total_chunks": len(chunks)}) + "\n")
+            if finished:
+                indices = list(finished)
+                f.write(json.dumps({"indices": indices, "embeddings": [finished[i] for i in indices]}) + "\n")
+    
+    # Length buckets: neighbours in sorted order pad to almost the same length
+    lengths = measure_chunk_lengths(chunks_with_instruction, model)
+    pending = [int(i) for i in np.argsort(lengths, kind="stable") if int(i) not in finished]
+    
+    total = len(chunks)
+    resumed = len(finished)
+    start_time = time.time()
+    last_reported = -1
+    batches = [pending[start:start + batch_size] for start in range(0, len(pending), batch_size)]
+    for indices, vectors in _encode_batches(batches, chunks_with_instruction, model, pool):
+        vectors = np.asarray(vectors).tolist()
+        finished.update(zip(indices, vectors))
+        
+        if checkpoint_path:
+            with open(checkpoint_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps({"indices": indices, "embeddings": vectors}) + "\n")
+        
+        done = len(finished)
+        rate = (done - resumed) / max(time.time() - start_time, 1e-9)
+        if progress_callback is not None:
+            progress_callback(done, total, rate)
+        elif done * 10 // total != last_reported:
+            last_reported = done * 10 // total
+            print(f"Embedded {done}/{total} chunks ({rate:.1f} chunks/s)")
+    
+    if checkpoint_path and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    
+    return [finished[i] for i in range(total)]
 
-def save_embeddings(chunks, embeddings, filename="embedded_knowledge.json"):
+def save_embeddings(chunks, embeddings, filename="embedded_knowledge.json", chunk_metadata=None, model_name=None):
     """
     Save chunks and embeddings to JSON file
     
@@ -78,38 +209,75 @@ def save_embeddings(chunks, embeddings, filename="embedded_knowledge.json"):
         chunks (list): List of text chunks
         embeddings (list): List of embeddings
         filename (str): Output filename
+        chunk_metadata (list): Optional source, page and kind for each chunk
+        model_name (str): Embedding model that produced the embeddings
     """
     data = {
         "chunks": chunks,
         "embeddings": embeddings,
+        "chunk_metadata": chunk_metadata or [],
         "metadata": {
             "total_chunks": len(chunks),
+            "model_name": model_name,
             "embedding_dimension": len(embeddings[0]) if embeddings else 0
         }
     }
     with open(filename, 'w', encoding='utf-8') as f:
         json.dump(data, f, ensure_ascii=False, indent=2)
 
-def load_embeddings(filename="embedded_knowledge.json"):
+def load_embeddings(filename="embedded_knowledge.json", with_metadata=False, model_name=None):
     """
     Load chunks and embeddings from JSON file
     
     Args:
         filename (str): Input filename
+        with_metadata (bool): Also return per-chunk metadata, inferred from the
+            chunk text for files saved without it
+        model_name (str): Expected embedding model; a file built with a
+            different model is treated as missing so it gets rebuilt
         
     Returns:
-        tuple: (chunks, embeddings)
+        tuple: (chunks, embeddings), or (chunks, embeddings, chunk_metadata)
+            when with_metadata is True
     """
     try:
         with open(filename, 'r', encoding='utf-8') as f:
             data = json.load(f)
-        return data["chunks"], data["embeddings"]
     except FileNotFoundError:
-        return [], []
+        return ([], [], []) if with_metadata else ([], [])
+    
+    saved_model = data.get("metadata", {}).get("model_name")
+    if model_name and saved_model and saved_model != model_name:
+        return ([], [], []) if with_metadata else ([], [])
+    
+    if not with_metadata:
+        return data["chunks"], data["embeddings"]
+    chunk_metadata = data.get("chunk_metadata") or infer_chunk_metadata(data["chunks"])
+    return data["chunks"], data["embeddings"], chunk_metadata
 
-def find_relevant_chunk(question, chunks, embeddings, model, top_k=1, threshold=0.1):
+def encode_query(question, model, cache=None):
     """
-    Find the most relevant chunk for a question
+    Embed a query, reusing the vector of an identical earlier query
+    
+    Args:
+        question (str): User's question
+        model: SentenceTransformer model
+        cache (QueryEmbeddingCache): Cache to use (defaults to the shared cache)
+        
+    Returns:
+        numpy.ndarray: Query vector
+    """
+    cache = cache if cache is not None else get_query_embedding_cache()
+    vector = cache.get(model, question)
+    if vector is None:
+        instruction = "Represent this query for retrieval: "
+        vector = np.asarray(model.encode([instruction + question], convert_to_tensor=False)[0])
+        cache.put(model, question, vector)
+    return vector
+
+def search_chunks(question, chunks, embeddings, model, top_k=1, threshold=0.1, retrieval_index=None, query_vector=None, filters=None):
+    """
+    Rank the chunks most relevant to a question
     
     Args:
         question (str): User's question
@@ -118,28 +286,68 @@ def find_relevant_chunk(question, chunks, embeddings, model, top_k=1, threshold=
         model: SentenceTransformer model
         top_k (int): Number of top chunks to return
         threshold (float): Minimum similarity threshold
+        retrieval_index (RetrievalIndex): Optional prebuilt index for hybrid search
+        query_vector (numpy.ndarray): Precomputed query vector, encoded if omitted
+        filters (dict): Metadata filters (source, kind, pages); needs a retrieval_index
         
     Returns:
-        str or None: Most relevant chunk or None if below threshold
+        list: List of (chunk_index, similarity) ordered best first
     """
-    if not chunks or not embeddings:
-        return None
+    if not chunks or not len(embeddings):
+        return []
+    
+    # Embed the question (served from the query cache when seen before)
+    if query_vector is None:
+        query_vector = encode_query(question, model)
+    question_embedding = np.asarray(query_vector).reshape(1, -1)
     
-    # Embed the question
-    instruction = "Represent this query for retrieval: "
-    question_embedding = model.encode([instruction + question], convert_to_tensor=False)
+    if retrieval_index is not None:
+        return retrieval_index.search(question, question_embedding[0], top_k=top_k, threshold=threshold, filters=filters)
     
     # Calculate cosine similarity
     embeddings_array = np.array(embeddings)
-    similarities = cosine_similarity(question_embedding, embeddings_array)[0]
+    similarities = normalize_rows(embeddings_array) @ normalize_rows(question_embedding)[0]
     
     # Get top k most similar chunks
     top_indices = np.argsort(similarities)[-top_k:][::-1]
     
-    if similarities[top_indices[0]] < threshold:
-        return None
+    return [(int(i), float(similarities[i])) for i in top_indices if similarities[i] >= threshold]
+
+def find_relevant_chunk(question, chunks, embeddings, model, top_k=1, threshold=0.1, retrieval_index=None):
+    """
+    Find the most relevant chunk for a question
     
-    return chunks[top_indices[0]]
+    Args:
+        question (str): User's question
+        chunks (list): List of text chunks
+        embeddings (list): List of embeddings
+        model: SentenceTransformer model
+        top_k (int): Number of top chunks to return
+        threshold (float): Minimum similarity threshold
+        retrieval_index (RetrievalIndex): Optional prebuilt index for hybrid search
+        
+    Returns:
+        str or None: Most relevant chunk or None if below threshold
+    """
+    hits = search_chunks(question, chunks, embeddings, model, top_k, threshold, retrieval_index)
+    return chunks[hits[0][0]] if hits else None
+
+def compute_knowledge_base_version(chunks, model_name=""):
+    """
+    Fingerprint the knowledge base so caches can detect when it changes
+    
+    Args:
+        chunks (list): List of text chunks
+        model_name (str): Name of the embedding model
+        
+    Returns:
+        str: Short hex digest
+    """
+    digest = hashlib.sha256(model_name.encode("utf-8"))
+    for chunk in chunks:
+        digest.update(b"\0")
+        digest.update(chunk.encode("utf-8"))
+    return digest.hexdigest()[:16]
 
 def preprocess_text_for_embedding(text):
     """
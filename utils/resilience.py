@@ -0,0 +1,171 @@
+import threading
+import time
+
+class Deadline:
+    """Time budget for one request, shared by its retrieval and generation stages"""
+
+    def __init__(self, seconds):
+        """
+        Args:
+            seconds (float): Total budget
+        """
+        self.seconds = seconds
+        self.started = time.monotonic()
+
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    def remaining(self):
+        """
+        Returns:
+            float: Seconds left, never negative
+        """
+        return max(0.0, self.seconds - self.elapsed())
+
+    def expired(self):
+        return self.remaining() <= 0
+
+class CircuitOpenError(Exception):
+    """Raised for a call the circuit breaker refuses while open"""
+
+class CircuitBreaker:
+    """
+    Stops calling a failing or hung dependency, and probes it to recover
+
+    Closed: calls go through; failures and slow calls are counted. Streamed
+    calls are judged by their time to first token, others by their total
+    time, each against its own threshold.
+    Open: after failure_threshold consecutive failures or slow calls, calls
+    are refused immediately for reset_seconds.
+    Half-open: one probe call is let through; success closes the breaker,
+    failure opens it again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=3, slow_call_seconds=30, reset_seconds=30, slow_first_token_seconds=15):
+        """
+        Args:
+            failure_threshold (int): Consecutive failures or slow calls that open the breaker
+            slow_call_seconds (float): Complete calls slower than this count as failures
+            reset_seconds (float): Time open before a probe call is allowed
+            slow_first_token_seconds (float): Streamed calls with a slower first token count as failures
+        """
+        self.failure_threshold = failure_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_first_token_seconds = slow_first_token_seconds
+        self.reset_seconds = reset_seconds
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.times_opened = 0
+        self.rejected = 0
+        self._probe_started = None
+        self._lock = threading.Lock()
+
+    def _probe_due(self, now):
+        if self.state == self.OPEN:
+            return now - self.opened_at >= self.reset_seconds
+        if self.state == self.HALF_OPEN:
+            # A probe that never reported back is treated as lost
+            return self._probe_started is None or now - self._probe_started >= self.reset_seconds
+        return False
+
+    def allows_requests(self):
+        """
+        Whether a call would be let through now, without taking the probe slot
+
+        Returns:
+            bool: True when closed, or when a half-open probe is due
+        """
+        with self._lock:
+            return self.state == self.CLOSED or self._probe_due(time.monotonic())
+
+    def try_acquire(self):
+        """
+        Ask to make a call; in half-open state only the probe call gets through
+
+        Returns:
+            bool: True if the call may proceed (report it with record_success/record_failure)
+        """
+        now = time.monotonic()
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self._probe_due(now):
+                self.state = self.HALF_OPEN
+                self._probe_started = now
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self, duration, first_token=False):
+        """
+        Report a finished call
+
+        Args:
+            duration (float): Seconds the call took; a slow call counts as a failure
+            first_token (bool): duration is a stream's time to first token
+        """
+        if duration > (self.slow_first_token_seconds if first_token else self.slow_call_seconds):
+            self.record_failure()
+            return
+        with self._lock:
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self._probe_started = None
+
+    def record_failure(self):
+        """Report a failed or timed-out call"""
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.times_opened += 1
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                self._probe_started = None
+
+    def record_abandoned(self):
+        """Report a call given up by its caller, freeing a half-open probe slot"""
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._probe_started = None
+
+    def stats(self):
+        """
+        Returns:
+            dict: State, consecutive failures, times opened and calls rejected
+        """
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "times_opened": self.times_opened,
+                "rejected": self.rejected
+            }
+
+_llm_breaker = None
+_llm_breaker_lock = threading.Lock()
+
+def get_llm_circuit_breaker():
+    """
+    Get the process-wide circuit breaker for LLM generation, created from RESILIENCE_CONFIG on first use
+
+    Returns:
+        CircuitBreaker: Shared breaker
+    """
+    global _llm_breaker
+    if _llm_breaker is None:
+        with _llm_breaker_lock:
+            if _llm_breaker is None:
+                from config import RESILIENCE_CONFIG
+                _llm_breaker = CircuitBreaker(
+                    failure_threshold=RESILIENCE_CONFIG["breaker_failure_threshold"],
+                    slow_call_seconds=RESILIENCE_CONFIG["breaker_slow_call_seconds"],
+                    reset_seconds=RESILIENCE_CONFIG["breaker_reset_seconds"],
+                    slow_first_token_seconds=RESILIENCE_CONFIG["breaker_slow_first_token_seconds"]
+                )
+    return _llm_breaker
@@ -0,0 +1,189 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+class SQLiteResponseCache:
+    """
+    Disk-backed cache of LLM responses keyed by the full request
+
+    Entries survive restarts and are shared by every process on the node.
+    WAL journaling lets readers proceed while another connection writes.
+    Requests sampled hotter than max_temperature are meant to vary, so they
+    bypass the cache unless cache_sampled is set.
+    """
+
+    def __init__(self, path, ttl_seconds=7 * 24 * 3600, max_entries=5000, max_temperature=0.7, cache_sampled=False):
+        """
+        Args:
+            path (str): SQLite database file
+            ttl_seconds (float): Age after which a response is regenerated
+            max_entries (int): Least recently used responses beyond this are evicted
+            max_temperature (float): Highest temperature that is cached
+            cache_sampled (bool): Cache responses at any temperature
+        """
+        self.path = path
+        self.ttl = ttl_seconds
+        self.max_entries = max_entries
+        self.max_temperature = max_temperature
+        self.cache_sampled = cache_sampled
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        with self._connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, "
+                "created REAL NOT NULL, last_used REAL NOT NULL, hits INTEGER NOT NULL DEFAULT 0)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+
+    def _connection(self):
+        """One connection per thread; SQLite connections are not shared across threads"""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def _count(self, counter):
+        with self._stats_lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    @staticmethod
+    def make_key(request):
+        """
+        Hash of a request
+
+        Args:
+            request (dict): Model, messages, temperature and max_tokens
+
+        Returns:
+            str: Hex digest identifying the request
+        """
+        return hashlib.sha256(json.dumps(request, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+    def should_cache(self, request):
+        """
+        Args:
+            request (dict): Request with a "temperature"
+
+        Returns:
+            bool: Whether the request is eligible for caching
+        """
+        return self.cache_sampled or request.get("temperature", 0) <= self.max_temperature
+
+    def get(self, request):
+        """
+        Look up a cached response
+
+        Args:
+            request (dict): Model, messages, temperature and max_tokens
+
+        Returns:
+            str: Cached response, or None on a miss or bypass
+        """
+        if not self.should_cache(request):
+            self._count("bypassed")
+            return None
+        key = self.make_key(request)
+        now = time.time()
+        try:
+            with self._connection() as connection:
+                row = connection.execute(
+                    "SELECT response FROM responses WHERE key = ? AND created >= ? AND TRIM(response) != ''",
+                    (key, now - self.ttl)
+                ).fetchone()
+                if row is not None:
+                    connection.execute(
+                        "UPDATE responses SET last_used = ?, hits = hits + 1 WHERE key = ?", (now, key)
+                    )
+        except sqlite3.Error:
+            row = None
+        self._count("hits" if row is not None else "misses")
+        return row[0] if row is not None else None
+
+    def put(self, request, response):
+        """
+        Store a response, evicting expired and least recently used entries
+
+        Empty or whitespace-only responses are not stored, so one bad
+        generation is not replayed for the whole TTL.
+
+        Args:
+            request (dict): Model, messages, temperature and max_tokens
+            response (str): Generated response
+        """
+        if not self.should_cache(request) or not response or not response.strip():
+            return
+        now = time.time()
+        try:
+            with self._connection() as connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO responses (key, response, created, last_used, hits) VALUES (?, ?, ?, ?, 0)",
+                    (self.make_key(request), response, now, now)
+                )
+                connection.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+                connection.execute(
+                    "DELETE FROM responses WHERE key IN "
+                    "(SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,)
+                )
+        except sqlite3.Error:
+            pass  # A busy or read-only cache never fails the request
+
+    def stats(self):
+        """
+        Get cache statistics
+
+        Returns:
+            dict: Entries on disk, hits, misses, bypasses and hit rate
+        """
+        try:
+            entries = self._connection().execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        except sqlite3.Error:
+            entries = None
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+    def clear(self):
+        """Remove all cached responses"""
+        with self._connection() as connection:
+            connection.execute("DELETE FROM responses")
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+def get_response_cache():
+    """
+    Get the process-wide response cache, created from LLM_CACHE_CONFIG on first use
+
+    Returns:
+        SQLiteResponseCache: Shared cache, or None when caching is disabled
+    """
+    global _response_cache
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                from config import LLM_CACHE_CONFIG
+                if not LLM_CACHE_CONFIG["enabled"]:
+                    return None
+                _response_cache = SQLiteResponseCache(
+                    LLM_CACHE_CONFIG["path"],
+                    ttl_seconds=LLM_CACHE_CONFIG["ttl_seconds"],
+                    max_entries=LLM_CACHE_CONFIG["max_entries"],
+                    max_temperature=LLM_CACHE_CONFIG["max_temperature"],
+                    cache_sampled=LLM_CACHE_CONFIG["cache_sampled"]
+                )
+    return _response_cache
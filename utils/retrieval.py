@@ -0,0 +1,333 @@
+import heapq
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from .bm25_index import BM25Index, reciprocal_rank_fusion
+from .chunk_metadata import ChunkMetadata, infer_chunk_metadata
+
+def normalize_rows(matrix):
+    """
+    L2-normalize the rows of a matrix so dot products are cosine similarities
+
+    Args:
+        matrix (numpy.ndarray): 2D array
+
+    Returns:
+        numpy.ndarray: Normalized float32 array
+    """
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+def top_k_indices(scores, k):
+    """
+    Get the indices of the k largest scores, best first
+
+    Args:
+        scores (numpy.ndarray): 1D array of scores
+        k (int): Number of indices to return
+
+    Returns:
+        numpy.ndarray: Indices ordered by descending score
+    """
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if k < len(scores):
+        indices = np.argpartition(-scores, k - 1)[:k]
+    else:
+        indices = np.arange(len(scores))
+    return indices[np.argsort(-scores[indices], kind="stable")]
+
+def merge_top_k(shard_results, k):
+    """
+    K-way merge of per-shard top-k lists into a global top-k
+
+    Args:
+        shard_results (list): List of (indices, scores) per shard, each best first
+        k (int): Number of results to keep
+
+    Returns:
+        tuple: (indices, scores), best first
+    """
+    streams = [zip((-scores).tolist(), indices.tolist()) for indices, scores in shard_results]
+    merged = list(heapq.merge(*streams))[:k]
+    indices = np.array([index for _, index in merged], dtype=np.int64)
+    scores = np.array([-score for score, _ in merged], dtype=np.float32)
+    return indices, scores
+
+_scan_executor = None
+_scan_executor_lock = threading.Lock()
+
+def get_scan_executor():
+    """
+    Get the process-wide thread pool used for sharded scans
+
+    NumPy releases the GIL inside matrix products, so shards scored on
+    separate threads run on separate cores even when BLAS itself is limited
+    to one thread. The pool is sized once, to the larger of
+    RETRIEVAL_CONFIG["scan_shards"] and the CPU count, and never replaced,
+    since other sessions may be submitting shards to it; a scan with more
+    shards than threads simply queues the extra ones.
+
+    Returns:
+        ThreadPoolExecutor: Shared executor
+    """
+    global _scan_executor
+    if _scan_executor is None:
+        with _scan_executor_lock:
+            if _scan_executor is None:
+                from config import RETRIEVAL_CONFIG
+                max_workers = max(RETRIEVAL_CONFIG["scan_shards"], os.cpu_count() or 1)
+                _scan_executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="retrieval-scan")
+    return _scan_executor
+
+class RetrievalIndex:
+    """
+    Search structures over the knowledge base, built once at load time
+
+    Combines a BM25 inverted index with the dense embedding matrix. The best
+    lexical matches and the dense top-k are found independently and merged
+    with reciprocal rank fusion, so a chunk close in meaning is never lost
+    for sharing few words with the query.
+
+    Full dense scans can run in two stages: a low-dimensional projection of
+    the matrix (PCA, or truncation for Matryoshka-trained models) produces a
+    shortlist, which is then rescored in full dimension.
+
+    Metadata filters are applied as precomputed masks before any scoring, so
+    only the matching rows are scanned.
+
+    Large full-corpus scans are split into row shards scored in parallel on a
+    thread pool, and the per-shard top-k lists are merged.
+    """
+
+    def __init__(self, chunks, embeddings, hybrid_search=True, bm25_k1=1.5, bm25_b=0.75,
+                 rrf_k=60, lexical_candidates=50, prefilter_dim=0, prefilter_method="pca",
+                 prefilter_shortlist=200, metadata=None, scan_shards=1, min_rows_per_shard=4096):
+        """
+        Args:
+            chunks (list): List of text chunks
+            embeddings (list): List of chunk embeddings
+            hybrid_search (bool): Fuse BM25 with dense scores; dense only when False
+            bm25_k1 (float): BM25 term frequency saturation
+            bm25_b (float): BM25 document length normalization
+            rrf_k (int): Reciprocal rank fusion constant
+            lexical_candidates (int): Depth of the BM25 and dense rankings that are fused
+            prefilter_dim (int): Dimension of the first-pass projection, 0 to disable
+            prefilter_method (str): "pca" or "truncate"
+            prefilter_shortlist (int): Number of first-pass hits rescored in full dimension
+            metadata (list): Source, page and kind per chunk; inferred from the
+                chunk text when omitted
+            scan_shards (int): Maximum number of parallel shards for full scans
+            min_rows_per_shard (int): Smallest shard worth a thread hand-off
+        """
+        self.chunks = chunks
+        self.metadata = ChunkMetadata(metadata if metadata is not None else infer_chunk_metadata(chunks))
+        self.matrix = normalize_rows(embeddings) if len(embeddings) else np.zeros((0, 0), dtype=np.float32)
+        self.hybrid_search = hybrid_search
+        self.rrf_k = rrf_k
+        self.lexical_candidates = lexical_candidates
+        self.bm25 = BM25Index(chunks, k1=bm25_k1, b=bm25_b) if hybrid_search else None
+        self.scan_shards = scan_shards
+        self.min_rows_per_shard = min_rows_per_shard
+        self.prefilter_dim = prefilter_dim
+        self.prefilter_shortlist = prefilter_shortlist
+        self.projection = None
+        self.reduced_matrix = None
+        if prefilter_dim:
+            self.fit_projection(prefilter_dim, prefilter_method)
+
+    def fit_projection(self, dim, method="pca"):
+        """
+        Fit the low-dimensional projection used by the first scan pass
+
+        Skipped when dim is 0 or the corpus is too small for a shortlist to save work.
+
+        Args:
+            dim (int): Target dimension
+            method (str): "pca" for a PCA basis fitted on the chunk vectors,
+                "truncate" to keep the leading dimensions (Matryoshka models)
+        """
+        num_chunks, full_dim = self.matrix.shape
+        if not dim or dim >= full_dim or num_chunks <= max(dim, 2 * self.prefilter_shortlist):
+            self.projection = None
+            self.reduced_matrix = None
+            return
+        if method == "pca":
+            centered = self.matrix - self.matrix.mean(axis=0)
+            # Eigenvectors of the covariance; cheaper than an SVD when chunks >> dims
+            _, eigenvectors = np.linalg.eigh(centered.T @ centered)
+            self.projection = np.ascontiguousarray(eigenvectors[:, ::-1][:, :dim], dtype=np.float32)
+            # The mean term adds the same constant to every score, so the
+            # centered projection ranks exactly like the raw one
+            self.reduced_matrix = np.ascontiguousarray(centered @ self.projection)
+        elif method == "truncate":
+            self.projection = None
+            self.reduced_matrix = normalize_rows(self.matrix[:, :dim])
+        else:
+            raise ValueError(f"Unknown prefilter method: {method}")
+        self.prefilter_dim = dim
+        self.prefilter_method = method
+
+    def _reduce_query(self, query_vector):
+        if self.projection is not None:
+            return query_vector @ self.projection
+        return normalize_rows(query_vector[:self.prefilter_dim])
+
+    def __len__(self):
+        return len(self.chunks)
+
+    def dense_scores(self, query_vector, candidates=None):
+        """
+        Cosine similarity between the query and the chunks
+
+        Args:
+            query_vector (numpy.ndarray): Normalized query embedding
+            candidates (numpy.ndarray): Optional chunk indices to score
+
+        Returns:
+            numpy.ndarray: Similarity per scored chunk
+        """
+        if candidates is None:
+            return self.matrix @ query_vector
+        return self.matrix[candidates] @ query_vector
+
+    def _shard_bounds(self, num_rows):
+        num_shards = min(self.scan_shards, num_rows // max(self.min_rows_per_shard, 1))
+        if num_shards <= 1:
+            return None
+        return np.linspace(0, num_rows, num_shards + 1).astype(np.int64)
+
+    def _scan_top_k(self, matrix, vector, k):
+        """Top-k rows of matrix @ vector, sharded across threads for large matrices"""
+        bounds = self._shard_bounds(len(matrix))
+        if bounds is None:
+            scores = matrix @ vector
+            indices = top_k_indices(scores, k)
+            return indices, scores[indices]
+
+        def scan_shard(start, end):
+            scores = matrix[start:end] @ vector
+            indices = top_k_indices(scores, k)
+            return indices + start, scores[indices]
+
+        executor = get_scan_executor()
+        futures = [executor.submit(scan_shard, start, end) for start, end in zip(bounds[:-1], bounds[1:])]
+        return merge_top_k([future.result() for future in futures], k)
+
+    def dense_top_k(self, query_vector, k, exact=False, allowed=None):
+        """
+        Dense scan for the k most similar chunks
+
+        Args:
+            query_vector (numpy.ndarray): Normalized query embedding
+            k (int): Number of chunks to return
+            exact (bool): Skip the reduced-dimension first pass
+            allowed (numpy.ndarray): Optional chunk indices to restrict the scan to
+
+        Returns:
+            tuple: (chunk indices, similarities), best first
+        """
+        num_rows = len(self) if allowed is None else len(allowed)
+        use_prefilter = (self.reduced_matrix is not None and not exact
+                         and k < self.prefilter_shortlist < num_rows)
+        if use_prefilter:
+            reduced = self.reduced_matrix if allowed is None else self.reduced_matrix[allowed]
+            shortlist, _ = self._scan_top_k(reduced, self._reduce_query(query_vector), self.prefilter_shortlist)
+            if allowed is not None:
+                shortlist = allowed[shortlist]
+            similarities = self.dense_scores(query_vector, shortlist)
+            order = top_k_indices(similarities, k)
+            return shortlist[order], similarities[order]
+        if allowed is None:
+            return self._scan_top_k(self.matrix, query_vector, k)
+        similarities = self.dense_scores(query_vector, allowed)
+        order = top_k_indices(similarities, k)
+        return allowed[order], similarities[order]
+
+    def evaluate_prefilter_recall(self, query_vectors, k=10):
+        """
+        Measure recall@k of the two-stage scan against the exact scan
+
+        Args:
+            query_vectors (numpy.ndarray): Sample query embeddings, one per row
+            k (int): Cutoff
+
+        Returns:
+            float: Mean fraction of the exact top-k found by the two-stage scan
+        """
+        recalls = []
+        for query_vector in normalize_rows(query_vectors):
+            exact, _ = self.dense_top_k(query_vector, k, exact=True)
+            approx, _ = self.dense_top_k(query_vector, k)
+            recalls.append(len(set(exact.tolist()) & set(approx.tolist())) / max(len(exact), 1))
+        return float(np.mean(recalls)) if recalls else 1.0
+
+    def search(self, query, query_vector, top_k=1, threshold=None, filters=None):
+        """
+        Rank chunks for a query
+
+        Args:
+            query (str): Query text
+            query_vector (numpy.ndarray): Query embedding
+            top_k (int): Number of results to return
+            threshold (float): Minimum cosine similarity for a result
+            filters (dict): Metadata filters, see ChunkMetadata.mask
+
+        Returns:
+            list: List of (chunk_index, similarity) ordered best first
+        """
+        if not len(self):
+            return []
+        query_vector = normalize_rows(query_vector).reshape(-1)
+        depth = max(top_k, self.lexical_candidates)
+
+        mask = self.metadata.mask(filters)
+        allowed = None
+        if mask is not None:
+            allowed = np.flatnonzero(mask)
+            if not len(allowed):
+                return []
+
+        lexical_ranking = np.empty(0, dtype=np.int64)
+        if self.bm25 is not None:
+            lexical_ranking, _ = self.bm25.top_candidates(query, depth, mask)
+        return self._fuse(query_vector, lexical_ranking, top_k, threshold, depth, allowed)
+
+    def _fuse(self, query_vector, lexical_ranking, top_k, threshold, depth, allowed=None):
+        dense_ranking, similarities = self.dense_top_k(query_vector, depth, allowed=allowed)
+        similarity_of = dict(zip(dense_ranking.tolist(), similarities.tolist()))
+
+        if len(lexical_ranking):
+            ranked = [doc_id for doc_id, _ in
+                      reciprocal_rank_fusion([dense_ranking, lexical_ranking], k=self.rrf_k)]
+        else:
+            ranked = dense_ranking.tolist()
+
+        results = []
+        for doc_id in ranked:
+            similarity = similarity_of.get(doc_id)
+            if similarity is None:
+                similarity = float(self.dense_scores(query_vector, np.array([doc_id]))[0])
+            if threshold is not None and similarity < threshold:
+                continue
+            results.append((doc_id, similarity))
+            if len(results) == top_k:
+                break
+        return results
+
+def build_retrieval_index(chunks, embeddings, config=None):
+    """
+    Build the retrieval index for a knowledge base
+
+    Args:
+        chunks (list): List of text chunks
+        embeddings (list): List of chunk embeddings
+        config (dict): Retrieval settings (see RETRIEVAL_CONFIG)
+
+    Returns:
+        RetrievalIndex: Index ready for searching
+    """
+    return RetrievalIndex(chunks, embeddings, **(config or {}))